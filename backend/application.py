@@ -1,12 +1,19 @@
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from core.cors import setup_cors
-from core.logging import configure_logging
+from core.logging import configure_logging, CorrelationIdMiddleware
 from routers.home import router as home_router
+from routers.cache_stats import router as cache_stats_router
 from routers.query import router as query_router
 from routers.store_pdf_in_db import router as store_pdf_router
 from routers.get_escalation_logs import router as get_escalation_logs_router
+from routers.metrics import router as metrics_router
+from services.providers import initialize_providers
 
 
 #Configure logging
@@ -14,16 +21,30 @@ configure_logging()
 
 
 
-application = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Services are built here rather than at import time, off the event loop
+    report = await asyncio.to_thread(initialize_providers)
+    logging.info("Services initialized: %s", report)
+    yield
+
+
+
+application = FastAPI(lifespan=lifespan)
 
 
 
 # Enable CORS
 setup_cors(application)
 
+# Tag every request's log records with its request id
+application.add_middleware(CorrelationIdMiddleware)
+
 
 
 application.include_router(home_router)
 application.include_router(query_router)
 application.include_router(store_pdf_router)
 application.include_router(get_escalation_logs_router)
+application.include_router(cache_stats_router)
+application.include_router(metrics_router)
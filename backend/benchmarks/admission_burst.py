@@ -0,0 +1,180 @@
+"""
+Latency by category when a burst of /query requests arrives at once.
+
+The fixture corpus, shuffled with a fixed seed so that no category arrives first and takes every
+free slot before the queue forms, is replayed as a single burst through the /query endpoint and the real
+LanggraphService, with the fakes from benchmarks/replay.py. OPENAI_MAX_CONCURRENT_REQUESTS is set
+low to stand in for the account's rate limit, which is what the tickets compete for. Two runs:
+
+  unbounded:  no admission limit, every ticket starts its graph immediately (the old behaviour)
+  admission:  services.admission_control with the given in-flight limit, queue bound and lanes
+
+For each category (from the fixture) the completion latency of served tickets and the number shed
+with 429 are reported, along with how often the keyword lane matched the fixture's category.
+Before the burst, ROUTINE_TICKETS are checked to stay out of the security lane; a routine ticket
+that jumps the queue fails the run. So does a security p50 under admission above any other
+category's, since the security lane exists to serve those tickets first.
+
+Usage (from the backend directory):
+    python -m benchmarks.admission_burst --repeat 4 --openai-concurrency 8 --max-in-flight 6
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import argparse
+from types import SimpleNamespace
+
+from benchmarks.replay import DEFAULT_CORPUS, configure_environment, load_corpus, summarize, FakeVectorStore
+from benchmarks.stub_openai import StubOpenAIServer
+
+
+
+# Everyday tickets that share words with security incidents but must keep their own lane
+ROUTINE_TICKETS = [
+    ("technical", "Reset my password", "The password reset email never arrives and the link gives an error"),
+    ("technical", "Can't access the dashboard", "Since this morning the dashboard is not loading for our team"),
+    ("technical", "API access", "Our API key returns 401 errors from the SDK after the upgrade to v2"),
+    ("billing", "Audit of our invoices", "Our finance team needs every invoice and receipt for the annual audit"),
+    ("billing", "Compliance paperwork for payment", "Please send the VAT details our compliance team needs to approve the payment"),
+    ("general", "Access for a new teammate", "How do I invite a colleague to our workspace?"),
+    ("general", "Data processing agreement", "Where can I download your data processing agreement?"),
+    ("security", "Account compromised", "Someone logged in from another country and changed our settings without authorization"),
+    ("security", "Unauthorized charges after a breach", "We think our account was hacked, there are unauthorized API keys"),
+    ("security", "Possible account takeover", "Our admin is locked out and the recovery email was changed"),
+    ("security", "Ex-employee", "A contractor who left last month still has access to our workspace")
+]
+
+
+
+
+
+def check_lanes(controller) -> list:
+    """ROUTINE_TICKETS whose keyword lane differs from the expected one."""
+
+    return [
+        (expected, lane, subject)
+        for expected, subject, description in ROUTINE_TICKETS
+        if (lane := controller.lane_for(subject, description)) != expected
+    ]
+
+
+
+
+
+async def burst(tickets: list) -> list:
+    from fastapi.responses import JSONResponse
+    from routers.query import query
+    from schemas.routes.query import QueryRequest
+
+    async def submit(ticket: dict) -> dict:
+        started = time.perf_counter()
+        response = await query(QueryRequest(subject=ticket["subject"], description=ticket["description"]))
+        shed = isinstance(response, JSONResponse) and response.status_code == 429
+        return {"category": ticket["category"], "shed": shed, "ms": (time.perf_counter() - started) * 1000}
+
+    return await asyncio.gather(*(submit(ticket) for ticket in tickets))
+
+
+
+
+
+def report(name: str, results: list, categories: list) -> dict:
+    """Print and return the served-latency summary of each category."""
+
+    summaries = {}
+    print(f"\n{name}")
+    print(f"{'category':<10} {'served':>7} {'shed':>5} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for category in categories:
+        served = [result["ms"] for result in results if result["category"] == category and not result["shed"]]
+        shed = sum(1 for result in results if result["category"] == category and result["shed"])
+        stats = summaries[category] = summarize(served)
+        print(f"{category:<10} {stats['count']:7d} {shed:5d} {stats['p50']:9.0f} {stats['p95']:9.0f} {stats['max']:9.0f}")
+
+    return summaries
+
+
+
+
+
+async def main(args):
+    from schemas.dataclasses.categories import CATEGORIES
+
+    server = StubOpenAIServer(
+        latency=args.chat_latency, embedding_latency=args.embedding_latency, jitter=0.2,
+        approval_rate=0.8, categories=list(CATEGORIES)
+    )
+    configure_environment(SimpleNamespace(no_cache=True), server)
+    os.environ["OPENAI_MAX_CONCURRENT_REQUESTS"] = str(args.openai_concurrency)
+
+    from core.config import settings
+    from services.providers import openai_service, vector_store, admission_controller
+    from services.admission_control import AdmissionController
+
+    openai_service.embeddings.check_embedding_ctx_length = False
+    # Every shed ticket logs a warning
+    logging.disable(logging.WARNING)
+    vector_store.override(FakeVectorStore(0.02))
+
+    tickets = load_corpus(args.corpus) * args.repeat
+    random.Random(args.seed).shuffle(tickets)
+    lanes = settings.ADMISSION_LANES
+    categories = [lane for lane in lanes if any(ticket["category"] == lane for ticket in tickets)]
+
+    controller = AdmissionController(args.max_in_flight, args.max_queue, args.max_wait, lanes)
+    misrouted = check_lanes(controller)
+    if misrouted:
+        raise SystemExit("Routine tickets in the wrong admission lane: " + "; ".join(
+            f"{subject!r} went to {lane}, expected {expected}" for expected, lane, subject in misrouted
+        ))
+
+    matched = sum(1 for ticket in tickets if controller.lane_for(ticket["subject"], ticket["description"]) == ticket["category"])
+    print(
+        f"{len(tickets)} tickets in one burst, {args.openai_concurrency} concurrent OpenAI requests, "
+        f"chat {args.chat_latency * 1000:.0f} ms; keyword lane matched the category for {matched}/{len(tickets)}"
+    )
+
+    await server.start()
+    try:
+        admission_controller.override(AdmissionController(10**9, 10**9, args.max_wait, lanes))
+        report("unbounded (every ticket starts at once)", await burst(tickets), categories)
+
+        admission_controller.override(controller)
+        admitted = report(
+            f"admission (max in flight {args.max_in_flight}, queue {args.max_queue}, wait {args.max_wait:.0f} s)",
+            await burst(tickets), categories
+        )
+    finally:
+        await server.stop()
+
+    security = admitted.get("security")
+    slower = [
+        category for category, stats in admitted.items()
+        if security and category != "security" and stats["count"] and stats["p50"] < security["p50"]
+    ]
+    if slower:
+        raise SystemExit(
+            f"Security tickets waited longer than {', '.join(slower)} under admission "
+            f"(security p50 {security['p50']:.0f} ms)"
+        )
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=4)
+    parser.add_argument("--chat-latency", type=float, default=0.3)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--openai-concurrency", type=int, default=8, help="Stand-in for the account's rate limit")
+    parser.add_argument("--max-in-flight", type=int, default=6)
+    parser.add_argument("--max-queue", type=int, default=100)
+    parser.add_argument("--max-wait", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the arrival order of the burst")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,137 @@
+"""
+Recall@k against latency for the IVF-PQ index of the local vector store.
+
+Fills a LocalNamespace with ann=True with clustered synthetic unit vectors (documents chunked from
+the same sources sit close together, which random Gaussian vectors would not model). The index is
+trained when the namespace crosses --train-size and every later batch goes through the incremental
+insert path of LocalNamespace.upsert. Queries are noisy copies of stored vectors; exact top-k from
+the flat matrix is the ground truth.
+
+For each (nprobe, rerank) pair it reports recall@k and p50/p99 latency next to exact search, plus
+the resident bytes of the PQ codes against the float32 matrix.
+
+Usage (from the backend directory):
+    python -m benchmarks.ann_recall --size 200000 --dimension 3072 --train-size 20000 --nprobe 4,16,64 --rerank 0,50,200
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+
+
+def clustered_vectors(rng, count: int, dimension: int, centers: np.ndarray, noise: float) -> np.ndarray:
+    vectors = centers[rng.integers(len(centers), size=count)] + noise * rng.standard_normal((count, dimension), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+
+
+
+def summarize(label: str, latencies: list, recall: float):
+    latencies = sorted(latencies)
+    print(
+        f"{label:<26} recall {recall:6.3f}   p50 {statistics.median(latencies) * 1000:8.2f} ms   "
+        f"p99 {latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000:8.2f} ms"
+    )
+
+
+
+
+
+def main(size: int, dimension: int, train_size: int, queries: int, top_k: int, nprobes: list, reranks: list, fill_batch: int):
+    for key in ("OPENAI_API_KEY", "LANGSMITH_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ["ANN_MIN_TRAIN_SIZE"] = str(train_size)
+
+    from services.local_vector_store import LocalNamespace
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(64, size // 100), dimension), dtype=np.float32) / np.sqrt(dimension)
+    noise = 0.6 / dimension ** 0.5
+
+    with tempfile.TemporaryDirectory() as directory:
+        namespace = LocalNamespace(os.path.join(directory, "technical"), dimension, ann=True)
+
+        train_seconds = 0.0
+        insert_seconds = 0.0
+        start = time.perf_counter()
+
+        while namespace.count < size:
+            batch = min(fill_batch, size - namespace.count)
+            offset = namespace.count
+            was_trained = namespace.ann.trained
+
+            batch_start = time.perf_counter()
+            namespace.upsert(
+                ids=[f"chunk-{offset + i}" for i in range(batch)],
+                values=clustered_vectors(rng, batch, dimension, centers, noise),
+                metadata=[{"text": f"chunk {offset + i}"} for i in range(batch)]
+            )
+            elapsed = time.perf_counter() - batch_start
+
+            if namespace.ann.trained and not was_trained:
+                train_seconds += elapsed
+            elif was_trained:
+                insert_seconds += elapsed
+
+        print(f"{size:,} vectors, dimension {dimension}, top_k {top_k}, {queries} queries")
+        print(f"filled in {time.perf_counter() - start:.1f}s (training {train_seconds:.1f}s, incremental inserts {insert_seconds:.1f}s)")
+
+        matrix = namespace.matrix[:size]
+        flat_bytes = size * dimension * 4
+        print(f"resident: flat matrix {flat_bytes / 2 ** 20:.1f} MiB, IVF-PQ {namespace.ann.resident_bytes / 2 ** 20:.1f} MiB "
+              f"({flat_bytes / namespace.ann.resident_bytes:.0f}x smaller)\n")
+
+        sources = rng.integers(size, size=queries)
+        query_vectors = np.asarray(matrix[sources]) + noise * rng.standard_normal((queries, dimension), dtype=np.float32)
+        query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+        truth = []
+        latencies = []
+        for query in query_vectors:
+            query_start = time.perf_counter()
+            scores = matrix @ query
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            latencies.append(time.perf_counter() - query_start)
+            truth.append(set(best.tolist()))
+        summarize("exact", latencies, 1.0)
+
+        for nprobe in nprobes:
+            for rerank in reranks:
+                latencies = []
+                found = 0
+                for query, expected in zip(query_vectors, truth):
+                    query_start = time.perf_counter()
+                    rows, _ = namespace.ann.search(query, top_k, size, nprobe=nprobe, rerank=rerank, matrix=namespace.matrix)
+                    latencies.append(time.perf_counter() - query_start)
+                    found += len(expected & set(rows.tolist()))
+
+                summarize(f"nprobe {nprobe:>4} rerank {rerank:>4}", latencies, found / (queries * top_k))
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--train-size", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--nprobe", default="4,16,64", help="Comma-separated nprobe values")
+    parser.add_argument("--rerank", default="0,50,200", help="Comma-separated rerank shortlist sizes (0 = PQ scores only)")
+    parser.add_argument("--fill-batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    main(
+        args.size, args.dimension, args.train_size, args.queries, args.top_k,
+        [int(value) for value in args.nprobe.split(",")],
+        [int(value) for value in args.rerank.split(",")],
+        args.fill_batch
+    )
@@ -0,0 +1,92 @@
+"""
+Throughput benchmark for the PDF ingestion embedding stage.
+
+Embeds synthetic ~2000-character chunks against a local fake embeddings endpoint, once with
+the old one-request-per-chunk loop (on a sample) and once through IngestionService.ingest, the
+batched, concurrent pipeline that uploads use (into a throwaway local vector store), and reports
+chunks/sec for both.
+
+Usage (from the backend directory):
+    python -m benchmarks.embedding_throughput --chunks 2000 --latency 0.2 --throttle-rate 0.1
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+from langchain.schema import Document
+
+from benchmarks.stub_openai import StubOpenAIServer
+
+
+
+def make_chunks(count: int) -> list:
+    sentence = "To reset your API key open the dashboard, select Settings and choose Regenerate. "
+    return [Document(page_content=f"[{i}] " + sentence * 24, metadata={"page": i // 4}) for i in range(count)]
+
+
+
+
+
+async def main(chunk_count: int, sequential_sample: int, latency: float, throttle_rate: float):
+    server = StubOpenAIServer(latency=latency, throttle_rate=throttle_rate)
+
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["VECTOR_STORE_BACKEND"] = "local"
+    os.environ["LOCAL_VECTOR_STORE_DIR"] = tempfile.mkdtemp()
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("EMBEDDING_RETRY_BASE_DELAY", "0.05")
+    for key in ("OPENAI_API_KEY", "PINECONE_API_KEY", "LANGSMITH_API_KEY", "PINECONE_INDEX_NAME"):
+        os.environ.setdefault(key, "benchmark")
+
+    from core.config import settings
+    from services.providers import openai_service, ingestion_service
+    from utils.file_operations import batch_by_token_budget
+
+    # The fake endpoint takes raw strings; skip client-side tokenization against tiktoken's remote vocab.
+    openai_service.embeddings.check_embedding_ctx_length = False
+
+    chunks = make_chunks(chunk_count)
+
+    await server.start()
+    try:
+        start = time.perf_counter()
+        for chunk in chunks[:sequential_sample]:
+            # One request per chunk, through the same rate limiting and retries as the batched path
+            await openai_service.embed_batch([chunk.page_content])
+        sequential_rate = sequential_sample / (time.perf_counter() - start)
+
+        server.throttled_count = 0
+        result = await ingestion_service.ingest(chunks, "manual.pdf", "general")
+
+    finally:
+        await server.stop()
+
+    if result["status"] != "success":
+        raise RuntimeError(result["message"])
+    batched_elapsed = result["timings"]["embedding"]["wall_seconds"]
+
+    batches = batch_by_token_budget([chunk.page_content for chunk in chunks])
+    print(f"chunks                 : {chunk_count} in {len(batches)} batches "
+          f"(<= {settings.EMBEDDING_BATCH_MAX_TOKENS} tokens, <= {settings.EMBEDDING_BATCH_MAX_SIZE} inputs, "
+          f"{settings.EMBEDDING_BATCH_CONCURRENCY} concurrent)")
+    print(f"per-chunk sequential   : {sequential_rate:.1f} chunks/s (sample of {sequential_sample})")
+    print(f"batched concurrent     : {result['total_chunks'] / batched_elapsed:.1f} chunks/s "
+          f"({batched_elapsed:.2f}s embedding, {result['timings']['total_seconds']:.2f}s with upserts)")
+    print(f"throttled responses    : {server.throttled_count}")
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--sequential-sample", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds the fake endpoint waits before answering")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.chunks, args.sequential_sample, args.latency, args.throttle_rate))
@@ -0,0 +1,170 @@
+"""
+Peak memory of PDF ingestion as the document grows.
+
+Synthetic text PDFs of increasing page counts are ingested two ways, and the peak Python heap
+(tracemalloc) of each is reported:
+
+  buffered:  the previous upload path: the file is read into memory and PyPDFLoader.load()
+             materializes every page before ingestion starts
+  streaming: utils.file_operations.iter_pdf_pages parses pages as ingestion pulls them
+
+Both feed IngestionService.ingest end to end, against a local fake OpenAI endpoint and the local
+vector store, so the embedding batches in flight add the same fixed amount to both. The buffered
+peak grows with the page count; the streaming peak levels off.
+
+Usage (from the backend directory):
+    python -m benchmarks.ingestion_memory --pages 50 200 800
+"""
+
+import gc
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+
+from benchmarks.stub_openai import StubOpenAIServer
+
+
+
+LINE = "To reset your API key open the dashboard, select Settings and choose Regenerate."
+
+
+
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 45):
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")
+    })
+
+    for page_number in range(pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+
+        operators = ["BT", "/F1 9 Tf", "11 TL", "40 760 Td"]
+        operators += [f"([{page_number}.{line}] {LINE}) Tj T*" for line in range(lines_per_page)]
+        operators.append("ET")
+
+        contents = DecodedStreamObject()
+        contents.set_data("\n".join(operators).encode())
+        page.replace_contents(contents)
+
+    with open(path, "wb") as pdf_file:
+        writer.write(pdf_file)
+
+
+
+
+
+async def ingest(documents, ingestion_service) -> int:
+    result = await ingestion_service.ingest(documents, "manual.pdf", "general")
+    if result["status"] != "success":
+        raise RuntimeError(result["message"])
+    return result["total_chunks"]
+
+
+
+
+
+async def buffered(path: str, ingestion_service) -> int:
+    from langchain_community.document_loaders import PyPDFLoader
+
+    with open(path, "rb") as pdf_file:
+        content = pdf_file.read()
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+        temp_file.write(content)
+
+    try:
+        return await ingest(PyPDFLoader(temp_file.name).load(), ingestion_service)
+    finally:
+        os.unlink(temp_file.name)
+
+
+
+
+
+async def streaming(path: str, ingestion_service) -> int:
+    from utils.file_operations import iter_pdf_pages
+
+    return await ingest(iter_pdf_pages(path, "manual.pdf"), ingestion_service)
+
+
+
+
+
+async def measure(run) -> tuple:
+    gc.collect()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+
+    chunks = await run()
+
+    return chunks, (tracemalloc.get_traced_memory()[1] - baseline) / 2**20, time.perf_counter() - started
+
+
+
+
+
+async def main(page_counts: list):
+    server = StubOpenAIServer(latency=0.01)
+
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["VECTOR_STORE_BACKEND"] = "local"
+    os.environ["LOCAL_VECTOR_STORE_DIR"] = tempfile.mkdtemp()
+    for key in ("OPENAI_API_KEY", "LANGSMITH_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+
+    from services.providers import openai_service, ingestion_service
+
+    # The fake endpoint takes raw strings; skip client-side tokenization against tiktoken's remote vocab.
+    openai_service.embeddings.check_embedding_ctx_length = False
+
+    directory = tempfile.mkdtemp()
+    await server.start()
+    tracemalloc.start()
+    try:
+        # Warm up imports and clients so they are not counted against the first size
+        warmup = os.path.join(directory, "warmup.pdf")
+        make_pdf(warmup, 2)
+        await buffered(warmup, ingestion_service)
+        await streaming(warmup, ingestion_service)
+
+        print(f"{'pages':>6} {'MB':>6} {'chunks':>7} {'buffered peak':>14} {'streaming peak':>15} {'buffered s':>11} {'streaming s':>12}")
+        for pages in page_counts:
+            path = os.path.join(directory, f"{pages}.pdf")
+            make_pdf(path, pages)
+
+            chunks, buffered_peak, buffered_seconds = await measure(lambda: buffered(path, ingestion_service))
+            _, streaming_peak, streaming_seconds = await measure(lambda: streaming(path, ingestion_service))
+
+            print(
+                f"{pages:6d} {os.path.getsize(path) / 2**20:6.1f} {chunks:7d} {buffered_peak:11.1f} MB "
+                f"{streaming_peak:12.1f} MB {buffered_seconds:11.2f} {streaming_seconds:12.2f}"
+            )
+
+    finally:
+        tracemalloc.stop()
+        await server.stop()
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 200, 800])
+    args = parser.parse_args()
+
+    asyncio.run(main(args.pages))
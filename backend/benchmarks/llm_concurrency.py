@@ -0,0 +1,85 @@
+"""
+Load benchmark for the OpenAI request path of /query.
+
+Runs the classify -> embed -> draft -> review call sequence of a ticket against a local
+stub chat-completions server, first for a single ticket and then for N tickets at once.
+With a non-blocking request path N tickets should finish in roughly the time of one.
+
+Usage (from the backend directory):
+    python -m benchmarks.llm_concurrency --tickets 20 --latency 0.5
+"""
+
+import os
+import time
+import asyncio
+import argparse
+
+from benchmarks.stub_openai import StubOpenAIServer
+
+
+
+async def run_ticket(openai_service, categories, subject: str, description: str):
+    """Issue the same OpenAI calls, in the same order, as one pass through the ticket workflow."""
+
+    await openai_service.classify_ticket(
+        text=description,
+        technical=categories["technical"],
+        billing=categories["billing"],
+        security=categories["security"],
+        general=categories["general"],
+        subject=subject,
+        description=description
+    )
+    await openai_service.embed_query(f"{subject} {description}")
+    draft = await openai_service.draft_response(category="general", subject=subject, description=description, context="")
+    await openai_service.draft_reviewer(category="general", subject=subject, description=description, draft_response=draft["message"])
+
+
+
+
+
+async def main(tickets: int, latency: float):
+    server = StubOpenAIServer(latency=latency)
+
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    for key in ("OPENAI_API_KEY", "PINECONE_API_KEY", "LANGSMITH_API_KEY", "PINECONE_INDEX_NAME"):
+        os.environ.setdefault(key, "benchmark")
+
+    from services.providers import openai_service
+    from schemas.dataclasses.categories import CATEGORIES
+
+    await server.start()
+    try:
+        # Warm up connection pools so they are not counted against the single ticket run.
+        await run_ticket(openai_service, CATEGORIES, "warmup", "warmup")
+
+        start = time.perf_counter()
+        await run_ticket(openai_service, CATEGORIES, "Login issue", "I cannot log in to my account")
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            run_ticket(openai_service, CATEGORIES, f"Login issue {i}", "I cannot log in to my account")
+            for i in range(tickets)
+        ])
+        concurrent = time.perf_counter() - start
+
+    finally:
+        await server.stop()
+
+    print(f"stub latency per call : {latency:.3f}s")
+    print(f"1 ticket              : {single:.3f}s")
+    print(f"{tickets} tickets concurrent : {concurrent:.3f}s ({concurrent / single:.2f}x single)")
+    print(f"throughput            : {tickets / concurrent:.2f} tickets/s")
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds the stub server waits before answering")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.tickets, args.latency))
@@ -0,0 +1,95 @@
+"""
+Search latency of the local vector store backend at increasing namespace sizes.
+
+Fills a temporary LocalVectorStore namespace with random unit vectors (in bulk, through
+LocalNamespace.upsert) and reports single-query p50/p99 latency of LocalVectorStore.search and
+the resident size of the matrix at each size.
+
+At the production dimension of 3072 a million chunks is ~12 GB of float32 on disk; pass a smaller
+--dimension to explore the scaling curve on a laptop.
+
+Usage (from the backend directory):
+    python -m benchmarks.local_vector_search --sizes 10000,100000,1000000 --dimension 3072 --queries 50
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+
+
+async def measure(store, namespace: str, dimension: int, queries: int, top_k: int) -> list:
+    rng = np.random.default_rng(1)
+    latencies = []
+
+    for _ in range(queries):
+        query = rng.standard_normal(dimension).astype(np.float32).tolist()
+
+        start = time.perf_counter()
+        response = await store.search(query, namespace, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+
+        assert response["status"] == "success" and len(response["data"]) == top_k
+
+    return sorted(latencies)
+
+
+
+
+
+async def main(sizes: list, dimension: int, queries: int, top_k: int, fill_batch: int):
+    for key in ("OPENAI_API_KEY", "LANGSMITH_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ["VECTOR_STORE_BACKEND"] = "local"
+
+    from services.local_vector_store import LocalVectorStore
+
+    rng = np.random.default_rng(0)
+
+    print(f"dimension {dimension}, top_k {top_k}, {queries} queries per size")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalVectorStore(directory=directory, embedding_dimension=dimension)
+        namespace = store._namespace("technical", create=True)
+
+        for size in sorted(sizes):
+            start = time.perf_counter()
+            while namespace.count < size:
+                batch = min(fill_batch, size - namespace.count)
+                offset = namespace.count
+                namespace.upsert(
+                    ids=[f"chunk-{offset + i}" for i in range(batch)],
+                    values=rng.standard_normal((batch, dimension), dtype=np.float32),
+                    metadata=[{"text": f"chunk {offset + i}"} for i in range(batch)]
+                )
+            fill_seconds = time.perf_counter() - start
+
+            # One untimed query pages the matrix in, as a warm process would have it
+            await measure(store, "technical", dimension, 1, top_k)
+            latencies = await measure(store, "technical", dimension, queries, top_k)
+
+            print(
+                f"{size:>10,} chunks   p50 {statistics.median(latencies) * 1000:9.2f} ms   "
+                f"p99 {latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000:9.2f} ms   "
+                f"matrix {size * dimension * 4 / 2 ** 20:9.1f} MiB   (filled in {fill_seconds:.1f}s)"
+            )
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated namespace sizes")
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--fill-batch", type=int, default=10000)
+    args = parser.parse_args()
+
+    asyncio.run(main([int(size) for size in args.sizes.split(",")], args.dimension, args.queries, args.top_k, args.fill_batch))
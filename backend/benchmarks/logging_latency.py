@@ -0,0 +1,160 @@
+"""
+Event-loop latency of application logging under load.
+
+Concurrent simulated tickets each log a record per step and yield to the loop between steps, while
+a monitor task measures how late its 1 ms sleeps wake up (loop lag). Two setups are compared, each
+in a fresh interpreter:
+
+  blocking:  the previous configuration, logging.basicConfig with a FileHandler that formats and
+             writes every record on the calling thread, i.e. on the event loop
+  queued:    core.logging.configure_logging, where callers only enqueue and a listener thread
+             formats JSON and writes the rotating file
+
+--write-delay-ms adds a sleep to every file write to model a slow or contended log volume
+(network storage, a busy disk, a throttled container log driver); with 0 the writes land in the
+page cache.
+
+Usage (from the backend directory):
+    python -m benchmarks.logging_latency --tickets 200 --steps 50 --write-delay-ms 0 0.2 1
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+
+
+
+def slow_down(handler: logging.Handler, delay: float):
+    emit = handler.emit
+
+    def slow_emit(record):
+        time.sleep(delay)
+        emit(record)
+
+    handler.emit = slow_emit
+
+
+
+
+
+async def load(tickets: int, steps: int) -> dict:
+    lags = []
+    log_seconds = 0.0
+    running = True
+
+    async def monitor():
+        while running:
+            expected = time.perf_counter() + 0.001
+            await asyncio.sleep(0.001)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    async def ticket(number: int):
+        nonlocal log_seconds
+        for step in range(steps):
+            started = time.perf_counter()
+            logging.info("Ticket %d step %d: retrieved %d of %d candidate documents", number, step, 5, 15)
+            log_seconds += time.perf_counter() - started
+            await asyncio.sleep(0.002)
+
+    watcher = asyncio.create_task(monitor())
+    started = time.perf_counter()
+    await asyncio.gather(*(ticket(number) for number in range(tickets)))
+    elapsed = time.perf_counter() - started
+    running = False
+    await watcher
+
+    lags.sort()
+    return {
+        "elapsed_seconds": elapsed,
+        "log_call_us": log_seconds / (tickets * steps) * 1e6,
+        "lag_p50_ms": lags[len(lags) // 2] * 1000,
+        "lag_p99_ms": lags[int(len(lags) * 0.99)] * 1000,
+        "lag_max_ms": lags[-1] * 1000
+    }
+
+
+
+
+
+def measure(mode: str, tickets: int, steps: int, delay: float) -> dict:
+    directory = tempfile.mkdtemp()
+
+    if mode == "blocking":
+        logging.basicConfig(
+            filename=os.path.join(directory, "app.log"),
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s - %(message)s"
+        )
+        slow_down(logging.getLogger().handlers[0], delay)
+        result = asyncio.run(load(tickets, steps))
+        result["drain_seconds"] = 0.0
+        result["dropped"] = 0
+        return result
+
+    os.environ["LOGGING_DIR"] = directory
+    from core.logging import configure_logging, shutdown_logging
+
+    listener = configure_logging()
+    slow_down(listener.handlers[0], delay)
+    queue_handler = logging.getLogger().handlers[0]
+
+    result = asyncio.run(load(tickets, steps))
+
+    # Records still queued when the load ends are written after the fact, off the loop
+    started = time.perf_counter()
+    shutdown_logging()
+    result["drain_seconds"] = time.perf_counter() - started
+    result["dropped"] = queue_handler.dropped
+    return result
+
+
+
+
+
+def main(tickets: int, steps: int, delays: list):
+    print(f"{tickets} concurrent tickets x {steps} log records, monitor sleeping 1 ms")
+    print(f"{'mode':<9} {'write ms':>8} {'elapsed s':>10} {'log call':>10} {'lag p50':>9} {'lag p99':>9} {'lag max':>9} {'drain s':>8} {'dropped':>8}")
+
+    env = dict(os.environ)
+    for key in ("OPENAI_API_KEY", "LANGSMITH_API_KEY"):
+        env.setdefault(key, "benchmark")
+
+    for delay in delays:
+        for mode in ("blocking", "queued"):
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.logging_latency", "--worker", mode,
+                    "--tickets", str(tickets), "--steps", str(steps), "--write-delay-ms", str(delay)
+                ],
+                capture_output=True, text=True, env=env, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+
+            print(
+                f"{mode:<9} {delay:8.2f} {result['elapsed_seconds']:10.2f} {result['log_call_us']:7.1f} us "
+                f"{result['lag_p50_ms']:6.2f} ms {result['lag_p99_ms']:6.2f} ms {result['lag_max_ms']:6.1f} ms "
+                f"{result['drain_seconds']:8.2f} {result['dropped']:8d}"
+            )
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--write-delay-ms", type=float, nargs="+", default=[0.0, 0.2, 1.0])
+    parser.add_argument("--worker", choices=("blocking", "queued"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.tickets, args.steps, args.write_delay_ms[0] / 1000)))
+    else:
+        main(args.tickets, args.steps, args.write_delay_ms)
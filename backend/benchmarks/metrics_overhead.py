@@ -0,0 +1,138 @@
+"""
+Cost of the metrics instrumentation in each METRICS_MODE.
+
+For every mode a fresh interpreter (METRICS_MODE is read at import) times:
+
+  node:    one call of an instrumented no-op LangGraph node (async and sync) minus the bare call
+  update:  one Histogram.observe and one Counter.inc with labels
+  ticket:  the instrumentation a typical ticket triggers (9 node timings, 5 OpenAI calls with token
+           counters, 1 vector store search, the ticket outcome), i.e. its added CPU time
+  render:  one /metrics scrape with that ticket's series populated
+
+Usage (from the backend directory):
+    python -m benchmarks.metrics_overhead --iterations 200000
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+
+
+
+NODES = ("classify", "embed", "check_cache", "retrieve", "draft", "review", "finalize", "refine", "escalate")
+OPERATIONS = ("classify", "draft", "review", "embed_query", "embed_batch")
+
+
+
+
+
+def per_call(function, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started) / iterations
+
+
+
+
+
+async def per_await(function, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await function({})
+    return (time.perf_counter() - started) / iterations
+
+
+
+
+
+def measure(iterations: int) -> dict:
+    from core import metrics as m
+
+    async def async_node(state):
+        return state
+
+    def sync_node(state):
+        return state
+
+    instrumented_async = m.instrument_node("draft", async_node)
+    instrumented_sync = m.instrument_node("check_cache", sync_node)
+
+    bare_async = asyncio.run(per_await(async_node, iterations))
+    node_async = asyncio.run(per_await(instrumented_async, iterations)) - bare_async
+    node_sync = per_call(lambda: instrumented_sync({}), iterations) - per_call(lambda: sync_node({}), iterations)
+
+    observe = per_call(lambda: m.OPENAI_SECONDS.observe(0.42, "draft", "gpt-4.1-mini"), iterations)
+    increment = per_call(lambda: m.OPENAI_TOKENS.inc("draft", "gpt-4.1-mini", "prompt", amount=812), iterations)
+
+    def ticket():
+        for node in NODES[:7]:
+            m.NODE_SECONDS.observe(0.1, node)
+        for operation in OPERATIONS:
+            m.OPENAI_SECONDS.observe(0.3, operation, "gpt-4.1-mini")
+            m.OPENAI_REQUESTS.inc(operation, "gpt-4.1-mini", "success")
+            m.OPENAI_TOKENS.inc(operation, "gpt-4.1-mini", "prompt", amount=800)
+            m.OPENAI_TOKENS.inc(operation, "gpt-4.1-mini", "completion", amount=120)
+        m.VECTOR_STORE_SECONDS.observe(0.05, "pinecone", "search")
+        m.VECTOR_STORE_REQUESTS.inc("pinecone", "search", "success")
+        m.finish_ticket(m.start_ticket(), {"review_attempts": 1})
+
+    import logging
+    logging.disable(logging.INFO)
+
+    per_ticket = per_call(ticket, max(1, iterations // 20))
+    render = per_call(m.metrics.render, max(1, iterations // 2000)) if m.metrics.enabled else 0.0
+
+    return {
+        "node_async_us": node_async * 1e6,
+        "node_sync_us": node_sync * 1e6,
+        "observe_us": observe * 1e6,
+        "inc_us": increment * 1e6,
+        # The wrapper overhead of the nine nodes on top of the explicit updates above
+        "ticket_us": per_ticket * 1e6 + 7 * max(node_async, 0.0) * 1e6,
+        "render_ms": render * 1e3,
+        "render_bytes": len(m.metrics.render()) if m.metrics.enabled else 0
+    }
+
+
+
+
+
+def main(iterations: int):
+    print(f"{'mode':<9} {'node async':>11} {'node sync':>10} {'observe':>8} {'inc':>8} {'per ticket':>11} {'scrape':>9}")
+
+    for mode in ("off", "basic", "detailed"):
+        env = dict(os.environ, METRICS_MODE=mode)
+        for key in ("OPENAI_API_KEY", "LANGSMITH_API_KEY"):
+            env.setdefault(key, "benchmark")
+
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.metrics_overhead", "--iterations", str(iterations), "--worker"],
+            capture_output=True, text=True, env=env, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        print(
+            f"{mode:<9} {result['node_async_us']:8.2f} us {result['node_sync_us']:7.2f} us "
+            f"{result['observe_us']:5.2f} us {result['inc_us']:5.2f} us {result['ticket_us']:8.1f} us "
+            f"{result['render_ms']:6.2f} ms"
+        )
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.iterations)))
+    else:
+        main(args.iterations)
@@ -0,0 +1,134 @@
+"""
+Timing benchmark for running classification and query embedding as parallel graph branches.
+
+Processes tickets through the real LanggraphService graph and through a linear baseline graph
+built from the same nodes (classify -> embed -> retrieve -> draft -> review -> finalize),
+against a local stub OpenAI server and an in-process fake Pinecone index. The semantic
+response cache is disabled so every ticket takes the full path.
+
+Usage (from the backend directory):
+    python -m benchmarks.parallel_prelude --tickets 10 --chat-latency 0.4 --embedding-latency 0.25
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from types import SimpleNamespace
+
+from benchmarks.stub_openai import StubOpenAIServer
+
+
+
+class FakeIndex:
+    def query(self, vector, top_k, include_metadata, namespace):
+        return SimpleNamespace(matches=[
+            SimpleNamespace(id=f"{namespace}-{i}", metadata={"text": f"{namespace} knowledge base chunk {i}"}, score=0.9) for i in range(top_k)
+        ])
+
+
+
+
+
+def build_sequential_graph(service):
+    """The pre-change topology: embedding waits for classification to finish."""
+
+    from langgraph.graph import StateGraph, START, END
+    from schemas.dataclasses.langgraph_state import LanggraphState
+
+    workflow = StateGraph(LanggraphState)
+    workflow.add_node("classify", service._classify_ticket)
+    workflow.add_node("embed", service._embed_query)
+    workflow.add_node("retrieve", service._retrieve_documents)
+    workflow.add_node("draft", service._draft_response)
+    workflow.add_node("review", service._review_response)
+    workflow.add_node("finalize", service._finalize_response)
+
+    workflow.add_edge(START, "classify")
+    workflow.add_edge("classify", "embed")
+    workflow.add_edge("embed", "retrieve")
+    workflow.add_edge("retrieve", "draft")
+    workflow.add_edge("draft", "review")
+    workflow.add_edge("review", "finalize")
+    workflow.add_edge("finalize", END)
+
+    return workflow.compile()
+
+
+
+
+
+async def time_tickets(graph, tickets: int) -> list:
+    durations = []
+    for i in range(tickets):
+        state = {
+            "subject": f"API errors {i}",
+            "description": f"Requests to the v2 endpoint fail with 502 (run {i})",
+            "category": "",
+            "retrieved_docs": [],
+            "draft_response": "",
+            "review_result": {},
+            "review_attempts": 0,
+            "final_response": "",
+            "escalated": False,
+            "query_embedding": [],
+            "cache_hit": False
+        }
+
+        start = time.perf_counter()
+        await graph.ainvoke(state)
+        durations.append(time.perf_counter() - start)
+
+    return durations
+
+
+
+
+
+async def main(tickets: int, chat_latency: float, embedding_latency: float):
+    server = StubOpenAIServer(latency=chat_latency, embedding_latency=embedding_latency)
+
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("PINECONE_INDEX_HOST", "https://benchmark-index.svc.pinecone.io")
+    for key in ("OPENAI_API_KEY", "PINECONE_API_KEY", "LANGSMITH_API_KEY", "PINECONE_INDEX_NAME"):
+        os.environ.setdefault(key, "benchmark")
+
+    from services.providers import openai_service, vector_store, langgraph_service
+
+    # The stub takes raw strings; skip client-side tokenization against tiktoken's remote vocab.
+    openai_service.embeddings.check_embedding_ctx_length = False
+    vector_store.index = FakeIndex()
+
+    sequential_graph = build_sequential_graph(langgraph_service)
+
+    await server.start()
+    try:
+        await time_tickets(langgraph_service.graph, 1)
+        sequential = await time_tickets(sequential_graph, tickets)
+        parallel = await time_tickets(langgraph_service.graph, tickets)
+    finally:
+        await server.stop()
+
+    sequential_p50 = statistics.median(sequential)
+    parallel_p50 = statistics.median(parallel)
+
+    print(f"stub latency: chat {chat_latency * 1000:.0f} ms, embeddings {embedding_latency * 1000:.0f} ms, {tickets} tickets")
+    print(f"sequential classify -> embed : p50 {sequential_p50 * 1000:8.1f} ms")
+    print(f"parallel classify || embed   : p50 {parallel_p50 * 1000:8.1f} ms")
+    print(f"saved per ticket             : {(sequential_p50 - parallel_p50) * 1000:8.1f} ms")
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=10)
+    parser.add_argument("--chat-latency", type=float, default=0.4)
+    parser.add_argument("--embedding-latency", type=float, default=0.25)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.tickets, args.chat_latency, args.embedding_latency))
@@ -0,0 +1,110 @@
+"""
+CPU spent preparing the LLM calls of one ticket, before and after caching.
+
+A ticket that goes through classify, draft and review renders three prompts and, for
+classification and review, needs a structured-output runnable. This compares:
+
+  uncached: llm.with_structured_output(schema) per call and the old multi-pass str.replace renderer
+  cached:   OpenAIService's prebuilt runnables and the single-pass compiled templates
+
+No requests are sent; only the client-side preparation is timed, with time.process_time so the
+numbers are CPU rather than wall time. The drafted context is a realistic ~6k-token string.
+
+Usage (from the backend directory):
+    python -m benchmarks.prompt_overhead --tickets 2000
+"""
+
+import os
+import json
+import time
+import argparse
+
+from pydantic import BaseModel
+
+
+
+def legacy_replacer(prompt: str, **kwargs) -> str:
+    """The renderer OpenAIService used before templates were compiled, kept here as the baseline."""
+
+    for key, value in kwargs.items():
+        placeholder = f"{{{key}}}"
+
+        if placeholder not in prompt:
+            continue
+
+        if isinstance(value, str):
+            replacement = value
+        elif isinstance(value, (dict, list)):
+            replacement = json.dumps(value, ensure_ascii=False, indent=4)
+        elif isinstance(value, BaseModel):
+            replacement = json.dumps(value.model_dump(), ensure_ascii=False, indent=4)
+        else:
+            try:
+                replacement = json.dumps(value, ensure_ascii=False, indent=4)
+            except TypeError:
+                replacement = str(value)
+
+        prompt = prompt.replace(placeholder, replacement)
+
+    return prompt
+
+
+
+
+
+def main(tickets: int):
+    for key in ("OPENAI_API_KEY", "LANGSMITH_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+
+    from services.providers import openai_service
+    from schemas.dataclasses.categories import CATEGORIES
+    from schemas.structured_outputs.ticket_reviewer import TicketReviewerSchema
+    from schemas.structured_outputs.ticket_classification import TicketClassificationSchema
+    from services.prompt_templates import TICKET_CLASSIFICAION_PROMPT, DRAFT_RESPONSE_PROMPT, REVIEW_PROMPT
+
+    subject = "Cannot log in after password reset"
+    description = "Since resetting my password yesterday the login page keeps saying my session expired. " * 3
+    context = "Account recovery steps: clear cookies, request a new reset link, check the spam folder. " * 270
+    draft = "Thank you for reaching out. Please clear your browser cookies and request a new reset link. " * 6
+
+    def prepare(render, structured_llm):
+        render(TICKET_CLASSIFICAION_PROMPT, **CATEGORIES, subject=subject, description=description)
+        structured_llm(TicketClassificationSchema)
+        render(DRAFT_RESPONSE_PROMPT, category="technical", subject=subject, description=description, context=context)
+        render(REVIEW_PROMPT, category="technical", subject=subject, description=description, draft_response=draft)
+        structured_llm(TicketReviewerSchema)
+
+    variants = {
+        "uncached": (legacy_replacer, openai_service.llm.with_structured_output),
+        "cached": (openai_service._replacer, openai_service._structured_llm)
+    }
+
+    # Outputs must be identical for the comparison to mean anything
+    assert legacy_replacer(REVIEW_PROMPT, category="x", subject=subject, description=description, draft_response=draft) == \
+        openai_service._replacer(REVIEW_PROMPT, category="x", subject=subject, description=description, draft_response=draft)
+
+    results = {}
+    for name, (render, structured_llm) in variants.items():
+        prepare(render, structured_llm)
+
+        start = time.process_time()
+        for _ in range(tickets):
+            prepare(render, structured_llm)
+        results[name] = (time.process_time() - start) / tickets
+
+        print(f"{name:<9} {results[name] * 1e6:9.1f} us CPU per ticket")
+
+    saved = results["uncached"] - results["cached"]
+    print(f"saved     {saved * 1e6:9.1f} us CPU per ticket ({results['uncached'] / results['cached']:.1f}x)")
+    print(f"at 100 tickets/s that is {saved * 100 * 100:.1f}% of one core")
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=2000)
+    args = parser.parse_args()
+
+    main(args.tickets)
@@ -0,0 +1,142 @@
+"""
+Live ticket latency and 429s while an ingestion job saturates the OpenAI rate limit.
+
+The stub OpenAI server enforces a per-model requests-per-second limit and answers 429 beyond it.
+For --seconds, live tickets arrive at --live-rate per second (embed_query, then a draft call) while
+ingestion workers embed batches back to back, all through one OpenAIService. Two runs:
+
+  retry only:  no client-side limit; throttled calls back off with jitter and retry
+  limiter:     OPENAI_RATE_LIMITS set to 90% of the server's limit, ingestion as background traffic
+
+Reported: live latency percentiles and failures, ingestion batches embedded, 429 responses and retries.
+
+Usage (from the backend directory):
+    python -m benchmarks.rate_limit_storm --server-rps 20 --live-rate 6 --seconds 10
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+
+from benchmarks.stub_openai import StubOpenAIServer
+
+
+
+async def workload(service, seconds: float, live_rate: float, ingestion_workers: int) -> dict:
+    live_ms, live_failures = [], 0
+    ingested, ingestion_failures = 0, 0
+    deadline = time.perf_counter() + seconds
+    # Its own generator, so both runs see the same arrivals whatever else draws random numbers
+    arrivals = random.Random(7)
+
+    async def ticket(number: int):
+        nonlocal live_failures
+        started = time.perf_counter()
+        embedding = await service.embed_query(f"Live ticket {number}: webhook deliveries stopped")
+        draft = await service.draft_response("technical", f"Ticket {number}", "Webhooks stopped", "context")
+        if not embedding or draft["status"] != "success":
+            live_failures += 1
+        else:
+            live_ms.append((time.perf_counter() - started) * 1000)
+
+    async def live():
+        tickets, number = [], 0
+        while time.perf_counter() < deadline:
+            tickets.append(asyncio.create_task(ticket(number)))
+            number += 1
+            await asyncio.sleep(arrivals.expovariate(live_rate))
+        await asyncio.gather(*tickets)
+
+    async def ingest(worker: int):
+        nonlocal ingested, ingestion_failures
+        batch = 0
+        while time.perf_counter() < deadline:
+            try:
+                await service.embed_batch([f"Manual chunk {worker}.{batch}.{i}" for i in range(16)])
+                ingested += 1
+            except Exception:
+                ingestion_failures += 1
+            batch += 1
+
+    await asyncio.gather(live(), *(ingest(worker) for worker in range(ingestion_workers)))
+
+    live_ms.sort()
+    pick = lambda fraction: live_ms[min(len(live_ms) - 1, int(len(live_ms) * fraction))] if live_ms else 0.0
+    return {
+        "live": len(live_ms) + live_failures, "live_failed": live_failures,
+        "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+        "ingested": ingested, "ingestion_failed": ingestion_failures
+    }
+
+
+
+
+
+async def main(args):
+    server = StubOpenAIServer(latency=args.chat_latency, embedding_latency=args.embedding_latency, requests_per_second=args.server_rps)
+
+    rpm = int(args.server_rps * 60 * 0.9)
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    os.environ["EMBEDDING_RETRY_BASE_DELAY"] = "0.2"
+    os.environ["OPENAI_RATE_LIMIT_BURST_SECONDS"] = "1"
+    os.environ["OPENAI_RATE_LIMITS"] = json.dumps({
+        model: {"rpm": rpm, "tpm": 10**9} for model in ("gpt-4.1-mini", "text-embedding-3-large")
+    })
+    for key in ("OPENAI_API_KEY", "LANGSMITH_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+
+    from core.metrics import OPENAI_RETRIES
+    from services.providers import openai_service
+    from services.rate_limiter import build_rate_limiters
+
+    # The stub takes raw strings; skip client-side tokenization against tiktoken's remote vocab.
+    openai_service.embeddings.check_embedding_ctx_length = False
+    # Throttled and failed calls log a line each
+    logging.disable(logging.ERROR)
+
+    print(
+        f"server limit {args.server_rps:.0f} req/s per model, {args.live_rate:.0f} live tickets/s, "
+        f"{args.ingestion_workers} ingestion workers, {args.seconds:.0f} s"
+    )
+    print(f"{'mode':<11} {'live':>5} {'failed':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'batches':>8} {'429s':>6} {'retries':>8}")
+
+    await server.start()
+    try:
+        for mode, limiters in (("retry only", {}), ("limiter", build_rate_limiters())):
+            openai_service.rate_limiters = limiters
+            server.throttled_count = 0
+            server.buckets.clear()
+            OPENAI_RETRIES.series.clear()
+
+            result = await workload(openai_service, args.seconds, args.live_rate, args.ingestion_workers)
+            retries = sum(OPENAI_RETRIES.series.values())
+
+            print(
+                f"{mode:<11} {result['live']:5d} {result['live_failed']:7d} {result['p50']:8.0f} {result['p95']:8.0f} "
+                f"{result['p99']:8.0f} {result['ingested']:8d} {server.throttled_count:6d} {retries:8d}"
+            )
+            # Let in-flight backoffs and buckets settle between runs
+            await asyncio.sleep(2)
+    finally:
+        await server.stop()
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server-rps", type=float, default=20)
+    parser.add_argument("--live-rate", type=float, default=6)
+    parser.add_argument("--ingestion-workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--chat-latency", type=float, default=0.2)
+    parser.add_argument("--embedding-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,382 @@
+"""
+End-to-end offline benchmark: replay a ticket corpus through the real LanggraphService.
+
+Every ticket runs the production path (BatchService -> LanggraphService graph -> OpenAIService,
+semantic cache, context assembler, pre-review, escalation store) with the external backends
+replaced by deterministic fakes that inject latency:
+
+  LLM and embeddings:  benchmarks/stub_openai.py over HTTP, answers derived from the request so
+                       classifications, review verdicts and therefore graph paths repeat run to run
+  vector store:        FakeVectorStore below, a seeded in-process knowledge base
+
+The corpus is JSONL in the batch format ({"id", "subject", "description"}, as in
+benchmarks/fixtures/tickets.jsonl) or a CSV with subject/description columns like escalation.csv.
+Reported: throughput, end-to-end and per-node p50/p95/p99, OpenAI calls per operation, ticket
+outcomes and memory. Runs saved with --output can be compared with --compare.
+
+Usage (from the backend directory):
+    python -m benchmarks.replay --repeat 4 --concurrency 8 --output runs/before.json
+    python -m benchmarks.replay --repeat 4 --concurrency 8 --output runs/after.json
+    python -m benchmarks.replay --compare runs/before.json runs/after.json
+"""
+
+import os
+import gc
+import csv
+import sys
+import json
+import zlib
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.stub_openai import StubOpenAIServer
+from services.base_vector_store import VectorStore
+
+
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "tickets.jsonl")
+
+VOCABULARY = (
+    "account admin console workspace invoice payment refund plan seat token session browser cache "
+    "endpoint request response timeout retry webhook export import report permission role audit "
+    "password reset device region quota limit upgrade downgrade renewal receipt integration setting "
+    "notification schedule backup restore sync release version network certificate domain policy"
+).split()
+
+
+
+def load_corpus(path: str) -> list:
+    """Tickets from a batch-format JSONL file or a CSV with subject and description columns."""
+
+    with open(path, encoding="utf-8", newline="") as corpus_file:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(corpus_file))
+        else:
+            rows = [json.loads(line) for line in corpus_file if line.strip()]
+
+    return [
+        {
+            "id": row.get("id") or str(index), "subject": row["subject"], "description": row["description"],
+            "category": (row.get("category") or "").lower()
+        }
+        for index, row in enumerate(rows)
+    ]
+
+
+
+
+
+class FakeVectorStore(VectorStore):
+    """Seeded knowledge base: each namespace holds `chunks` generated articles, and a search returns
+    `top_k` of them chosen from the query vector, after a (jittered) latency."""
+
+    index_name = "replay"
+
+    def __init__(self, latency: float, jitter: float = 0.0, chunks: int = 60):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunks = chunks
+        self.articles = {}
+
+
+
+
+
+    def _articles(self, namespace: str) -> list:
+        if namespace not in self.articles:
+            articles = []
+            for i in range(self.chunks):
+                draw = random.Random(f"{namespace}-{i}")
+                articles.append(" ".join(draw.choice(VOCABULARY) for _ in range(90)))
+            self.articles[namespace] = articles
+
+        return self.articles[namespace]
+
+
+
+
+
+    def upsert_vectors(self, vectors: list, namespace: str, batch_size: int = 100) -> dict:
+        # Replays only read the seeded articles; writes are accepted and dropped
+        return {"status": "success", "total_upserted": len(vectors)}
+
+
+
+
+
+    async def search(self, query_vector, namespace: str, top_k: int = 5) -> dict:
+        articles = self._articles(namespace)
+        draw = random.Random(zlib.crc32(np.asarray(query_vector, dtype=np.float32).tobytes()))
+
+        latency = self.latency * (draw.lognormvariate(0.0, self.jitter) if self.jitter else 1.0)
+        await asyncio.sleep(latency)
+
+        picked = draw.sample(range(len(articles)), min(top_k, len(articles)))
+        return {
+            "status": "success",
+            "data": [
+                {"id": f"{namespace}-{i}", "content": articles[i], "score": round(0.92 - rank * 0.01, 4)}
+                for rank, i in enumerate(picked)
+            ]
+        }
+
+
+
+
+
+    async def aupsert_batch(self, vectors: list, namespace: str) -> int:
+        return len(vectors)
+
+
+
+
+
+def summarize(values: list) -> dict:
+    from services.batch_service import percentile
+
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values), 2) if values else 0.0,
+        "p50": round(percentile(values, 0.50), 2),
+        "p95": round(percentile(values, 0.95), 2),
+        "p99": round(percentile(values, 0.99), 2),
+        "max": round(values[-1], 2) if values else 0.0
+    }
+
+
+
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+
+
+
+def git_revision() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+
+
+
+def configure_environment(args, server: StubOpenAIServer):
+    """Point the services at the fakes; must run before the first service import reads settings."""
+
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["VECTOR_STORE_BACKEND"] = "local"
+    os.environ["ESCALATION_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "escalations.db")
+    # Per-node timings are collected through the "basic" instrumentation (see run below)
+    os.environ["METRICS_MODE"] = "basic"
+    os.environ.pop("EMBEDDING_CACHE_DB_PATH", None)
+    if args.no_cache:
+        os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+        os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+    for key in ("OPENAI_API_KEY", "LANGSMITH_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+
+
+
+
+
+async def run(args) -> dict:
+    from schemas.dataclasses.categories import CATEGORIES
+
+    server = StubOpenAIServer(
+        latency=args.chat_latency, embedding_latency=args.embedding_latency, jitter=args.jitter,
+        approval_rate=args.approval_rate, categories=list(CATEGORIES)
+    )
+    configure_environment(args, server)
+
+    from core import metrics as m
+    from services.providers import openai_service, vector_store, langgraph_service, batch_service
+
+    # The stub takes raw strings; skip client-side tokenization against tiktoken's remote vocab.
+    openai_service.embeddings.check_embedding_ctx_length = False
+    vector_store.override(FakeVectorStore(args.search_latency, args.jitter))
+
+    tickets = load_corpus(args.corpus) * args.repeat
+
+    async def lines():
+        for ticket in tickets:
+            yield json.dumps(ticket)
+
+    await server.start()
+    try:
+        # Build the graph and warm the HTTP clients on tickets outside the corpus, then drop their metrics
+        for i in range(args.warmup):
+            await langgraph_service.process_ticket(f"Warmup ticket {i}", f"Warmup request number {i} before the replay")
+        for metric in m.metrics.metrics.values():
+            metric.series.clear()
+
+        # Every node appends (node, seconds) here: the tasks BatchService and LangGraph spawn inherit the list
+        trace = []
+        m.ticket_trace.set(trace)
+
+        gc.collect()
+        rss_before = peak_rss_mb()
+        if args.trace_memory:
+            tracemalloc.start()
+
+        results = []
+        summary = {}
+        async for result in batch_service.process(lines(), concurrency=args.concurrency, timeout=args.timeout):
+            if "summary" in result:
+                summary = result["summary"]
+            else:
+                results.append(result)
+
+        traced_peak = tracemalloc.get_traced_memory()[1] / 2**20 if args.trace_memory else None
+        tracemalloc.stop()
+
+    finally:
+        await server.stop()
+
+    node_ms = {}
+    for node, seconds in trace:
+        node_ms.setdefault(node, []).append(seconds * 1000)
+
+    openai_calls = {}
+    for (operation, _, _), count in m.OPENAI_REQUESTS.series.items():
+        openai_calls[operation] = openai_calls.get(operation, 0) + count
+
+    return {
+        "config": {
+            "revision": git_revision(),
+            "corpus": os.path.relpath(args.corpus),
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+            "chat_latency": args.chat_latency,
+            "embedding_latency": args.embedding_latency,
+            "search_latency": args.search_latency,
+            "jitter": args.jitter,
+            "approval_rate": args.approval_rate,
+            "no_cache": args.no_cache
+        },
+        "tickets": len(results),
+        "statuses": dict(Counter(result["status"] for result in results)),
+        "outcomes": {outcome: count for (outcome,), count in sorted(m.TICKETS.series.items())},
+        "elapsed_seconds": summary.get("elapsed_seconds", 0.0),
+        "throughput_per_second": summary.get("throughput_per_second", 0.0),
+        "end_to_end_ms": summarize([result["latency_ms"] for result in results]),
+        "nodes_ms": {node: summarize(values) for node, values in sorted(node_ms.items())},
+        "openai_calls": dict(sorted(openai_calls.items())),
+        "memory_mb": {
+            "peak_rss": round(peak_rss_mb(), 1),
+            "peak_rss_growth": round(peak_rss_mb() - rss_before, 1),
+            "traced_peak": round(traced_peak, 1) if traced_peak is not None else None
+        }
+    }
+
+
+
+
+
+def print_report(report: dict):
+    config = report["config"]
+    print(
+        f"{report['tickets']} tickets from {config['corpus']} at concurrency {config['concurrency']} "
+        f"(chat {config['chat_latency'] * 1000:.0f} ms, embeddings {config['embedding_latency'] * 1000:.0f} ms, "
+        f"search {config['search_latency'] * 1000:.0f} ms, jitter {config['jitter']})"
+    )
+    print(f"throughput: {report['throughput_per_second']:.2f} tickets/s over {report['elapsed_seconds']:.2f} s")
+    print(f"statuses:   {report['statuses']}")
+    print(f"outcomes:   {report['outcomes']}")
+    print(f"openai:     {report['openai_calls']}")
+
+    memory = report["memory_mb"]
+    traced = f", traced heap peak {memory['traced_peak']} MB" if memory["traced_peak"] is not None else ""
+    print(f"memory:     peak RSS {memory['peak_rss']} MB (+{memory['peak_rss_growth']} MB during the replay){traced}")
+
+    print(f"\n{'ms':<14} {'count':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    rows = [("end_to_end", report["end_to_end_ms"])] + list(report["nodes_ms"].items())
+    for name, stats in rows:
+        print(
+            f"{name:<14} {stats['count']:6d} {stats['mean']:9.1f} {stats['p50']:9.1f} "
+            f"{stats['p95']:9.1f} {stats['p99']:9.1f} {stats['max']:9.1f}"
+        )
+
+
+
+
+
+def compare(base_path: str, candidate_path: str):
+    with open(base_path, encoding="utf-8") as base_file, open(candidate_path, encoding="utf-8") as candidate_file:
+        base, candidate = json.load(base_file), json.load(candidate_file)
+
+    differing = [key for key in base["config"] if key != "revision" and base["config"][key] != candidate["config"].get(key)]
+    if differing:
+        print(f"warning: the runs differ in {', '.join(differing)}; deltas mix workload and code changes\n")
+
+    # (label, value getter, whether higher is better)
+    rows = [("throughput/s", lambda report: report["throughput_per_second"], True)]
+    for name in ["end_to_end"] + sorted(set(base["nodes_ms"]) | set(candidate["nodes_ms"])):
+        for stat in ("p50", "p95", "p99"):
+            def value(report, name=name, stat=stat):
+                stats = report["end_to_end_ms"] if name == "end_to_end" else report["nodes_ms"].get(name)
+                return stats[stat] if stats else None
+            rows.append((f"{name} {stat} ms", value, False))
+    rows.append(("peak RSS MB", lambda report: report["memory_mb"]["peak_rss"], False))
+
+    print(f"{'':<22} {base['config']['revision'] or 'base':>10} {candidate['config']['revision'] or 'candidate':>10} {'change':>9}")
+    for label, value, higher_is_better in rows:
+        before, after = value(base), value(candidate)
+        if before is None or after is None:
+            print(f"{label:<22} {before if before is not None else '-':>10} {after if after is not None else '-':>10}")
+            continue
+
+        change = (after - before) / before * 100 if before else 0.0
+        better = change > 0 if higher_is_better else change < 0
+        # Changes under 5% or 1 ms (1 ticket/s, 1 MB) are within run-to-run noise
+        noise = abs(change) < 5 or abs(after - before) < 1.0
+        marker = "" if noise else (" better" if better else " worse")
+        print(f"{label:<22} {before:10.1f} {after:10.1f} {change:+8.1f}%{marker}")
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL (batch format) or CSV ticket corpus")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the corpus this many times; repeats hit the caches")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds per ticket (default: BATCH_TICKET_TIMEOUT_SECONDS)")
+    parser.add_argument("--chat-latency", type=float, default=0.4)
+    parser.add_argument("--embedding-latency", type=float, default=0.1)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.3, help="Sigma of the lognormal factor applied to every fake latency")
+    parser.add_argument("--approval-rate", type=float, default=0.7, help="Share of LLM reviews that approve the draft")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the semantic response and embedding caches")
+    parser.add_argument("--warmup", type=int, default=2, help="Tickets processed before the measurement")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report the tracemalloc heap peak (slows the run)")
+    parser.add_argument("--output", help="Write the run as JSON for --compare")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "CANDIDATE"), help="Compare two saved runs and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=4)
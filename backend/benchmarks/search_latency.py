@@ -0,0 +1,130 @@
+"""
+Micro-benchmark for PineconeService.search under concurrency.
+
+Uses an in-process fake index whose blocking query() sleeps for a fixed network latency,
+starts searches at a fixed arrival rate and reports p50/p99 latency per search plus the worst
+event-loop stall, for the old inline call and the executor-backed search path.
+
+Usage (from the backend directory):
+    python -m benchmarks.search_latency --searches 500 --rate 300 --latency 0.03
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from types import SimpleNamespace
+
+
+
+class FakeIndex:
+    """Blocking stand-in for a Pinecone index with a fixed query latency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def query(self, vector, top_k, include_metadata, namespace):
+        time.sleep(self.latency)
+        return SimpleNamespace(matches=[
+            SimpleNamespace(id=f"{namespace}-{i}", metadata={"text": f"chunk {i} from {namespace}"}, score=1.0 - i / 100)
+            for i in range(top_k)
+        ])
+
+
+
+
+
+async def inline_search(service, query_vector, namespace, top_k=5):
+    """The previous search implementation, calling the blocking client on the event loop."""
+
+    results = service.index.query(vector=query_vector, top_k=top_k, include_metadata=True, namespace=namespace)
+    return {"status": "success", "data": [{"content": m.metadata.get("text", ""), "score": m.score} for m in results.matches]}
+
+
+
+
+
+async def measure(search, searches: int, rate: float) -> dict:
+    """Open-loop load: search i is due at i / rate seconds and its latency counts from that moment."""
+
+    latencies = []
+    in_flight = 0
+    max_in_flight = 0
+    max_stall = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal max_stall
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_stall = max(max_stall, time.perf_counter() - start - 0.001)
+
+    async def one(due: float):
+        nonlocal in_flight, max_in_flight
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await search([0.1] * 8, "technical")
+        in_flight -= 1
+
+        latencies.append(time.perf_counter() - due)
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*[one(start + i / rate) for i in range(searches)])
+    elapsed = time.perf_counter() - start
+    running = False
+    await ticker_task
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "throughput": searches / elapsed,
+        "max_in_flight": max_in_flight,
+        "max_stall": max_stall
+    }
+
+
+
+
+
+def report(name: str, result: dict):
+    print(f"{name:<10} p50 {result['p50'] * 1000:8.1f} ms   p99 {result['p99'] * 1000:8.1f} ms   "
+          f"{result['throughput']:8.1f} searches/s   {result['max_in_flight']:4d} in flight   max loop stall {result['max_stall'] * 1000:8.1f} ms")
+
+
+
+
+
+async def main(searches: int, rate: float, latency: float):
+    for key in ("OPENAI_API_KEY", "PINECONE_API_KEY", "LANGSMITH_API_KEY", "PINECONE_INDEX_NAME"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ.setdefault("PINECONE_INDEX_HOST", "https://benchmark-index.svc.pinecone.io")
+
+    from services.pinecone_service import PineconeService
+
+    service = PineconeService(index=FakeIndex(latency))
+
+    inline = await measure(lambda vector, namespace: inline_search(service, vector, namespace), searches, rate)
+    executor = await measure(lambda vector, namespace: service.search(vector, namespace), searches, rate)
+
+    print(f"{searches} searches arriving at {rate:.0f}/s, {latency * 1000:.0f} ms fake index latency")
+    report("inline", inline)
+    report("executor", executor)
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=300, help="Searches started per second")
+    parser.add_argument("--latency", type=float, default=0.03, help="Seconds each fake query blocks for")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.searches, args.rate, args.latency))
@@ -0,0 +1,109 @@
+"""
+Cold-start cost of the API: module import time and service initialization time.
+
+Importing `application` used to construct every service (OpenAI clients, Pinecone index, SQLite
+store, LangGraph workflow) as a module-level singleton. Services are now lazy providers built in
+the FastAPI lifespan hook, so importing the app only pays for module imports.
+
+The import is run in a fresh interpreter with `python -X importtime`, whose per-module report is
+parsed into self and cumulative times. The slowest modules overall and the first-party modules are
+listed, then the providers are initialized in that same fresh process and timed one by one.
+
+Usage (from the backend directory):
+    python -m benchmarks.startup_time --top 15
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+
+
+FIRST_PARTY = ("application", "core", "routers", "services", "schemas", "utils")
+
+INITIALIZE_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import application
+imported = time.perf_counter() - started
+from services.providers import initialize_providers
+started = time.perf_counter()
+report = initialize_providers()
+print(json.dumps({"import_seconds": imported, "initialize_seconds": time.perf_counter() - started, "providers": report}))
+"""
+
+
+
+
+
+def parse_importtime(stderr: str) -> list:
+    """Rows of (module, self_us, cumulative_us) from `-X importtime` output."""
+
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+
+    return rows
+
+
+
+
+
+def run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    for key in ("OPENAI_API_KEY", "LANGSMITH_API_KEY", "PINECONE_API_KEY"):
+        env.setdefault(key, "benchmark")
+
+    return subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+
+
+
+
+def print_modules(title: str, rows: list):
+    print(f"\n{title}")
+    print(f"{'self ms':>9} {'cumulative ms':>14}  module")
+    for module, self_us, cumulative_us in rows:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:14.1f}  {module}")
+
+
+
+
+
+def main(top: int, initialize: bool):
+    started = time.perf_counter()
+    rows = parse_importtime(run("import application", "-X", "importtime").stderr)
+    wall = time.perf_counter() - started
+
+    application_row = next((row for row in rows if row[0] == "application"), None)
+    print(f"`import application`: {application_row[2] / 1000:.1f} ms cumulative ({wall:.2f} s including interpreter start)")
+
+    print_modules(f"Top {top} modules by self time", sorted(rows, key=lambda row: row[1], reverse=True)[:top])
+    print_modules("First-party modules", [row for row in rows if row[0].split(".")[0] in FIRST_PARTY])
+
+    if initialize:
+        result = json.loads(run(INITIALIZE_SCRIPT).stdout.strip().splitlines()[-1])
+
+        print(f"\nService initialization (lifespan hook): {result['initialize_seconds'] * 1000:.1f} ms")
+        for name, entry in result["providers"].items():
+            detail = f"{entry['seconds'] * 1000:9.1f} ms" if entry["status"] == "ready" else f"   error: {entry['message'][:80]}"
+            print(f"  {name:<20} {detail}")
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--skip-initialize", action="store_true", help="Only measure imports")
+    args = parser.parse_args()
+
+    main(args.top, not args.skip_initialize)
@@ -0,0 +1,75 @@
+"""
+Time-to-first-event vs total latency for the streaming /query/stream path.
+
+Streams tickets through LanggraphService.stream_ticket against a local stub OpenAI server
+(which streams completion tokens) and an in-process fake Pinecone index, and reports when
+the first progress event and the first draft token arrive compared with the full run.
+
+Usage (from the backend directory):
+    python -m benchmarks.stream_latency --tickets 5 --latency 0.4
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import statistics
+
+from benchmarks.stub_openai import StubOpenAIServer
+from benchmarks.parallel_prelude import FakeIndex
+
+
+
+async def main(tickets: int, latency: float):
+    server = StubOpenAIServer(latency=latency, embedding_latency=latency / 2)
+
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("PINECONE_INDEX_HOST", "https://benchmark-index.svc.pinecone.io")
+    for key in ("OPENAI_API_KEY", "PINECONE_API_KEY", "LANGSMITH_API_KEY", "PINECONE_INDEX_NAME"):
+        os.environ.setdefault(key, "benchmark")
+
+    from services.providers import openai_service, vector_store, langgraph_service
+
+    # The stub takes raw strings; skip client-side tokenization against tiktoken's remote vocab.
+    openai_service.embeddings.check_embedding_ctx_length = False
+    vector_store.index = FakeIndex()
+
+    first_event, first_token, totals = [], [], []
+
+    await server.start()
+    try:
+        for i in range(tickets + 1):
+            start = time.perf_counter()
+            event_at = token_at = None
+
+            async for event in langgraph_service.stream_ticket(f"Sync error {i}", f"Data is not syncing across devices ({i})"):
+                now = time.perf_counter() - start
+                event_at = event_at or now
+                if event["event"] == "draft_token" and token_at is None:
+                    token_at = now
+
+            # The first ticket warms up connections and is not counted
+            if i:
+                first_event.append(event_at)
+                first_token.append(token_at or 0.0)
+                totals.append(time.perf_counter() - start)
+    finally:
+        await server.stop()
+
+    print(f"stub latency {latency * 1000:.0f} ms per chat call, {tickets} tickets")
+    print(f"time to first event       : p50 {statistics.median(first_event) * 1000:8.1f} ms")
+    print(f"time to first draft token : p50 {statistics.median(first_token) * 1000:8.1f} ms")
+    print(f"total                     : p50 {statistics.median(totals) * 1000:8.1f} ms")
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.4)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.tickets, args.latency))
@@ -0,0 +1,281 @@
+
+import json
+import zlib
+import time
+import random
+import base64
+import asyncio
+import socket
+
+import numpy as np
+from aiohttp import web
+
+
+
+class StubOpenAIServer:
+    """Local stand-in for the OpenAI chat-completions and embeddings endpoints with an injected latency.
+
+    Responses are derived from the request body, so a replayed workload gets the same answers every
+    run: `jitter` scales each latency by a lognormal factor, `approval_rate` is the share of reviews
+    that approve and `categories` are picked from for classifications. `requests_per_second` enforces
+    a per-model rate limit with a one-second burst, answering 429 with retry-after-ms beyond it.
+    """
+
+    def __init__(
+        self, latency: float = 0.5, embedding_dimension: int = 3072,
+        throttle_rate: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+        embedding_latency: float = None, jitter: float = 0.0,
+        approval_rate: float = 1.0, categories: list = None, requests_per_second: float = None
+    ):
+        self.latency = latency
+        self.embedding_latency = latency if embedding_latency is None else embedding_latency
+        self.throttle_rate = throttle_rate
+        self.jitter = jitter
+        self.approval_rate = approval_rate
+        self.categories = list(categories or ["general"])
+        self.requests_per_second = requests_per_second
+        self.buckets = {}
+        self.embedding_dimension = embedding_dimension
+        self.host = host
+        self.port = port or self._free_port()
+        self.request_count = 0
+        self.throttled_count = 0
+        self.runner = None
+
+
+
+
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+
+
+
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+
+
+
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_post("/v1/embeddings", self._embeddings)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+
+
+
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+
+
+
+    def _over_limit(self, model: str) -> bool:
+        if not self.requests_per_second:
+            return False
+
+        now = time.monotonic()
+        level, updated = self.buckets.get(model, (self.requests_per_second, now))
+        level = min(self.requests_per_second, level + (now - updated) * self.requests_per_second)
+        if level < 1:
+            self.buckets[model] = (level, now)
+            return True
+
+        self.buckets[model] = (level - 1, now)
+        return False
+
+
+
+
+
+    def _throttle_response(self) -> web.Response:
+        self.throttled_count += 1
+        return web.json_response(
+            {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            status=429,
+            headers={"retry-after-ms": "50"}
+        )
+
+
+
+
+
+    @staticmethod
+    def _digest(body: dict) -> int:
+        return zlib.crc32(json.dumps(body.get("messages", body.get("input")), sort_keys=True).encode())
+
+
+
+
+
+    def _delay(self, latency: float, digest: int) -> float:
+        if not self.jitter:
+            return latency
+        return latency * random.Random(digest).lognormvariate(0.0, self.jitter)
+
+
+
+
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.request_count += 1
+
+        if self._over_limit(body.get("model", "stub")):
+            return self._throttle_response()
+
+        digest = self._digest(body)
+        latency = self._delay(self.latency, digest)
+        # The reference ties a draft to its prompt, so a draft written with refined context gets its own review verdict
+        message = {
+            "role": "assistant",
+            "content": f"Thank you for reaching out. Please try the steps in our documentation (ref {digest:08x})."
+        }
+
+        response_format = body.get("response_format") or {}
+        tools = body.get("tools") or []
+
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            message["content"] = json.dumps(self._fake_object(schema, digest))
+        elif tools:
+            function = tools[0]["function"]
+            message["content"] = None
+            message["tool_calls"] = [{
+                "id": f"call_{self.request_count}",
+                "type": "function",
+                "function": {"name": function["name"], "arguments": json.dumps(self._fake_object(function["parameters"], digest))}
+            }]
+
+        if body.get("stream"):
+            return await self._stream_chat_completion(request, body, message, latency)
+
+        await asyncio.sleep(latency)
+
+        return web.json_response({
+            "id": f"chatcmpl-{self.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}
+        })
+
+
+
+
+
+    async def _stream_chat_completion(self, request: web.Request, body: dict, message: dict, latency: float) -> web.StreamResponse:
+        """Stream the message as chat.completion.chunk events: first token after 30% of the latency, the rest spread evenly."""
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        def chunk(delta: dict, finish_reason=None, usage=None) -> bytes:
+            payload = {
+                "id": f"chatcmpl-{self.request_count}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else [],
+            }
+            if usage is not None:
+                payload["usage"] = usage
+            return f"data: {json.dumps(payload)}\n\n".encode()
+
+        if message.get("tool_calls"):
+            pieces = []
+            deltas = [{"role": "assistant", "tool_calls": [dict(message["tool_calls"][0], index=0)]}]
+        else:
+            pieces = [word + " " for word in message["content"].split(" ")]
+            deltas = [{"role": "assistant", "content": ""}] + [{"content": piece} for piece in pieces]
+
+        await asyncio.sleep(latency * 0.3)
+        for delta in deltas:
+            await response.write(chunk(delta))
+            await asyncio.sleep(latency * 0.7 / len(deltas))
+
+        await response.write(chunk({}, finish_reason="stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await response.write(chunk({}, usage={"prompt_tokens": 100, "completion_tokens": len(pieces), "total_tokens": 100 + len(pieces)}))
+
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+
+
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.request_count += 1
+
+        if random.random() < self.throttle_rate or self._over_limit(body.get("model", "stub")):
+            return self._throttle_response()
+
+        await asyncio.sleep(self._delay(self.embedding_latency, self._digest(body)))
+
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+
+        data = []
+        for i, text in enumerate(inputs):
+            # Seeded by the input so identical texts get identical vectors.
+            rng = np.random.default_rng(zlib.crc32(str(text).encode()))
+            vector = rng.standard_normal(self.embedding_dimension).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        return web.json_response({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "stub"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}
+        })
+
+
+
+
+
+    def _fake_object(self, schema: dict, digest: int = 0) -> dict:
+        """Build a minimal object satisfying a JSON schema's properties."""
+
+        draw = random.Random(digest)
+        result = {}
+        for name, prop in schema.get("properties", {}).items():
+            prop_type = prop.get("type")
+            if prop_type == "boolean":
+                result[name] = draw.random() < self.approval_rate
+            elif prop_type == "array":
+                result[name] = []
+            elif prop_type in ("integer", "number"):
+                result[name] = 0
+            elif name == "category":
+                result[name] = self.categories[digest % len(self.categories)]
+            else:
+                result[name] = "stub"
+
+        return result
@@ -0,0 +1,59 @@
+"""
+Backfill tickets from a helpdesk export through the LangGraph workflow.
+
+Reads one JSON ticket per line ({"id": ..., "subject": ..., "description": ...}), processes them with
+bounded concurrency and per-ticket timeouts, writes one JSON result per line and prints a
+throughput/latency summary.
+
+Usage (from the backend directory):
+    python -m cli.process_tickets tickets.jsonl --output results.jsonl --concurrency 16 --timeout 90
+"""
+
+import sys
+import json
+import asyncio
+import argparse
+
+from core.logging import configure_logging
+from services.providers import batch_service
+from services.batch_service import iterate_jsonl
+
+
+
+async def main(args):
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+
+    try:
+        with open(args.input, encoding="utf-8") as tickets:
+            async for result in batch_service.process(
+                iterate_jsonl(tickets),
+                concurrency=args.concurrency,
+                timeout=args.timeout,
+                ordered=not args.unordered
+            ):
+                if "summary" in result:
+                    print(json.dumps(result["summary"], indent=4), file=sys.stderr)
+                    continue
+
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file with one ticket per line")
+    parser.add_argument("--output", help="Write results here instead of stdout")
+    parser.add_argument("--concurrency", type=int, default=None, help="Tickets processed at once (default: BATCH_MAX_CONCURRENCY)")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds per ticket (default: BATCH_TICKET_TIMEOUT_SECONDS)")
+    parser.add_argument("--unordered", action="store_true", help="Emit results as they complete instead of in input order")
+    args = parser.parse_args()
+
+    configure_logging()
+    asyncio.run(main(args))
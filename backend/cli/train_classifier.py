@@ -0,0 +1,185 @@
+"""
+Train and evaluate the local ticket classifier used as the first classification tier.
+
+Labelled examples come from past tickets (JSONL, one {"subject", "description", "category"} per line),
+from escalation CSV exports and, with --escalation-store, from the escalation store. Tickets without a
+category can be labelled by the LLM classifier with --label-with-llm, so the local model learns to
+reproduce its decisions.
+
+A held-out split is used to report accuracy and, for a range of confidence thresholds, the share of
+tickets the local tier would answer (short-circuit rate) and its accuracy on those tickets. The saved
+model is then refit on all examples.
+
+Usage (from the backend directory):
+    python -m cli.train_classifier --tickets past_tickets.jsonl --escalation-store --label-with-llm
+"""
+
+import csv
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+import numpy as np
+
+from core.config import settings
+from core.logging import configure_logging
+from schemas.dataclasses.categories import CATEGORIES
+from services.providers import openai_service
+from services.ticket_classifier import EmbeddingClassifier
+from utils.file_operations import batch_by_token_budget
+
+
+
+THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95]
+
+
+
+def load_examples(ticket_paths: list, escalation_paths: list, use_escalation_store: bool = False) -> list:
+    """Read (subject, description, category or None) triples from ticket JSONL files and escalation records."""
+
+    examples = []
+
+    for path in ticket_paths:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    ticket = json.loads(line)
+                    examples.append((ticket.get("subject", ""), ticket.get("description", ""), ticket.get("category")))
+
+    for path in escalation_paths:
+        with open(path, newline="", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+                examples.append((row.get("subject", ""), row.get("description", ""), row.get("category")))
+
+    if use_escalation_store:
+        from services.providers import escalation_store
+
+        for row in escalation_store.iterate():
+            examples.append((row["subject"], row["description"], row["category"]))
+
+    return [
+        (subject, description, category.strip().lower() if category else None)
+        for subject, description, category in examples
+    ]
+
+
+
+
+
+async def label_with_llm(examples: list) -> list:
+    """Fill in missing categories with the LLM classifier, reporting its latency."""
+
+    semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+    latencies = []
+
+    async def label(subject, description, category):
+        if category:
+            return subject, description, category
+
+        async with semaphore:
+            started = time.perf_counter()
+            response = await openai_service.classify_ticket(
+                text=description, **CATEGORIES, subject=subject, description=description
+            )
+            latencies.append(time.perf_counter() - started)
+
+        if response["status"] == "error":
+            return subject, description, None
+        return subject, description, response["message"].category
+
+    labelled = await asyncio.gather(*[label(*example) for example in examples])
+
+    if latencies:
+        print(f"Labelled {len(latencies)} tickets with the LLM, mean latency {np.mean(latencies) * 1000:.0f} ms", file=sys.stderr)
+
+    return labelled
+
+
+
+
+
+async def embed_texts(texts: list) -> np.ndarray:
+    semaphore = asyncio.Semaphore(settings.EMBEDDING_BATCH_CONCURRENCY)
+
+    async def embed(batch):
+        async with semaphore:
+            return await openai_service.embed_batch(batch)
+
+    results = await asyncio.gather(*[embed(batch) for batch in batch_by_token_budget(texts)])
+    return np.array([embedding for batch in results for embedding in batch], dtype=np.float32)
+
+
+
+
+
+def evaluate(model: EmbeddingClassifier, embeddings: np.ndarray, labels: list) -> dict:
+    """Accuracy overall and, per threshold, the short-circuit rate and the accuracy of short-circuited tickets."""
+
+    probabilities = model.predict_proba(embeddings)
+    predicted = [model.labels[i] for i in probabilities.argmax(axis=1)]
+    confidence = probabilities.max(axis=1)
+    correct = np.array([p == label for p, label in zip(predicted, labels)])
+
+    report = {"examples": len(labels), "accuracy": round(float(correct.mean()), 4), "thresholds": []}
+    for threshold in THRESHOLDS:
+        covered = confidence >= threshold
+        report["thresholds"].append({
+            "threshold": threshold,
+            "short_circuit_rate": round(float(covered.mean()), 4),
+            "accuracy_when_short_circuited": round(float(correct[covered].mean()), 4) if covered.any() else None
+        })
+
+    return report
+
+
+
+
+
+async def main(args):
+    examples = load_examples(args.tickets, args.escalations, args.escalation_store)
+    if args.label_with_llm:
+        examples = await label_with_llm(examples)
+
+    examples = [example for example in examples if example[2] in CATEGORIES]
+    if len({category for _, _, category in examples}) < 2:
+        sys.exit("Need labelled examples from at least two categories")
+
+    # Same text the workflow embeds for a live ticket
+    embeddings = await embed_texts([f"{subject} {description}" for subject, description, _ in examples])
+    labels = [category for _, _, category in examples]
+
+    order = list(range(len(examples)))
+    random.Random(args.seed).shuffle(order)
+    split = int(len(order) * (1 - args.eval_fraction))
+    train, held_out = order[:split], order[split:]
+
+    if held_out:
+        model = EmbeddingClassifier.train(embeddings[train], [labels[i] for i in train], settings.EMBEDDING_MODEL_NAME)
+        print(json.dumps(evaluate(model, embeddings[held_out], [labels[i] for i in held_out]), indent=4))
+
+    if not args.no_save:
+        model = EmbeddingClassifier.train(embeddings, labels, settings.EMBEDDING_MODEL_NAME)
+        model.save(args.output)
+        print(f"Saved classifier trained on {len(labels)} examples to {args.output}", file=sys.stderr)
+
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", action="append", default=[], help="JSONL file of past tickets (repeatable)")
+    parser.add_argument("--escalations", action="append", default=[], help="Escalation CSV export (repeatable)")
+    parser.add_argument("--escalation-store", action="store_true", help="Also use every ticket in the escalation store")
+    parser.add_argument("--label-with-llm", action="store_true", help="Label tickets without a category using the LLM classifier")
+    parser.add_argument("--eval-fraction", type=float, default=0.2, help="Share of examples held out for evaluation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=settings.TICKET_CLASSIFIER_PATH)
+    parser.add_argument("--no-save", action="store_true", help="Only evaluate, do not write the model")
+    args = parser.parse_args()
+
+    configure_logging()
+    asyncio.run(main(args))
@@ -7,14 +7,104 @@ class Settings(BaseSettings):
 
     VERSION: str = "1.0"
     LOGGING_DIR: str = "logs"
+    LOG_FILE_NAME: str = "app.log"
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_ROTATION: str = "size"
+    LOG_MAX_BYTES: int = 20 * 1024 * 1024
+    LOG_ROTATE_WHEN: str = "midnight"
+    LOG_BACKUP_COUNT: int = 5
+    LOG_QUEUE_MAX_RECORDS: int = 10_000
     MODEL_NAME: str = "gpt-4.1-mini"
     EMBEDDING_MODEL_NAME: str = "text-embedding-3-large"
+    OPENAI_BASE_URL: str | None = None
+    OPENAI_MAX_CONCURRENT_REQUESTS: int = 32
+    OPENAI_RATE_LIMITS: dict[str, dict[str, int]] = {
+        "gpt-4.1-mini": {"rpm": 5_000, "tpm": 4_000_000},
+        "text-embedding-3-large": {"rpm": 5_000, "tpm": 5_000_000}
+    }
+    OPENAI_RATE_LIMIT_BURST_SECONDS: float = 10.0
+    OPENAI_BACKGROUND_RESERVE: float = 0.25
+    OPENAI_COMPLETION_TOKENS_ESTIMATE: int = 512
+    OPENAI_MAX_RETRIES: int = 3
+    OPENAI_RETRY_BASE_DELAY: float = 0.5
+
+    EMBEDDING_BATCH_MAX_TOKENS: int = 100_000
+    EMBEDDING_BATCH_MAX_SIZE: int = 512
+    EMBEDDING_BATCH_CONCURRENCY: int = 4
+    EMBEDDING_MAX_RETRIES: int = 5
+    EMBEDDING_RETRY_BASE_DELAY: float = 1.0
+
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10_000
+    EMBEDDING_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    EMBEDDING_CACHE_DB_PATH: str | None = None
+    EMBEDDING_CACHE_DISK_MAX_ENTRIES: int = 200_000
+
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5_000
+    SEMANTIC_CACHE_TTL_SECONDS: int = 24 * 3600
+    SEMANTIC_CACHE_GENERATION_DIR: str = "semantic_cache"
+
+    ADMISSION_MAX_IN_FLIGHT: int = 16
+    ADMISSION_MAX_QUEUE: int = 200
+    ADMISSION_MAX_WAIT_SECONDS: float = 30.0
+    ADMISSION_LANES: list[str] = ["security", "technical", "billing", "general"]
+
+    BATCH_MAX_CONCURRENCY: int = 8
+    BATCH_TICKET_TIMEOUT_SECONDS: float = 120.0
+
+    VECTOR_STORE_BACKEND: str = "pinecone"
+    LOCAL_VECTOR_STORE_DIR: str = "vector_store"
+    LOCAL_VECTOR_STORE_THREADS: int = 4
+    LOCAL_VECTOR_STORE_INDEX: str = "flat"
+    ANN_MIN_TRAIN_SIZE: int = 20_000
+    ANN_NLIST: int = 256
+    ANN_NPROBE: int = 16
+    ANN_PQ_SUBSPACES: int = 96
+    ANN_RERANK: int = 200
+
+    PINECONE_MAX_CONCURRENT_REQUESTS: int = 16
+    PINECONE_UPSERT_BATCH_SIZE: int = 100
+    INGEST_UPSERT_CONCURRENCY: int = 4
+    INGEST_QUEUE_SIZE: int = 8
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    PDF_READER_PAGES: int = 200
+
+    RETRIEVAL_TOP_K: int = 5
+    RETRIEVAL_REFINE_STEP: int = 5
+    RETRIEVAL_MAX_DEPTH: int = 15
+
+    DRAFT_CONTEXT_MAX_TOKENS: int = 6_000
+    CONTEXT_DEDUP_THRESHOLD: float = 0.9
+    CONTEXT_MIN_OVERLAP_CHARS: int = 50
+    CONTEXT_MAX_OVERLAP_CHARS: int = 400
+
+    TICKET_CLASSIFIER_ENABLED: bool = True
+    TICKET_CLASSIFIER_PATH: str = "models/ticket_classifier.npz"
+    TICKET_CLASSIFIER_THRESHOLD: float = 0.85
+    TICKET_CLASSIFIER_LLM_HEDGE_SECONDS: float | None = None
+
+    ESCALATION_DB_PATH: str = "escalations.db"
+    ESCALATION_CSV_PATH: str = "escalation.csv"
+
+    PRE_REVIEW_MIN_CHARS: int = 40
+    PRE_REVIEW_MAX_CHARS: int = 6_000
+    PRE_REVIEW_AUTO_APPROVE: bool = False
+    PRE_REVIEW_APPROVE_GROUNDING: float = 0.7
+    PRE_REVIEW_BANNED_PHRASES: list[str] = [
+        "as an ai language model", "lorem ipsum", "[insert", "{context}", "i cannot help with", "i'm not sure"
+    ]
+
+    METRICS_MODE: str = "basic"
 
 
     OPENAI_API_KEY: str
-    PINECONE_API_KEY: str
+    PINECONE_API_KEY: str | None = None
     LANGSMITH_API_KEY: str
-    PINECONE_INDEX_NAME: str
+    PINECONE_INDEX_NAME: str | None = None
+    PINECONE_INDEX_HOST: str | None = None
 
 
     class Config:
@@ -1,18 +1,211 @@
 
 import os
+import copy
+import json
+import uuid
+import queue
+import atexit
 import logging
+import contextvars
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Optional
 
 from core.config import settings
+from core.metrics import LOG_RECORDS_DROPPED
 
 
-def configure_logging():
-    """Logging File Configuration"""
+
+# Id of the ticket being processed, stamped on every record logged while handling it
+correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("correlation_id", default=None)
+
+_listener: Optional[QueueListener] = None
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is written out as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "correlation_id"}
+
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Copy the current correlation id onto the record; runs in the logging task, before the record is queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, correlation_id and any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+
+        if getattr(record, "correlation_id", None):
+            entry["correlation_id"] = record.correlation_id
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue records for the listener thread, dropping them rather than blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+
+
+
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments and render the traceback while they are still valid; the listener does the rest
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+
+
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+
+
+
+def _file_handler() -> logging.Handler:
+    path = os.path.join(settings.LOGGING_DIR, settings.LOG_FILE_NAME)
+
+    if settings.LOG_ROTATION == "time":
+        handler = TimedRotatingFileHandler(
+            path, when=settings.LOG_ROTATE_WHEN, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        )
+    elif settings.LOG_ROTATION == "size":
+        handler = RotatingFileHandler(
+            path, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        )
+    else:
+        raise ValueError(f"Unknown LOG_ROTATION: {settings.LOG_ROTATION}")
+
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(correlation_id)s - %(message)s"))
+
+    return handler
+
+
+
+
+
+def configure_logging() -> QueueListener:
+    """Logging File Configuration
+
+    Callers only put records on an in-memory queue; a listener thread formats them and writes the
+    rotating log file, so no disk I/O happens on the event loop.
+    """
+
+    global _listener
 
     os.makedirs(settings.LOGGING_DIR, exist_ok=True)
+    shutdown_logging()
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_MAX_RECORDS))
+    handler.addFilter(CorrelationIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = QueueListener(handler.queue, _file_handler(), respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    return _listener
+
+
+
+
+
+def shutdown_logging():
+    """Write out the queued records and stop the listener thread."""
+
+    global _listener
+
+    if _listener is None:
+        return
+
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+
+
+
+class CorrelationIdMiddleware:
+    """ASGI middleware that tags each HTTP request's log records with its X-Request-ID (or a new id) and echoes it back."""
+
+    def __init__(self, app):
+        self.app = app
+
+
+
+
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or new_correlation_id()
+        token = correlation_id.set(request_id)
 
-    logging.basicConfig(
-        filename="./logs/app.log",
-        level=logging.INFO,
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]}
+            await send(message)
 
-        format="%(asctime)s - %(levelname)s - %(message)s"
-    )
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            correlation_id.reset(token)
@@ -0,0 +1,397 @@
+
+import copy
+import time
+import inspect
+import logging
+import functools
+import threading
+import contextvars
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from core.config import settings
+
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Per-ticket list of (node, seconds) collected in "detailed" mode; the list object is shared with
+# the tasks LangGraph spawns for the nodes because they inherit the context by reference
+ticket_trace: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("ticket_trace", default=None)
+
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+
+
+
+class Metric:
+    """A named family of series keyed by label values, rendered in the Prometheus text format.
+
+    Sync LangGraph nodes run on executor threads, so updates take a per-metric lock (uncontended, it
+    costs well under a microsecond); with metrics off every update returns immediately.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], enabled: bool):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.enabled = enabled
+        self.series: Dict[Tuple, object] = {}
+        self.lock = threading.Lock()
+
+
+
+
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            series = sorted((label_values, copy.deepcopy(value)) for label_values, value in self.series.items())
+
+        for label_values, value in series:
+            lines.extend(self._render_series(label_values, value))
+        return "\n".join(lines)
+
+
+
+
+
+    def _render_series(self, label_values: Tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.labels, label_values)} {value}"]
+
+
+
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *label_values: str, amount: float = 1):
+        if self.enabled:
+            with self.lock:
+                self.series[label_values] = self.series.get(label_values, 0) + amount
+
+
+
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *label_values: str):
+        if self.enabled:
+            with self.lock:
+                self.series[label_values] = value
+
+
+
+
+
+    def inc(self, *label_values: str, amount: float = 1):
+        if self.enabled:
+            with self.lock:
+                self.series[label_values] = self.series.get(label_values, 0) + amount
+
+
+
+
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+
+
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], enabled: bool, buckets: Sequence[float]):
+        super().__init__(name, documentation, labels, enabled)
+        self.buckets = tuple(buckets)
+
+
+
+
+
+    def observe(self, value: float, *label_values: str):
+        if not self.enabled:
+            return
+
+        bucket = bisect_left(self.buckets, value)
+
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                # Per-bucket (non-cumulative) counts with a trailing +Inf bucket, then sum and count
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+            series[0][bucket] += 1
+            series[1] += value
+            series[2] += 1
+
+
+
+
+
+    def _render_series(self, label_values: Tuple, series) -> list:
+        counts, total, count = series
+        lines = []
+
+        cumulative = 0
+        for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+        labels = _format_labels(self.labels, label_values)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+
+
+
+class MetricsRegistry:
+    """In-process metrics exported at /metrics.
+
+    Modes: "off" records nothing and leaves nodes and service calls unwrapped, "basic" (the production
+    setting) keeps histograms and counters at about a microsecond per update, some 50 us of CPU per
+    ticket (benchmarks/metrics_overhead.py), and "detailed" also logs every ticket's per-node timings.
+    """
+
+    def __init__(self, mode: str):
+        if mode not in ("off", "basic", "detailed"):
+            raise ValueError(f"Unknown METRICS_MODE: {mode}")
+
+        self.mode = mode
+        self.metrics: Dict[str, Metric] = {}
+
+
+
+
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+
+
+
+
+    @property
+    def detailed(self) -> bool:
+        return self.mode == "detailed"
+
+
+
+
+
+    def _register(self, metric: Metric) -> Metric:
+        self.metrics.setdefault(metric.name, metric)
+        return self.metrics[metric.name]
+
+
+
+
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels, self.enabled))
+
+
+
+
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels, self.enabled))
+
+
+
+
+
+    def histogram(
+        self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, self.enabled, buckets))
+
+
+
+
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+
+
+
+metrics = MetricsRegistry(settings.METRICS_MODE)
+
+NODE_SECONDS = metrics.histogram("langgraph_node_duration_seconds", "Wall time of each LangGraph node", ("node",))
+TICKET_SECONDS = metrics.histogram("ticket_duration_seconds", "End-to-end ticket processing time", ("outcome",))
+TICKETS = metrics.counter("tickets_total", "Tickets processed by outcome", ("outcome",))
+REVIEW_ATTEMPTS = metrics.histogram(
+    "ticket_review_attempts", "Draft/review loop iterations per ticket", buckets=(0, 1, 2, 3, 4, 5)
+)
+
+OPENAI_SECONDS = metrics.histogram(
+    "openai_request_duration_seconds", "Wall time of OpenAI calls, including queueing for a request slot", ("operation", "model")
+)
+OPENAI_REQUESTS = metrics.counter("openai_requests_total", "OpenAI calls by outcome", ("operation", "model", "status"))
+OPENAI_TOKENS = metrics.counter("openai_tokens_total", "Tokens reported by OpenAI", ("operation", "model", "type"))
+OPENAI_RETRIES = metrics.counter("openai_retries_total", "OpenAI calls retried after throttling", ("operation", "model"))
+OPENAI_RATE_LIMIT_WAIT_SECONDS = metrics.histogram(
+    "openai_rate_limit_wait_seconds", "Time calls waited for the client-side RPM/TPM budget", ("model", "priority")
+)
+
+VECTOR_STORE_SECONDS = metrics.histogram(
+    "vector_store_request_duration_seconds", "Wall time of vector store calls", ("backend", "operation")
+)
+VECTOR_STORE_REQUESTS = metrics.counter(
+    "vector_store_requests_total", "Vector store calls by outcome", ("backend", "operation", "status")
+)
+
+ADMISSION_IN_FLIGHT = metrics.gauge("admission_in_flight", "Tickets admitted and running the workflow")
+ADMISSION_QUEUE_DEPTH = metrics.gauge("admission_queue_depth", "Tickets waiting for admission", ("lane",))
+ADMISSION_WAIT_SECONDS = metrics.histogram(
+    "admission_wait_seconds", "Time tickets waited for admission, including those admitted at once", ("lane",)
+)
+ADMISSION_REJECTED = metrics.counter(
+    "admission_rejected_total", "Tickets shed with 429 by reason (queue_full, evicted, timeout)", ("lane", "reason")
+)
+
+LOG_RECORDS_DROPPED = metrics.counter("log_records_dropped_total", "Log records discarded because the log queue was full")
+
+
+
+
+
+def instrument_node(name: str, node: Callable) -> Callable:
+    """Wrap a LangGraph node (sync or async) so its wall time is recorded under `name`."""
+
+    if not metrics.enabled:
+        return node
+
+    def record(seconds: float):
+        NODE_SECONDS.observe(seconds, name)
+        trace = ticket_trace.get()
+        if trace is not None:
+            trace.append((name, seconds))
+
+    if not inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        def sync_node(state):
+            started = time.perf_counter()
+            try:
+                return node(state)
+            finally:
+                record(time.perf_counter() - started)
+
+        return sync_node
+
+    @functools.wraps(node)
+    async def async_node(state):
+        started = time.perf_counter()
+        try:
+            return await node(state)
+        finally:
+            record(time.perf_counter() - started)
+
+    return async_node
+
+
+
+
+
+def instrument_call(histogram: Histogram, counter: Counter, *label_values: str) -> Callable:
+    """Decorator for async service methods: records wall time, and the outcome from the returned
+    {"status": ...} dict (or "error" when the call raises)."""
+
+    def decorator(function: Callable) -> Callable:
+        if not metrics.enabled:
+            return function
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            status = "error"
+            try:
+                result = await function(*args, **kwargs)
+                status = result.get("status", "success") if isinstance(result, dict) else "success"
+                return result
+            finally:
+                histogram.observe(time.perf_counter() - started, *label_values)
+                counter.inc(*label_values, status)
+
+        return wrapper
+
+    return decorator
+
+
+
+
+
+def start_ticket() -> Tuple[float, Optional[contextvars.Token]]:
+    """Mark the start of a ticket; in detailed mode also begin collecting its node timings."""
+
+    token = ticket_trace.set([]) if metrics.detailed else None
+    return time.perf_counter(), token
+
+
+
+
+
+def finish_ticket(started: Tuple[float, Optional[contextvars.Token]], final_state: dict, error: bool = False) -> Dict[str, float]:
+    """Record a finished ticket's outcome, duration and review loops; returns per-node ms in detailed mode."""
+
+    started_at, token = started
+    node_timings = {}
+
+    if token is not None:
+        for node, seconds in ticket_trace.get() or []:
+            node_timings[node] = round(node_timings.get(node, 0.0) + seconds * 1000, 1)
+
+        try:
+            ticket_trace.reset(token)
+        except ValueError:
+            # A streamed ticket's generator can be resumed from a different task than the one that started it
+            ticket_trace.set(None)
+
+    if not metrics.enabled:
+        return node_timings
+
+    if error:
+        outcome = "error"
+    elif final_state.get("cache_hit"):
+        outcome = "cache_hit"
+    elif final_state.get("escalated"):
+        outcome = "escalated"
+    else:
+        outcome = "resolved"
+
+    TICKET_SECONDS.observe(time.perf_counter() - started_at, outcome)
+    TICKETS.inc(outcome)
+    if not error:
+        REVIEW_ATTEMPTS.observe(final_state.get("review_attempts", 0))
+
+    if node_timings:
+        logging.info("Ticket %s node timings (ms): %s", outcome, node_timings)
+
+    return node_timings
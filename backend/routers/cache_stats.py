@@ -0,0 +1,24 @@
+
+from fastapi import APIRouter
+
+from services.providers import openai_service, pre_reviewer, semantic_cache, ticket_classifier, context_assembler
+
+
+
+router = APIRouter()
+
+
+
+@router.get("/cache-stats")
+def cache_stats():
+    """Report hit rates for the service caches, the local classification and review tiers, and draft context savings."""
+
+    embedding_cache = openai_service.embedding_cache
+
+    return {
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else {"enabled": False},
+        "semantic_response_cache": semantic_cache.stats(),
+        "ticket_classifier": ticket_classifier.stats(),
+        "pre_review": pre_reviewer.stats(),
+        "context_assembler": context_assembler.stats()
+    }
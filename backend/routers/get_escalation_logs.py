@@ -1,7 +1,11 @@
+import json
+from datetime import datetime
+from typing import Optional, Literal
 
-import pandas as pd
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from services.providers import escalation_store
 
 
 
@@ -9,13 +13,51 @@ router = APIRouter()
 
 
 
+def _store_time(value: Optional[datetime]) -> Optional[str]:
+    """Format a filter bound like stored timestamps, which are naive server-local times."""
+
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+
 @router.get("/escalation-logs")
-def get_escalation_logs():
+def get_escalation_logs(
+    category: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Only escalations at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only escalations before this time"),
+    min_review_attempts: Optional[int] = Query(None, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    order: Literal["asc", "desc"] = Query("desc", description="desc (the default) returns the newest escalations first"),
+    format: Literal["json", "ndjson"] = "json"
+):
+    """Escalations matching the filters: one JSON page (next cursor in X-Next-Cursor) or every match as NDJSON."""
+
+    filters = {
+        "category": category,
+        "since": _store_time(since),
+        "until": _store_time(until),
+        "min_review_attempts": min_review_attempts,
+        "descending": order == "desc"
+    }
+
     try:
-        df = pd.read_csv("escalation.csv")
-        logs = df.to_dict(orient="records")
-        return logs
-    except FileNotFoundError:
-        return JSONResponse(status_code=404, content={"error": "CSV file not found"})
+        if cursor:
+            escalation_store.decode_cursor(cursor)
+
+        if format == "ndjson":
+            # Rows are read and sent a page at a time, so the full history is never held in memory
+            lines = (json.dumps(row, ensure_ascii=False) + "\n" for row in escalation_store.iterate(cursor=cursor, **filters))
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+
+        rows, next_cursor = escalation_store.page(cursor=cursor, limit=limit, **filters)
+        return JSONResponse(content=rows, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from core.metrics import metrics
+
+
+
+router = APIRouter()
+
+
+
+@router.get("/metrics")
+def get_metrics():
+    """Node, ticket, OpenAI and vector store metrics in the Prometheus text exposition format."""
+
+    if not metrics.enabled:
+        return JSONResponse(status_code=404, content={"error": "Metrics are disabled (METRICS_MODE=off)"})
+
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,14 +1,29 @@
 
-from fastapi import APIRouter
+import json
+
+from fastapi import APIRouter, UploadFile, File, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
 from schemas.routes.query import QueryRequest
-from services.langgraph_service import langgraph_service
+from services.providers import langgraph_service, batch_service, admission_controller
+from services.batch_service import iterate_jsonl
+from services.admission_control import AdmissionRejected
 
 
 router = APIRouter()
 
 
 
+def _shed_response(rejection: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"status": "error", "message": str(rejection)},
+        headers={"Retry-After": str(rejection.retry_after)}
+    )
+
+
+
 @router.post("/query")
 async def query(request: QueryRequest):
     """Handle query requests and process them through the LangGraph workflow."""
@@ -16,5 +31,64 @@ async def query(request: QueryRequest):
     subject = request.subject
     description = request.description
 
+    # Wait for a workflow slot in the ticket's priority lane, or shed the request under overload
+    try:
+        slot = await admission_controller.acquire(admission_controller.lane_for(subject, description))
+    except AdmissionRejected as rejection:
+        return _shed_response(rejection)
+
+    async with slot:
+        return await langgraph_service.process_ticket(subject, description)
+
+
+
+@router.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """Process a query and stream workflow progress as server-sent events."""
+
+    # Admitted before the response starts so an overloaded server can still answer 429
+    try:
+        slot = await admission_controller.acquire(admission_controller.lane_for(request.subject, request.description))
+    except AdmissionRejected as rejection:
+        return _shed_response(rejection)
+
+    async def event_stream():
+        async with slot:
+            async for event in langgraph_service.stream_ticket(request.subject, request.description):
+                payload = {**event["data"], "elapsed_ms": event["elapsed_ms"]}
+                yield f"event: {event['event']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+    # The background task releases the slot if the client disconnects before the stream starts
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(slot.release)
+    )
+
+
+
+@router.post("/query/batch")
+async def query_batch(
+    file: UploadFile = File(...),
+    concurrency: int | None = Query(None, ge=1, le=256),
+    timeout: float | None = Query(None, gt=0),
+    ordered: bool = Query(True)
+):
+    """Process an uploaded JSONL file of tickets and stream NDJSON results followed by a summary line."""
+
+    # FastAPI closes the upload once the endpoint returns, before the response body is streamed
+    lines = (await file.read()).splitlines()
+
+    async def result_stream():
+        async for result in batch_service.process(
+            iterate_jsonl(lines),
+            concurrency=concurrency,
+            timeout=timeout,
+            ordered=ordered
+        ):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
 
-    return await langgraph_service.process_ticket(subject, description)
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
@@ -4,11 +4,9 @@ import logging
 
 from fastapi import APIRouter, UploadFile, File, Form
 
-from core.config import settings
-from services.openai_service import openai_service
-from services.pinecone_service import pinecone_service
+from utils.file_operations import process_file
 from schemas.dataclasses.namespace import NamespaceEnum
-from utils.file_operations import process_file, split_and_create_embeddings
+from services.providers import vector_store, ingestion_service
 
 
 
@@ -21,8 +19,9 @@ async def upload_pdf(
     file: UploadFile = File(...),
     namespace: NamespaceEnum = Form(...)
 ):
-    """Upload a PDF file and process it into chunks stored in Pinecone"""
+    """Upload a PDF file and process it into chunks stored in the vector store"""
 
+    processing_result = {}
     
     try:
         # Process the uploaded file
@@ -32,33 +31,14 @@ async def upload_pdf(
 
 
 
-        # Split documents and create embeddings
-        split_result = await split_and_create_embeddings(processing_result.get("documents"), openai_service)
-        if split_result.get("status") == "error":
-            return split_result
-
-
-
-        # Prepare vectors for Pinecone
-        vectors = pinecone_service.prepare_vectors(
-            chunks=split_result.get("chunks"),
-            embeddings=split_result.get("embeddings"),
+        # Parse, split, embed and upsert page by page, with embedding batches streaming into upsert workers
+        ingestion_result = await ingestion_service.ingest(
+            documents=processing_result.get("documents"),
             filename=file.filename,
             namespace=namespace.value
         )
-
-
-
-        # Upsert vectors to Pinecone
-        upsert_vectors_response = pinecone_service.upsert_vectors(
-            vectors=vectors,
-            namespace=namespace.value
-        )
-        if upsert_vectors_response.get("status") == "error":
-            return upsert_vectors_response
-
-
-        total_upserted = upsert_vectors_response.get("total_upserted")
+        if ingestion_result.get("status") == "error":
+            return ingestion_result
 
 
         return {
@@ -67,15 +47,17 @@ async def upload_pdf(
                 "message": "PDF processed successfully",
                 "filename": file.filename,
                 "namespace": namespace.value,
-                "total_chunks": len(split_result.get("chunks")),
-                "total_vectors_upserted": total_upserted,
-                "index_name": settings.PINECONE_INDEX_NAME
+                "total_pages": processing_result.get("total_pages"),
+                "total_chunks": ingestion_result.get("total_chunks"),
+                "total_vectors_upserted": ingestion_result.get("total_upserted"),
+                "index_name": vector_store.index_name,
+                "timings": ingestion_result.get("timings")
             }
         }
 
 
     except Exception as e:
-        logging.error(f"Error processing PDF: {str(e)}")
+        logging.error("Error processing PDF: %s", e)
         return {"status": "error", "message": f"Error processing PDF: {str(e)}"}
 
 
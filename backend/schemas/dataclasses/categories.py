@@ -5,3 +5,24 @@ CATEGORIES = {
     "security": "Security concerns, data breaches, unauthorized access, privacy issues",
     "general": "General inquiries, feedback, feature requests, other non-specific issues"
 }
+
+# Word prefixes that mark a ticket as likely belonging to a category before the LLM has classified it;
+# used only to pick its admission lane
+CATEGORY_KEYWORDS = {
+    "security": (
+        # Incident terms and phrases only: a routine password reset or access question must not jump the queue
+        "breach", "hacked", "unauthori", "compromis", "malware", "ransomware", "stolen", "phish", "fraud",
+        "suspicious", "leak", "exposed", "privacy breach", "unauthorized access", "account takeover",
+        "took over my account", "still has access", "can still log in", "locked out", "two-factor", "2fa",
+        "audit log"
+    ),
+    "technical": (
+        "error", "bug", "crash", "fail", "timeout", "time out", "api", "sdk", "webhook", "endpoint",
+        "integration", "not loading", "500", "502", "503", "sync"
+    ),
+    "billing": (
+        "invoice", "charge", "refund", "payment", "billing", "subscription", "card", "vat", "receipt",
+        "overage", "downgrade", "upgrade"
+    ),
+    "general": ()
+}
@@ -7,9 +7,12 @@ class LanggraphState(TypedDict):
     description: str
     category: str
     retrieved_docs: List[Dict[str, Any]]
+    candidate_pool: List[Dict[str, Any]]
+    context_stats: Dict[str, Any]
     draft_response: str
     review_result: Dict[str, Any]
     review_attempts: int
     final_response: str
     escalated: bool
     query_embedding: List[float]
+    cache_hit: bool
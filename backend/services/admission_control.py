@@ -0,0 +1,251 @@
+
+import re
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+from core.config import settings
+from core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_WAIT_SECONDS, ADMISSION_REJECTED
+from schemas.dataclasses.categories import CATEGORIES, CATEGORY_KEYWORDS
+
+
+
+# Batch backfills queue behind every interactive lane and are never shed
+BATCH_LANE = "batch"
+
+
+
+class AdmissionRejected(Exception):
+    """The ticket was shed; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+
+
+
+class AdmissionSlot:
+    """A granted in-flight slot; released once, on leaving `async with` or by release()."""
+
+    def __init__(self, controller: "AdmissionController", lane: str, waited: float):
+        self.controller = controller
+        self.lane = lane
+        self.waited = waited
+        self.started = time.perf_counter()
+        self.released = False
+
+
+
+
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(time.perf_counter() - self.started)
+
+
+
+
+
+    async def __aenter__(self) -> "AdmissionSlot":
+        return self
+
+
+
+
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+
+
+
+class AdmissionController:
+    """Bounds the tickets running the workflow at once and queues the rest in priority lanes.
+
+    A ticket starts immediately while fewer than `max_in_flight` run and nobody is waiting; otherwise
+    it waits in its lane, and each finished ticket hands its slot to the head of the highest-priority
+    non-empty lane. Interactive tickets are shed with AdmissionRejected when `max_queue` tickets are
+    already waiting (a full queue sheds its newest lower-priority ticket first) or when they have waited
+    `max_wait` seconds, so a burst gets fast 429s instead of every request slowing down together.
+    Runs on the event loop only, so it needs no locks.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, max_wait: float, lanes: List[str]):
+        unknown = [lane for lane in lanes if lane not in CATEGORIES]
+        if unknown:
+            raise ValueError(f"Unknown admission lanes: {unknown}")
+
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.lanes = list(lanes) + [BATCH_LANE]
+        self.default_lane = lanes[-1]
+        self.waiting: Dict[str, deque] = {lane: deque() for lane in self.lanes}
+        self.in_flight = 0
+
+        # Moving average of how long an admitted ticket holds its slot, for Retry-After
+        self.service_seconds = 5.0
+
+        self.patterns = {
+            lane: re.compile(r"\b(" + "|".join(re.escape(keyword) for keyword in CATEGORY_KEYWORDS.get(lane, ())) + ")")
+            for lane in lanes if CATEGORY_KEYWORDS.get(lane)
+        }
+
+
+
+
+
+    def lane_for(self, subject: str, description: str) -> str:
+        """Pick the lane from keywords; the category is only known after the workflow's classification."""
+
+        text = f"{subject} {description}".lower()
+        for lane, pattern in self.patterns.items():
+            if pattern.search(text):
+                return lane
+
+        return self.default_lane
+
+
+
+
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for lane, waiters in self.waiting.items() if lane != BATCH_LANE)
+
+
+
+
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+
+        backlog = self.queued + self.in_flight
+        return max(1, min(60, math.ceil(backlog * self.service_seconds / self.max_in_flight)))
+
+
+
+
+
+    def _reject(self, lane: str, reason: str, message: str):
+        ADMISSION_REJECTED.inc(lane, reason)
+        retry_after = self.retry_after()
+        logging.warning("Shed %s ticket (%s), retry after %d s", lane, reason, retry_after)
+        raise AdmissionRejected(message, retry_after)
+
+
+
+
+
+    async def acquire(self, lane: str, shed: bool = True) -> AdmissionSlot:
+        """Wait for an in-flight slot in `lane`; with shed=False the ticket waits as long as it takes."""
+
+        if self.in_flight < self.max_in_flight and not any(self.waiting.values()):
+            self.in_flight += 1
+            ADMISSION_IN_FLIGHT.set(self.in_flight)
+            ADMISSION_WAIT_SECONDS.observe(0.0, lane)
+            return AdmissionSlot(self, lane, 0.0)
+
+        if shed and self.queued >= self.max_queue and not self._evict_below(lane):
+            self._reject(lane, "queue_full", "The service is at capacity, please retry later")
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiting[lane].append(waiter)
+        ADMISSION_QUEUE_DEPTH.set(len(self.waiting[lane]), lane)
+
+        try:
+            await asyncio.wait_for(waiter, timeout=self.max_wait if shed else None)
+
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended; pass it on
+                self._release(None)
+            elif waiter in self.waiting[lane]:
+                self.waiting[lane].remove(waiter)
+            ADMISSION_QUEUE_DEPTH.set(len(self.waiting[lane]), lane)
+
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject(lane, "timeout", f"The ticket waited over {self.max_wait:.0f}s for capacity, please retry later")
+
+        waited = time.perf_counter() - started
+        ADMISSION_WAIT_SECONDS.observe(waited, lane)
+        return AdmissionSlot(self, lane, waited)
+
+
+
+
+
+    def _evict_below(self, lane: str) -> bool:
+        """Make room for a `lane` ticket in a full queue by shedding the newest ticket of a lower-priority lane."""
+
+        priority = self.lanes.index(lane)
+        for victim_lane in reversed(self.lanes[priority + 1:]):
+            waiters = self.waiting[victim_lane]
+            if victim_lane == BATCH_LANE or not waiters:
+                continue
+
+            ADMISSION_REJECTED.inc(victim_lane, "evicted")
+            waiters.pop().set_exception(AdmissionRejected("The service is at capacity, please retry later", self.retry_after()))
+            ADMISSION_QUEUE_DEPTH.set(len(waiters), victim_lane)
+            logging.warning("Shed queued %s ticket to admit a %s ticket", victim_lane, lane)
+            return True
+
+        return False
+
+
+
+
+
+    def _release(self, held_seconds: Optional[float]):
+        if held_seconds is not None:
+            self.service_seconds += 0.1 * (held_seconds - self.service_seconds)
+
+        self.in_flight -= 1
+
+        # Hand the slot straight to the next waiter, highest-priority lane first
+        for lane in self.lanes:
+            waiters = self.waiting[lane]
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    self.in_flight += 1
+                    ADMISSION_QUEUE_DEPTH.set(len(waiters), lane)
+                    ADMISSION_IN_FLIGHT.set(self.in_flight)
+                    return
+            ADMISSION_QUEUE_DEPTH.set(0, lane)
+
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+
+
+
+
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": {lane: len(waiters) for lane, waiters in self.waiting.items()},
+            "service_seconds": round(self.service_seconds, 3)
+        }
+
+
+
+
+
+def build_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+        max_queue=settings.ADMISSION_MAX_QUEUE,
+        max_wait=settings.ADMISSION_MAX_WAIT_SECONDS,
+        lanes=settings.ADMISSION_LANES
+    )
@@ -0,0 +1,60 @@
+
+import uuid
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any
+
+
+
+class VectorStore(ABC):
+    """Contract shared by the vector store backends used for ingestion and retrieval"""
+
+    index_name: str = ""
+
+
+
+    def prepare_vectors(
+        self, chunks: List, embeddings: List[List[float]],
+        filename: str, namespace: str, start_index: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Prepare vectors for upsert"""
+
+        vectors_to_upsert = []
+
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings), start=start_index):
+            # Create unique ID for the chunk
+            chunk_id = f"{filename}_{namespace}_{i}_{uuid.uuid4().hex[:8]}"
+
+            # Prepare metadata
+            metadata = {
+                "text": chunk.page_content,
+                "source": filename,
+                "namespace": namespace,
+                "chunk_index": i,
+                "page": chunk.metadata.get("page", 0),
+            }
+
+            vectors_to_upsert.append({
+                "id": chunk_id,
+                "values": embedding,
+                "metadata": metadata
+            })
+
+        return vectors_to_upsert
+
+
+
+    @abstractmethod
+    def upsert_vectors(self, vectors: List[Dict[str, Any]], namespace: str, batch_size: int = 100) -> Dict[str, Any]:
+        """Upsert vectors in batches, returning {"status", "total_upserted"} or {"status", "message"}"""
+
+
+
+    @abstractmethod
+    async def aupsert_batch(self, vectors: List[Dict[str, Any]], namespace: str) -> int:
+        """Upsert a single batch without blocking the event loop, returning the number of vectors written"""
+
+
+
+    @abstractmethod
+    async def search(self, query_vector: List[float], namespace: str, top_k: int = 5) -> Dict[str, Any]:
+        """Return {"status": "success", "data": [{"id", "content", "score"}, ...]} ordered by descending score"""
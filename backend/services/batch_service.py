@@ -0,0 +1,201 @@
+
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Any, AsyncIterable, AsyncIterator, Iterable
+
+from pydantic import ValidationError
+
+from core.config import settings
+from core.logging import correlation_id
+from schemas.routes.query import QueryRequest
+from services.providers import langgraph_service, admission_controller
+from services.admission_control import BATCH_LANE
+
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+
+    if not sorted_values:
+        return 0.0
+
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+
+
+
+async def iterate_jsonl(lines: Iterable) -> AsyncIterator:
+    """Adapt a plain iterable of JSONL lines (an open text or binary file) to the async interface of BatchService."""
+
+    for line in lines:
+        yield line
+
+
+
+
+
+class BatchService:
+    """Runs many tickets through the LangGraph workflow with bounded concurrency and per-ticket timeouts"""
+
+    def __init__(self):
+        self.langgraph_service = langgraph_service
+
+
+
+
+
+    async def process(
+        self, lines: AsyncIterable, concurrency: int = None,
+        timeout: float = None, ordered: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one result per JSONL ticket line, then a throughput/latency summary.
+
+        With ordered=True results come back in input order; a slow ticket then holds back later
+        results, and at most `concurrency` tickets are in flight or waiting to be emitted.
+        """
+
+        concurrency = concurrency or settings.BATCH_MAX_CONCURRENCY
+        timeout = timeout or settings.BATCH_TICKET_TIMEOUT_SECONDS
+
+        slots = asyncio.Semaphore(concurrency)
+        results = asyncio.Queue()
+        running = set()
+        started = time.perf_counter()
+
+        # Reads tickets lazily, only as fast as slots free up
+        async def feed():
+            index = 0
+            try:
+                async for line in lines:
+                    if not line.strip():
+                        continue
+
+                    await slots.acquire()
+                    task = asyncio.create_task(self._run_ticket(index, line, timeout, results, slots, release=not ordered))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                    index += 1
+
+                await results.put(("done", index))
+
+            except Exception as e:
+                await results.put(("failed", e))
+
+
+        feeder = asyncio.create_task(feed())
+        emitted = []
+        pending = {}
+        next_index = 0
+        total = None
+
+        try:
+            while total is None or len(emitted) < total:
+                kind, payload = await results.get()
+
+                if kind == "failed":
+                    raise payload
+
+                if kind == "done":
+                    total = payload
+                    continue
+
+                if not ordered:
+                    emitted.append(payload)
+                    yield payload
+                    continue
+
+                pending[payload["index"]] = payload
+                while next_index in pending:
+                    result = pending.pop(next_index)
+                    next_index += 1
+                    slots.release()
+                    emitted.append(result)
+                    yield result
+
+            await feeder
+
+        finally:
+            # Stop reading and abandon in-flight tickets if the consumer goes away early
+            feeder.cancel()
+            for task in list(running):
+                task.cancel()
+
+        yield {"summary": self._summarize(emitted, time.perf_counter() - started, concurrency)}
+
+
+
+
+
+    async def _run_ticket(
+        self, index: int, line, timeout: float,
+        results: asyncio.Queue, slots: asyncio.Semaphore, release: bool
+    ):
+        """Process one JSONL line and put its result on the queue."""
+
+        started = time.perf_counter()
+        result = {"index": index}
+
+        try:
+            ticket = json.loads(line)
+            request = QueryRequest(**ticket)
+            result["id"] = ticket.get("id")
+
+            # Each ticket runs in its own task, so this only tags this ticket's log records (under the batch's request id)
+            ticket_id = str(ticket.get("id") or index)
+            parent_id = correlation_id.get()
+            correlation_id.set(f"{parent_id}/{ticket_id}" if parent_id else ticket_id)
+
+            # Backfill tickets share the workflow slots with live traffic but always yield to it
+            async with await admission_controller.acquire(BATCH_LANE, shed=False):
+                response = await asyncio.wait_for(
+                    self.langgraph_service.process_ticket(request.subject, request.description),
+                    timeout=timeout
+                )
+            result.update(response)
+
+        except (json.JSONDecodeError, ValidationError, TypeError) as e:
+            result.update({"status": "invalid", "message": f"Invalid ticket: {str(e)}"})
+
+        except asyncio.TimeoutError:
+            logging.error("Batch ticket %d timed out after %ss", index, timeout)
+            result.update({"status": "timeout", "message": f"Ticket processing exceeded {timeout}s"})
+
+        except Exception as e:
+            logging.error("Batch ticket %d failed: %s", index, e)
+            result.update({"status": "error", "message": f"An error occurred while processing the ticket: {str(e)}"})
+
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+        if release:
+            slots.release()
+        await results.put(("result", result))
+
+
+
+
+
+    @staticmethod
+    def _summarize(results: list, elapsed: float, concurrency: int) -> Dict[str, Any]:
+        latencies = sorted(result["latency_ms"] for result in results)
+        statuses = [result.get("status") for result in results]
+
+        return {
+            "total": len(results),
+            "succeeded": statuses.count("success"),
+            "failed": statuses.count("error"),
+            "timed_out": statuses.count("timeout"),
+            "invalid": statuses.count("invalid"),
+            "concurrency": concurrency,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_per_second": round(len(results) / elapsed, 3) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": percentile(latencies, 0.50),
+                "p95": percentile(latencies, 0.95),
+                "p99": percentile(latencies, 0.99),
+                "max": latencies[-1] if latencies else 0.0
+            }
+        }
@@ -0,0 +1,214 @@
+
+import re
+import logging
+from typing import List, Dict, Any, Tuple, Optional
+
+from core.config import settings
+from utils.file_operations import estimate_tokens
+
+
+
+CONTEXT_SEPARATOR = "\n\n\n"
+
+
+
+class ContextAssembler:
+    """Packs retrieved documents into the draft prompt's context within a token budget.
+
+    Documents are taken in descending score order. Near-identical chunks (e.g. the same PDF ingested
+    twice) are dropped, text repeated through the splitter's chunk overlap is trimmed, and documents
+    that no longer fit the budget are left out.
+    """
+
+    def __init__(self, max_tokens: int, dedup_threshold: float, min_overlap: int, max_overlap: int):
+        self.max_tokens = max_tokens
+        self.dedup_threshold = dedup_threshold
+        self.min_overlap = min_overlap
+        self.max_overlap = max_overlap
+
+        # Loaded here, when the provider is built at startup, because a cold tiktoken cache downloads
+        # the vocabulary synchronously and would otherwise block the event loop on the first draft
+        self._encoding = self._load_encoding()
+
+        self.tickets = 0
+        self.tokens_saved = 0
+
+
+
+
+
+    @staticmethod
+    def _load_encoding():
+        """The model's tiktoken encoding; without it (e.g. no network for the vocab) fall back to estimates."""
+
+        try:
+            import tiktoken
+
+            try:
+                return tiktoken.encoding_for_model(settings.MODEL_NAME)
+            except KeyError:
+                return tiktoken.get_encoding("o200k_base")
+
+        except Exception as e:
+            logging.warning("tiktoken encoding unavailable, using character-based token estimates: %s", e)
+            return None
+
+
+
+
+
+    def count_tokens(self, text: str) -> int:
+        encoding = self._encoding
+        return len(encoding.encode(text, disallowed_special=())) if encoding else estimate_tokens(text)
+
+
+
+
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        encoding = self._encoding
+        if encoding:
+            return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+        return text[:max_tokens * 4]
+
+
+
+
+
+    @staticmethod
+    def _shingles(text: str) -> set:
+        words = re.findall(r"\w+", text.lower())
+        return {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+
+
+
+
+    def _is_near_duplicate(self, shingles: set, packed_shingles: List[set]) -> bool:
+        for other in packed_shingles:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.dedup_threshold:
+                return True
+        return False
+
+
+
+
+
+    def _overlap(self, head: str, tail: str) -> int:
+        """Length of the longest suffix of `head` that is also a prefix of `tail`, if at least min_overlap."""
+
+        window = head[-self.max_overlap:]
+        probe = tail[:self.min_overlap]
+        if len(probe) < self.min_overlap:
+            return 0
+
+        # The first match is the longest candidate overlap
+        start = window.find(probe)
+        while start != -1:
+            if tail.startswith(window[start:]):
+                return len(window) - start
+            start = window.find(probe, start + 1)
+
+        return 0
+
+
+
+
+
+    def _trim_overlap(self, text: str, packed: List[str]) -> str:
+        """Cut the parts of `text` that a neighbouring packed chunk already contains."""
+
+        for other in packed:
+            overlap = self._overlap(other, text)
+            if overlap:
+                text = text[overlap:].lstrip()
+
+            overlap = self._overlap(text, other)
+            if overlap:
+                text = text[:-overlap].rstrip()
+
+        return text
+
+
+
+
+
+    def assemble(self, documents: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """Return the packed context and per-ticket stats (tokens before and after packing, documents dropped)."""
+
+        max_tokens = max_tokens or self.max_tokens
+        separator_tokens = self.count_tokens(CONTEXT_SEPARATOR)
+
+        packed = []
+        packed_shingles = []
+        used_tokens = 0
+        original_tokens = 0
+        duplicates = 0
+        over_budget = 0
+
+        for doc in sorted(documents, key=lambda doc: doc.get("score", 0), reverse=True):
+            content = doc.get("content", "")
+            original_tokens += self.count_tokens(content) + separator_tokens
+
+            shingles = self._shingles(content)
+            if self._is_near_duplicate(shingles, packed_shingles):
+                duplicates += 1
+                continue
+
+            content = self._trim_overlap(content, packed)
+            if not content:
+                duplicates += 1
+                continue
+
+            tokens = self.count_tokens(content) + separator_tokens
+            if used_tokens + tokens > max_tokens:
+                # The best document is always included, cut to the budget if needed
+                if packed:
+                    over_budget += 1
+                    continue
+
+                content = self._truncate(content, max_tokens - separator_tokens)
+                tokens = max_tokens
+
+            packed.append(content)
+            packed_shingles.append(shingles)
+            used_tokens += tokens
+
+        stats = {
+            "documents": len(documents),
+            "packed_documents": len(packed),
+            "duplicates_dropped": duplicates,
+            "over_budget_dropped": over_budget,
+            "original_tokens": original_tokens,
+            "packed_tokens": used_tokens,
+            "tokens_saved": original_tokens - used_tokens
+        }
+
+        self.tickets += 1
+        self.tokens_saved += stats["tokens_saved"]
+
+        return "".join(content + CONTEXT_SEPARATOR for content in packed), stats
+
+
+
+
+
+    def stats(self) -> dict:
+        return {
+            "tickets": self.tickets,
+            "tokens_saved": self.tokens_saved,
+            "average_tokens_saved": round(self.tokens_saved / self.tickets, 1) if self.tickets else 0.0
+        }
+
+
+
+
+
+def build_context_assembler() -> ContextAssembler:
+    return ContextAssembler(
+        max_tokens=settings.DRAFT_CONTEXT_MAX_TOKENS,
+        dedup_threshold=settings.CONTEXT_DEDUP_THRESHOLD,
+        min_overlap=settings.CONTEXT_MIN_OVERLAP_CHARS,
+        max_overlap=settings.CONTEXT_MAX_OVERLAP_CHARS
+    )
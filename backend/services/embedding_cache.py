@@ -0,0 +1,272 @@
+
+import os
+import time
+import asyncio
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import List, Optional
+from collections import OrderedDict
+
+import numpy as np
+
+from core.config import settings
+
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold and collapse whitespace so trivially different tickets share a cache key."""
+
+    return " ".join(text.lower().split())
+
+
+
+
+
+def cache_key(text: str, model: str) -> str:
+    """Hash of the model name and normalized text; switching embedding models never reuses stale vectors."""
+
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+
+
+
+class MemoryEmbeddingCache:
+    """In-process LRU tier with a per-entry TTL. Vectors are kept as float32 arrays."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+
+
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        vector, expires_at = entry
+        if expires_at < time.time():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return vector
+
+
+
+    def set(self, key: str, vector: np.ndarray):
+        self.entries[key] = (vector, time.time() + self.ttl_seconds)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+
+    def clear(self):
+        self.entries.clear()
+
+
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+
+
+
+class SqliteEmbeddingCache:
+    """On-disk tier that survives restarts and is shared by every worker pointing at the same file."""
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float, evict_every: int = 100):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evict_every = evict_every
+        self.writes_since_eviction = 0
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+        self.connection.commit()
+
+
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        now = time.time()
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT vector FROM embeddings WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self.connection.execute("UPDATE embeddings SET last_access = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+
+        return np.frombuffer(row[0], dtype=np.float32)
+
+
+
+    def set(self, key: str, vector: np.ndarray):
+        now = time.time()
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, vector.tobytes(), now, now)
+            )
+
+            self.writes_since_eviction += 1
+            if self.writes_since_eviction >= self.evict_every:
+                self._evict(now)
+
+            self.connection.commit()
+
+
+
+    def _evict(self, now: float):
+        """Drop expired rows, then the least recently used rows beyond max_entries. Caller holds the lock."""
+
+        self.writes_since_eviction = 0
+        self.connection.execute("DELETE FROM embeddings WHERE created_at <= ?", (now - self.ttl_seconds,))
+        self.connection.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM embeddings")
+            self.connection.commit()
+
+
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+
+
+
+class EmbeddingCache:
+    """Two-tier query-embedding cache: an in-memory LRU in front of an optional SQLite store."""
+
+    def __init__(self, memory: MemoryEmbeddingCache, disk: Optional[SqliteEmbeddingCache] = None, model: str = ""):
+        self.memory = memory
+        self.disk = disk
+        self.model = model
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+
+
+
+
+    async def get(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for text, promoting disk hits into memory."""
+
+        key = cache_key(text, self.model)
+
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.memory_hits += 1
+            return vector.tolist()
+
+        if self.disk is not None:
+            vector = await asyncio.to_thread(self.disk.get, key)
+            if vector is not None:
+                self.disk_hits += 1
+                self.memory.set(key, vector)
+                return vector.tolist()
+
+        self.misses += 1
+        return None
+
+
+
+
+
+    async def set(self, text: str, embedding: List[float]):
+        """Store an embedding in every tier."""
+
+        key = cache_key(text, self.model)
+        vector = np.asarray(embedding, dtype=np.float32)
+
+        self.memory.set(key, vector)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, vector)
+
+
+
+
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+
+
+
+    def stats(self) -> dict:
+        """Hit/miss counters and hit rate since startup."""
+
+        lookups = self.memory_hits + self.disk_hits + self.misses
+
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory)
+        }
+
+
+
+
+
+def build_embedding_cache() -> Optional[EmbeddingCache]:
+    """Build the query-embedding cache from settings, or None when caching is disabled."""
+
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+
+    memory = MemoryEmbeddingCache(
+        max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS
+    )
+
+    disk = None
+    if settings.EMBEDDING_CACHE_DB_PATH:
+        try:
+            disk = SqliteEmbeddingCache(
+                path=settings.EMBEDDING_CACHE_DB_PATH,
+                max_entries=settings.EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+                ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS
+            )
+        except sqlite3.Error as e:
+            logging.error("Failed to open embedding cache database, using memory tier only: %s", e)
+
+    return EmbeddingCache(memory=memory, disk=disk, model=settings.EMBEDDING_MODEL_NAME)
@@ -0,0 +1,220 @@
+
+import os
+import csv
+import json
+import base64
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from core.config import settings
+
+
+
+COLUMNS = ["timestamp", "subject", "description", "category", "review_attempts", "issues", "draft_response"]
+
+
+
+class EscalationStore:
+    """Escalated tickets in SQLite (WAL mode), shared safely by every worker pointing at the same file.
+
+    Each write is a single short transaction, so concurrent uvicorn workers serialize on SQLite's
+    own lock instead of interleaving appends to a CSV. On first start the legacy escalation CSV
+    is imported once.
+    """
+
+    def __init__(self, path: str, legacy_csv_path: str = None):
+        self.path = path
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS escalations ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, subject TEXT, description TEXT, "
+            "category TEXT, review_attempts INTEGER, issues TEXT, draft_response TEXT)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_escalations_timestamp ON escalations (timestamp)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_escalations_category ON escalations (category, timestamp)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, applied_at TEXT NOT NULL)")
+        self.connection.commit()
+
+        if legacy_csv_path:
+            self._migrate_csv(legacy_csv_path)
+
+
+
+
+
+    def _migrate_csv(self, csv_path: str):
+        """Import the legacy CSV exactly once, even when several workers start at the same time."""
+
+        with self.lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so only one worker can check and import
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                applied = self.connection.execute(
+                    "SELECT 1 FROM migrations WHERE name = 'escalation_csv'"
+                ).fetchone()
+
+                imported = 0
+                if not applied and os.path.exists(csv_path):
+                    with open(csv_path, newline="", encoding="utf-8") as file:
+                        rows = [self._row(record) for record in csv.DictReader(file)]
+
+                    self.connection.executemany(
+                        f"INSERT INTO escalations ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                        rows
+                    )
+                    imported = len(rows)
+
+                if not applied:
+                    self.connection.execute(
+                        "INSERT INTO migrations (name, applied_at) VALUES ('escalation_csv', ?)",
+                        (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),)
+                    )
+
+                self.connection.commit()
+
+            except Exception:
+                self.connection.rollback()
+                raise
+
+        if imported:
+            logging.info("Migrated %d escalations from %s to %s", imported, csv_path, self.path)
+
+
+
+
+
+    @staticmethod
+    def _row(record: Dict[str, Any]) -> tuple:
+        try:
+            review_attempts = int(record.get("review_attempts") or 0)
+        except ValueError:
+            review_attempts = 0
+
+        return (
+            record.get("timestamp") or "",
+            record.get("subject", ""),
+            record.get("description", ""),
+            (record.get("category") or "").strip().lower(),
+            review_attempts,
+            record.get("issues", ""),
+            record.get("draft_response", "")
+        )
+
+
+
+
+
+    def add(self, record: Dict[str, Any]) -> int:
+        """Insert one escalation and return its id."""
+
+        with self.lock:
+            cursor = self.connection.execute(
+                f"INSERT INTO escalations ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                self._row(record)
+            )
+            self.connection.commit()
+
+        return cursor.lastrowid
+
+
+
+
+
+    @staticmethod
+    def encode_cursor(timestamp: str, row_id: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps([timestamp, row_id]).encode()).decode()
+
+
+
+
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, int]:
+        try:
+            timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return str(timestamp), int(row_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+
+
+
+
+    def page(
+        self, category: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+        min_review_attempts: Optional[int] = None, cursor: Optional[str] = None,
+        limit: int = 100, descending: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of escalations matching the filters, plus the cursor for the next page (None on the last).
+
+        Pagination is keyset-based on (timestamp, id), so every page is an index range scan no matter
+        how deep into the history it is. `since` is inclusive and `until` exclusive.
+        """
+
+        conditions, parameters = [], []
+
+        if category:
+            conditions.append("category = ?")
+            parameters.append(category.strip().lower())
+        if since:
+            conditions.append("timestamp >= ?")
+            parameters.append(since)
+        if until:
+            conditions.append("timestamp < ?")
+            parameters.append(until)
+        if min_review_attempts is not None:
+            conditions.append("review_attempts >= ?")
+            parameters.append(min_review_attempts)
+        if cursor:
+            conditions.append(f"(timestamp, id) {'<' if descending else '>'} (?, ?)")
+            parameters.extend(self.decode_cursor(cursor))
+
+        direction = "DESC" if descending else "ASC"
+        sql = (
+            f"SELECT id, {', '.join(COLUMNS)} FROM escalations"
+            f"{' WHERE ' + ' AND '.join(conditions) if conditions else ''}"
+            f" ORDER BY timestamp {direction}, id {direction} LIMIT ?"
+        )
+
+        # One extra row tells whether another page exists
+        with self.lock:
+            rows = self.connection.execute(sql, parameters + [limit + 1]).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1][1], rows[-1][0])
+
+        return [dict(zip(["id"] + COLUMNS, row)) for row in rows], next_cursor
+
+
+
+
+
+    def iterate(self, page_size: int = 500, **filters: Any) -> Iterator[Dict[str, Any]]:
+        """Yield every matching escalation page by page, holding at most one page in memory."""
+
+        cursor = filters.pop("cursor", None)
+        while True:
+            rows, cursor = self.page(cursor=cursor, limit=page_size, **filters)
+            yield from rows
+
+            if cursor is None:
+                return
+
+
+
+
+
+def build_escalation_store() -> EscalationStore:
+    return EscalationStore(settings.ESCALATION_DB_PATH, legacy_csv_path=settings.ESCALATION_CSV_PATH)
@@ -0,0 +1,220 @@
+
+import time
+import asyncio
+import logging
+from typing import List, Dict, Any, Iterable, Iterator
+
+import numpy as np
+
+from core.config import settings
+from services.providers import openai_service, semantic_cache, vector_store
+from utils.file_operations import iter_token_budget_batches
+
+
+
+class StageTimer:
+    """Tracks the wall-clock span and the summed busy time of one pipeline stage."""
+
+    def __init__(self):
+        self.first_start = None
+        self.last_end = None
+        self.busy = 0.0
+
+
+
+    def record(self, start: float, end: float):
+        self.first_start = start if self.first_start is None else min(self.first_start, start)
+        self.last_end = end if self.last_end is None else max(self.last_end, end)
+        self.busy += end - start
+
+
+
+    def to_dict(self) -> Dict[str, float]:
+        wall = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+        return {"wall_seconds": round(wall, 3), "busy_seconds": round(self.busy, 3)}
+
+
+
+
+
+class IngestionService:
+    """Streams document chunks through embedding and vector store upserts as overlapping stages"""
+
+    def __init__(self):
+        self.openai_service = openai_service
+        self.vector_store = vector_store
+
+
+
+
+
+    async def ingest(self, documents: Iterable, filename: str, namespace: str) -> Dict[str, Any]:
+        """Split, embed and upsert documents as a stream, with embedding batches feeding upsert workers.
+
+        `documents` may be a lazy iterator (e.g. utils.file_operations.iter_pdf_pages); it is consumed a
+        batch at a time, so at most EMBEDDING_BATCH_CONCURRENCY batches plus INGEST_QUEUE_SIZE upsert
+        batches are held in memory however long the document is.
+        """
+
+        started = time.perf_counter()
+
+        try:
+            parse_timer = StageTimer()
+            embedding_timer = StageTimer()
+            upsert_timer = StageTimer()
+            counts = {"documents": 0, "chunks": 0}
+
+            # Bounded queue: embedding stalls once upserts fall behind instead of buffering every vector.
+            queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+            worker_count = settings.INGEST_UPSERT_CONCURRENCY
+
+            producer = asyncio.create_task(self._produce(
+                self._chunk_batches(documents, counts), filename, namespace,
+                queue, worker_count, parse_timer, embedding_timer
+            ))
+            workers = [
+                asyncio.create_task(self._upsert_worker(queue, namespace, upsert_timer))
+                for _ in range(worker_count)
+            ]
+
+            tasks = [producer, *workers]
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                if task.exception():
+                    raise task.exception()
+
+            if not counts["chunks"]:
+                return {"status": "error", "message": "No chunks could be created from the document"}
+
+            total_upserted = sum(worker.result() for worker in workers)
+            total_seconds = time.perf_counter() - started
+
+            logging.info("Ingested %d chunks into namespace '%s' in %.2fs", counts['chunks'], namespace, total_seconds)
+
+            # Cached answers for this category were grounded in the previous knowledge base
+            semantic_cache.invalidate(namespace)
+
+            return {
+                "status": "success",
+                "total_documents": counts["documents"],
+                "total_chunks": counts["chunks"],
+                "total_upserted": total_upserted,
+                "timings": {
+                    "parse_and_split": parse_timer.to_dict(),
+                    "embedding": embedding_timer.to_dict(),
+                    "upsert": upsert_timer.to_dict(),
+                    "total_seconds": round(total_seconds, 3)
+                }
+            }
+
+        except Exception as e:
+            logging.error("Ingestion pipeline error: %s", e)
+            return {"status": "error", "message": f"Failed to ingest document: {str(e)}"}
+
+
+
+
+
+    def _chunk_batches(self, documents: Iterable, counts: Dict[str, int]) -> Iterator[List]:
+        """Split documents one at a time and group the chunks into token-budgeted embedding batches."""
+
+        def chunks():
+            for document in documents:
+                counts["documents"] += 1
+                for chunk in self.openai_service.text_splitter.split_documents([document]):
+                    counts["chunks"] += 1
+                    yield chunk
+
+        return iter_token_budget_batches(chunks(), text=lambda chunk: chunk.page_content)
+
+
+
+
+
+    async def _produce(
+        self, batches: Iterator[List], filename: str, namespace: str, queue: asyncio.Queue,
+        worker_count: int, parse_timer: StageTimer, embedding_timer: StageTimer
+    ):
+        """Pull chunk batches, embed several concurrently and push ready-to-upsert vector batches onto the queue."""
+
+        semaphore = asyncio.Semaphore(settings.EMBEDDING_BATCH_CONCURRENCY)
+        upsert_batch_size = settings.PINECONE_UPSERT_BATCH_SIZE
+
+
+        async def embed_and_enqueue(start_index, batch_chunks):
+            try:
+                start = time.perf_counter()
+                embeddings = await self.openai_service.embed_batch([chunk.page_content for chunk in batch_chunks])
+                embedding_timer.record(start, time.perf_counter())
+
+                # A float32 row takes ~1/8 of the memory of a list of Python floats while it waits in the queue;
+                # both vector stores accept arrays
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+
+                vectors = self.vector_store.prepare_vectors(
+                    chunks=batch_chunks,
+                    embeddings=embeddings,
+                    filename=filename,
+                    namespace=namespace,
+                    start_index=start_index
+                )
+                for i in range(0, len(vectors), upsert_batch_size):
+                    await queue.put(vectors[i:i + upsert_batch_size])
+
+            finally:
+                semaphore.release()
+
+
+        tasks = []
+        offset = 0
+        try:
+            while True:
+                # A slot is taken before the next batch is parsed, so parsing never runs ahead of embedding
+                await semaphore.acquire()
+
+                for task in [task for task in tasks if task.done()]:
+                    tasks.remove(task)
+                    task.result()
+
+                # PDF parsing and splitting are blocking, so the next batch is pulled in a worker thread
+                start = time.perf_counter()
+                batch_chunks = await asyncio.to_thread(next, batches, None)
+                parse_timer.record(start, time.perf_counter())
+
+                if batch_chunks is None:
+                    semaphore.release()
+                    break
+
+                tasks.append(asyncio.create_task(embed_and_enqueue(offset, batch_chunks)))
+                offset += len(batch_chunks)
+
+            await asyncio.gather(*tasks)
+
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        # One sentinel per worker signals that no more batches are coming
+        for _ in range(worker_count):
+            await queue.put(None)
+
+
+
+
+
+    async def _upsert_worker(self, queue: asyncio.Queue, namespace: str, timer: StageTimer) -> int:
+        """Drain vector batches from the queue into the vector store until the sentinel arrives."""
+
+        total_upserted = 0
+
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return total_upserted
+
+            start = time.perf_counter()
+            total_upserted += await self.vector_store.aupsert_batch(batch, namespace)
+            timer.record(start, time.perf_counter())
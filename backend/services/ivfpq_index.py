@@ -0,0 +1,313 @@
+
+import os
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+
+def assign_nearest(data: np.ndarray, centroids: np.ndarray, batch_size: int = 4096) -> np.ndarray:
+    """Index of the nearest centroid (L2) for every row, computed in batches to bound temporary memory."""
+
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(len(data), dtype=np.int32)
+
+    for start in range(0, len(data), batch_size):
+        batch = np.asarray(data[start:start + batch_size], dtype=np.float32)
+        distances = centroid_norms - 2 * (batch @ centroids.T)
+        assignments[start:start + batch_size] = distances.argmin(axis=1)
+
+    return assignments
+
+
+
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 12, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd's k-means; empty clusters are re-seeded from random points."""
+
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].astype(np.float32)
+
+    for _ in range(iterations):
+        assignments = assign_nearest(data, centroids)
+
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=k)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+
+        centroids[filled] = np.add.reduceat(data[order], starts, axis=0) / counts[filled, None]
+
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), size=len(empty), replace=False)]
+
+    return centroids
+
+
+
+
+
+class IVFPQIndex:
+    """Inverted-file index with product-quantized residuals, for inner-product search over unit vectors.
+
+    Vectors are assigned to the nearest of `nlist` coarse centroids and the residual is split into
+    `subspaces` pieces, each stored as a one-byte code into a 256-entry codebook. A 3072-dim float32
+    vector (12 KiB) becomes `subspaces` bytes plus a list id. Each list keeps the rows assigned to it,
+    so search gathers candidates from the `nprobe` closest lists only, scores them with per-query
+    lookup tables and optionally re-ranks a shortlist exactly against the full vectors.
+    """
+
+    CODEBOOK_SIZE = 256
+
+    def __init__(self, path: str, dimension: int, nlist: int, subspaces: int):
+        if dimension % subspaces:
+            raise ValueError(f"Dimension {dimension} is not divisible into {subspaces} subspaces")
+
+        self.dimension = dimension
+        self.nlist = nlist
+        self.subspaces = subspaces
+        self.subspace_dimension = dimension // subspaces
+
+        self.model_path = os.path.join(path, "ivfpq_model.npz")
+        self.assignments_path = os.path.join(path, "ivfpq_assignments.i32")
+        self.codes_path = os.path.join(path, "ivfpq_codes.u8")
+
+        self.coarse_centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None
+        self.assignments = np.empty(0, dtype=np.int32)
+        self.codes = np.empty((0, subspaces), dtype=np.uint8)
+
+        # Rows of each coarse list, in buffers that grow geometrically; list_sizes[i] of list_rows[i] are used
+        self.list_rows: List[np.ndarray] = []
+        self.list_sizes = np.empty(0, dtype=np.int64)
+
+        self._load()
+
+
+
+
+
+    @property
+    def trained(self) -> bool:
+        return self.coarse_centroids is not None
+
+
+
+
+
+    @property
+    def resident_bytes(self) -> int:
+        if not self.trained:
+            return 0
+        return (
+            self.coarse_centroids.nbytes + self.codebooks.nbytes + self.assignments.nbytes + self.codes.nbytes
+            + sum(rows.nbytes for rows in self.list_rows)
+        )
+
+
+
+
+
+    def _load(self):
+        if not os.path.exists(self.model_path):
+            return
+
+        model = np.load(self.model_path)
+        if model["codebooks"].shape[0] != self.subspaces or model["coarse_centroids"].shape[1] != self.dimension:
+            logging.warning("Ignoring IVF-PQ model at %s built with different parameters", self.model_path)
+            return
+
+        self.coarse_centroids = model["coarse_centroids"]
+        self.codebooks = model["codebooks"]
+        self.assignments = np.fromfile(self.assignments_path, dtype=np.int32)
+        self.codes = np.fromfile(self.codes_path, dtype=np.uint8).reshape(-1, self.subspaces)
+        self._build_lists()
+
+
+
+
+
+    def _build_lists(self):
+        """Group the encoded rows by coarse list; rows with list id -1 were never encoded and stay out."""
+
+        encoded = np.flatnonzero(self.assignments >= 0)
+        order = encoded[np.argsort(self.assignments[encoded], kind="stable")]
+        self.list_sizes = np.bincount(self.assignments[encoded], minlength=len(self.coarse_centroids)).astype(np.int64)
+        self.list_rows = np.split(order.astype(np.int32), np.cumsum(self.list_sizes)[:-1])
+
+
+
+
+
+    def train(self, vectors: np.ndarray, sample_size: int = 10_000, seed: int = 0):
+        """Learn coarse centroids and PQ codebooks from a sample, then encode every vector.
+
+        Works in memory only, so it can run while searches use another index; save() persists the result.
+        """
+
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(len(vectors), size=min(len(vectors), sample_size), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+
+        coarse_centroids = kmeans(sample, min(self.nlist, len(sample)), seed=seed)
+        residuals = sample - coarse_centroids[assign_nearest(sample, coarse_centroids)]
+
+        codebooks = np.stack([
+            kmeans(self._subspace(residuals, m), min(self.CODEBOOK_SIZE, len(sample)), seed=seed + m)
+            for m in range(self.subspaces)
+        ])
+
+        self.coarse_centroids = coarse_centroids
+        self.codebooks = codebooks
+        self.assignments = np.empty(len(vectors), dtype=np.int32)
+        self.codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+
+        for start in range(0, len(vectors), 50_000):
+            batch = np.asarray(vectors[start:start + 50_000], dtype=np.float32)
+            self.assignments[start:start + len(batch)], self.codes[start:start + len(batch)] = self.encode(batch)
+
+        self._build_lists()
+        logging.info("Trained IVF-PQ index on %d samples and encoded %d vectors", len(sample), len(vectors))
+
+
+
+
+
+    def save(self):
+        """Write the model and every encoded row, replacing whatever is on disk."""
+
+        np.savez(self.model_path, coarse_centroids=self.coarse_centroids, codebooks=self.codebooks)
+        self.assignments.tofile(self.assignments_path)
+        self.codes.tofile(self.codes_path)
+
+
+
+
+
+    def _subspace(self, data: np.ndarray, m: int) -> np.ndarray:
+        return data[:, m * self.subspace_dimension:(m + 1) * self.subspace_dimension]
+
+
+
+
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Coarse list ids and PQ codes for a batch of vectors."""
+
+        assignments = assign_nearest(vectors, self.coarse_centroids)
+        residuals = vectors - self.coarse_centroids[assignments]
+
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        for m in range(self.subspaces):
+            codes[:, m] = assign_nearest(self._subspace(residuals, m), self.codebooks[m])
+
+        return assignments, codes
+
+
+
+
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray, persist: bool = True):
+        """Encode vectors into the given rows (new or existing) and, unless persist=False, write them to disk."""
+
+        rows = np.asarray(rows, dtype=np.int64)
+        assignments, codes = self.encode(vectors)
+
+        size = int(rows.max()) + 1
+        if size > len(self.assignments):
+            # Rows skipped over get list id -1 until they are encoded
+            self.assignments = np.concatenate([self.assignments, np.full(size - len(self.assignments), -1, dtype=np.int32)])
+            self.codes = np.concatenate([self.codes, np.zeros((size - len(self.codes), self.subspaces), dtype=np.uint8)])
+
+        previous = self.assignments[rows]
+        for row, old_list in zip(rows[previous >= 0], previous[previous >= 0]):
+            self._remove_from_list(int(old_list), int(row))
+
+        self.assignments[rows] = assignments
+        self.codes[rows] = codes
+
+        order = np.argsort(assignments, kind="stable")
+        lists, starts = np.unique(assignments[order], return_index=True)
+        for list_id, list_rows in zip(lists, np.split(rows[order], starts[1:])):
+            self._append_to_list(int(list_id), list_rows)
+
+        if not persist:
+            return
+
+        # Appends are the common case; write each contiguous run of rows in place
+        with open(self.assignments_path, "r+b") as assignments_file, open(self.codes_path, "r+b") as codes_file:
+            for run in np.split(np.sort(rows), np.flatnonzero(np.diff(np.sort(rows)) != 1) + 1):
+                first, last = int(run[0]), int(run[-1]) + 1
+
+                assignments_file.seek(first * 4)
+                assignments_file.write(self.assignments[first:last].tobytes())
+                codes_file.seek(first * self.subspaces)
+                codes_file.write(self.codes[first:last].tobytes())
+
+
+
+
+
+    def _append_to_list(self, list_id: int, rows: np.ndarray):
+        size = self.list_sizes[list_id]
+        buffer = self.list_rows[list_id]
+        if size + len(rows) > len(buffer):
+            grown = np.empty(max(size + len(rows), 2 * len(buffer), 16), dtype=np.int32)
+            grown[:size] = buffer[:size]
+            self.list_rows[list_id] = buffer = grown
+
+        buffer[size:size + len(rows)] = rows
+        self.list_sizes[list_id] = size + len(rows)
+
+
+
+
+
+    def _remove_from_list(self, list_id: int, row: int):
+        """Drop a re-encoded row from its old list by moving the list's last row into its place."""
+
+        size = self.list_sizes[list_id]
+        buffer = self.list_rows[list_id]
+        position = np.flatnonzero(buffer[:size] == row)
+        if len(position):
+            buffer[position[0]] = buffer[size - 1]
+            self.list_sizes[list_id] = size - 1
+
+
+
+
+
+    def search(
+        self, query: np.ndarray, top_k: int, count: int, nprobe: int,
+        rerank: int = 0, matrix: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and scores of the approximate top_k among the first `count` rows."""
+
+        coarse_scores = self.coarse_centroids @ query
+        nprobe = min(nprobe, len(coarse_scores))
+        probes = np.argpartition(-coarse_scores, nprobe - 1)[:nprobe]
+
+        # unique() also drops a row seen twice while a concurrent add() moves it between lists
+        candidates = np.unique(np.concatenate([self.list_rows[probe][:self.list_sizes[probe]] for probe in probes]))
+        candidates = candidates[candidates < count]
+        if not len(candidates):
+            return candidates, np.empty(0, dtype=np.float32)
+
+        # Per-query lookup table: inner product of each query piece with every codeword
+        table = np.einsum("mkd,md->mk", self.codebooks, query.reshape(self.subspaces, self.subspace_dimension))
+        scores = coarse_scores[self.assignments[candidates]] + table[np.arange(self.subspaces), self.codes[candidates]].sum(axis=1)
+
+        shortlist_size = min(len(candidates), max(top_k, rerank))
+        shortlist = np.argpartition(-scores, shortlist_size - 1)[:shortlist_size]
+        rows, scores = candidates[shortlist], scores[shortlist]
+
+        if rerank and matrix is not None:
+            order = np.argsort(rows)
+            rows = rows[order]
+            scores = np.asarray(matrix[rows]) @ query
+
+        best = np.argsort(-scores)[:top_k]
+        return rows[best], scores[best]
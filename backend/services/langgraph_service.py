@@ -1,15 +1,20 @@
 
-import os
-import csv
+import time
+import asyncio
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, AsyncIterator
 from datetime import datetime
 
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 
-from services.openai_service import openai_service
+from core.config import settings
+from core.metrics import instrument_node, start_ticket, finish_ticket
+from services.providers import (
+    openai_service, vector_store, semantic_cache, context_assembler,
+    pre_reviewer, escalation_store, ticket_classifier
+)
+from services.prompt_templates import DRAFT_FALLBACK_RESPONSE
 from schemas.dataclasses.categories import CATEGORIES
-from services.pinecone_service import pinecone_service
 from schemas.dataclasses.langgraph_state import LanggraphState
 
 
@@ -17,22 +22,7 @@ from schemas.dataclasses.langgraph_state import LanggraphState
 class LanggraphService:
     def __init__(self):
         self.graph = self._create_workflow()
-        self.escalation_file = "escalation.csv"
-        self._ensure_escalation_file_exists()
-
-
-
-
-
-    def _ensure_escalation_file_exists(self):
-        """Ensure the escalation CSV file exists with proper headers."""
-        if not os.path.exists(self.escalation_file):
-            with open(self.escalation_file, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    'timestamp', 'subject', 'description', 'category', 
-                    'review_attempts', 'issues', 'draft_response'
-                ])
+        self.escalation_store = escalation_store
 
 
 
@@ -43,17 +33,38 @@ class LanggraphService:
 
         workflow = StateGraph(LanggraphState)
 
-        # Add nodes
-        workflow.add_node("classify", self._classify_ticket)
-        workflow.add_node("retrieve", self._retrieve_documents)
-        workflow.add_node("draft", self._draft_response)
-        workflow.add_node("review", self._review_response)
-        workflow.add_node("refine", self._refine_context)
-        workflow.add_node("escalate", self._escalate_ticket)
-        workflow.add_node("finalize", self._finalize_response)
-
-        # Add edges
-        workflow.add_edge("classify", "retrieve")
+        nodes = {
+            "classify": self._classify_ticket,
+            "embed": self._embed_query,
+            "check_cache": self._check_response_cache,
+            "retrieve": self._retrieve_documents,
+            "draft": self._draft_response,
+            "review": self._review_response,
+            "refine": self._refine_context,
+            "escalate": self._escalate_ticket,
+            "finalize": self._finalize_response
+        }
+
+        # Add nodes, each timed into the per-node latency histogram
+        for name, node in nodes.items():
+            workflow.add_node(name, instrument_node(name, node))
+
+        # Classification and query embedding are independent, so they run as parallel branches
+        # and join before anything that needs the category (cache lookup, namespace search)
+        workflow.add_edge(START, "classify")
+        workflow.add_edge(START, "embed")
+        workflow.add_edge(["classify", "embed"], "check_cache")
+
+        # A near-identical, already approved ticket in the same category skips drafting and review
+        workflow.add_conditional_edges(
+            "check_cache",
+            self._route_after_cache_check,
+            {
+                "hit": END,
+                "miss": "retrieve"
+            }
+        )
+
         workflow.add_edge("retrieve", "draft")
         workflow.add_edge("draft", "review")
 
@@ -72,45 +83,67 @@ class LanggraphService:
         workflow.add_edge("escalate", END)
         workflow.add_edge("finalize", END)
 
-        # Set entry point
-        workflow.set_entry_point("classify")
-
         return workflow.compile()
 
 
 
 
 
+    @staticmethod
+    def _initial_state(subject: str, description: str) -> LanggraphState:
+        """Build the starting state for a ticket."""
+
+        return LanggraphState(
+            subject=subject,
+            description=description,
+            category="",
+            retrieved_docs=[],
+            candidate_pool=[],
+            context_stats={},
+            draft_response="",
+            review_result={},
+            escalated=False,
+            review_attempts=0,
+            final_response="",
+            query_embedding=[],
+            cache_hit=False
+        )
+
+
+
+
+
+    @staticmethod
+    def _build_result(final_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn the final workflow state into the API response."""
+
+        # Check if ticket was escalated
+        if final_state.get('escalated', False):
+            return {
+                "status": "success",
+                "message": "This ticket has been escalated to human support due to complexity or policy concerns."
+            }
+        else:
+            return {"status": "success", "message": final_state['final_response']}
+
+
+
+
+
     async def process_ticket(self, subject: str, description: str) -> Dict[str, Any]:
         """Process a ticket through the complete workflow."""
-        try:
-            # Initialize state
-            initial_state = LanggraphState(
-                subject=subject,
-                description=description,
-                category="",
-                retrieved_docs=[],
-                draft_response="",
-                review_result={},
-                escalated=False,
-                review_attempts=0,
-                final_response=""
-            )
 
+        ticket = start_ticket()
+        try:
             # Run the workflow
-            final_state = await self.graph.ainvoke(initial_state)
-            
-            # Check if ticket was escalated
-            if final_state.get('escalated', False):
-                return {
-                    "status": "success",
-                    "message": "This ticket has been escalated to human support due to complexity or policy concerns."
-                }
-            else:
-                return {"status": "success", "message": final_state['final_response']}
+            final_state = await self.graph.ainvoke(self._initial_state(subject, description))
+            finish_ticket(ticket, final_state)
+
+            return self._build_result(final_state)
             
         except Exception as e:
-            logging.error(f"Workflow execution error: {e}")
+            finish_ticket(ticket, {}, error=True)
+            logging.error("Workflow execution error: %s", e)
             return {
                 "status": "error",
                 "message": f"An error occurred while processing the ticket: {str(e)}"
@@ -120,75 +153,270 @@ class LanggraphService:
 
 
 
+    async def stream_ticket(self, subject: str, description: str) -> AsyncIterator[Dict[str, Any]]:
+        """Process a ticket and yield progress events as workflow nodes finish and the draft is generated."""
+
+        started = time.perf_counter()
+        first_event_at = None
+        final_state = {}
+        ticket = start_ticket()
+
+        try:
+            async for mode, chunk in self.graph.astream(
+                self._initial_state(subject, description),
+                stream_mode=["updates", "messages", "values"]
+            ):
+                if mode == "values":
+                    final_state = chunk
+                    continue
+
+                for event in self._progress_events(mode, chunk):
+                    if first_event_at is None:
+                        first_event_at = time.perf_counter()
+
+                    event["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                    yield event
+
+            result = self._build_result(final_state)
+            node_timings = finish_ticket(ticket, final_state)
+
+        except Exception as e:
+            logging.error("Workflow streaming error: %s", e)
+            result = {
+                "status": "error",
+                "message": f"An error occurred while processing the ticket: {str(e)}"
+            }
+            node_timings = finish_ticket(ticket, final_state, error=True)
+
+        finished = time.perf_counter()
+        timings = {
+            "time_to_first_event_ms": round(((first_event_at or finished) - started) * 1000, 1),
+            "total_ms": round((finished - started) * 1000, 1)
+        }
+        if node_timings:
+            timings["nodes_ms"] = node_timings
+
+        logging.info("Streamed ticket: first event after %s ms, total %s ms", timings["time_to_first_event_ms"], timings["total_ms"])
+        yield {"event": "result", "data": {**result, "timings": timings}, "elapsed_ms": timings["total_ms"]}
+
+
+
+
+
     @staticmethod
-    async def _classify_ticket(state: LanggraphState) -> LanggraphState:
+    def _progress_events(mode: str, chunk: Any) -> List[Dict[str, Any]]:
+        """Map a LangGraph stream chunk to client-facing progress events."""
+
+        if mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") == "draft" and message.content:
+                return [{"event": "draft_token", "data": {"token": message.content}}]
+            return []
+
+        events = []
+        for node, update in chunk.items():
+            update = update or {}
+
+            if node == "classify":
+                events.append({"event": "classified", "data": {"category": update.get("category")}})
+            elif node == "check_cache" and update.get("cache_hit"):
+                events.append({"event": "cache_hit", "data": {"category": update.get("category")}})
+            elif node in ("retrieve", "refine"):
+                events.append({"event": "retrieved", "data": {"documents": len(update.get("retrieved_docs", []))}})
+            elif node == "draft":
+                events.append({"event": "drafted", "data": {}})
+            elif node == "review":
+                review_result = update.get("review_result", {})
+                events.append({
+                    "event": "reviewed",
+                    "data": {
+                        "approved": review_result.get("approved"),
+                        "reviewer": review_result.get("reviewer"),
+                        "issues": review_result.get("issues", []),
+                        "attempt": update.get("review_attempts")
+                    }
+                })
+            elif node == "escalate":
+                events.append({"event": "escalated", "data": {}})
+
+        return events
+
+
+
+
+
+    @staticmethod
+    def _query_text(state: LanggraphState) -> str:
+        return f"{state['subject']} {state['description']}"
+
+
+
+
+
+    @staticmethod
+    async def _classify_ticket(state: LanggraphState) -> Dict[str, Any]:
         """Classify the ticket into one of the predefined categories."""
-        
+
+        # Runs in parallel with _embed_query, so only the key this node owns is returned
         try:
-            llm_response = await openai_service.classify_ticket(
-                text=state["description"],
-                technical=CATEGORIES["technical"],
-                billing=CATEGORIES["billing"],
-                security=CATEGORIES["security"],
-                general=CATEGORIES["general"],
-                subject=state["subject"],
-                description=state["description"]
-            )
-            
-            if llm_response['status'] == 'error':
-                logging.error(f"Classification error: {llm_response['message']}")
-                state["category"] = "general"
+            if ticket_classifier.model is None:
+                return {"category": await LanggraphService._classify_with_llm(state)}
+
+            # Local tier first; the embedding request is shared with the embed node, not repeated.
+            # With a hedge set (off by default), the LLM fallback is started once the embedding takes longer
+            # than it, so a slow embedding does not delay an uncertain ticket's LLM call; a hedged call that
+            # the local model then makes unnecessary has already been sent and is billed all the same.
+            embedding_task = asyncio.ensure_future(openai_service.embed_query(LanggraphService._query_text(state)))
+            llm_task = None
+            hedge = settings.TICKET_CLASSIFIER_LLM_HEDGE_SECONDS
+            if hedge is not None:
+                done, _ = await asyncio.wait({embedding_task}, timeout=hedge)
+                if not done:
+                    llm_task = asyncio.ensure_future(LanggraphService._classify_with_llm(state))
+
+            try:
+                local_result = ticket_classifier.classify(await embedding_task)
+            except BaseException:
+                if llm_task is not None:
+                    llm_task.cancel()
+                raise
+
+            if local_result is not None:
+                if llm_task is not None and llm_task.cancel():
+                    ticket_classifier.record_cancelled_fallback()
+                logging.info("Ticket classified locally as: %s with confidence %.3f", local_result["category"], local_result["confidence"])
+                return {"category": local_result["category"]}
+
+            return {"category": await (llm_task or LanggraphService._classify_with_llm(state))}
+
+        except Exception as e:
+            logging.error("Classification error: %s", e)
+            return {"category": "general"}
+
+
+
+
+
+    @staticmethod
+    async def _classify_with_llm(state: LanggraphState) -> str:
+        """Second classification tier: the LLM, falling back to "general" when the call fails."""
+
+        started = time.perf_counter()
+        llm_response = await openai_service.classify_ticket(
+            text=state["description"],
+            technical=CATEGORIES["technical"],
+            billing=CATEGORIES["billing"],
+            security=CATEGORIES["security"],
+            general=CATEGORIES["general"],
+            subject=state["subject"],
+            description=state["description"]
+        )
+        ticket_classifier.record_fallback(time.perf_counter() - started)
+
+        if llm_response['status'] == 'error':
+            logging.error("Classification error: %s", llm_response['message'])
+            return "general"
+
+        ticket_classification = llm_response.get("message", "")
+
+        logging.info("Ticket classified as: %s with reasoning: %s", ticket_classification.category, ticket_classification.reasoning)
+        return ticket_classification.category
+
+
+
+
+
+    @staticmethod
+    async def _embed_query(state: LanggraphState) -> Dict[str, Any]:
+        """Embed the ticket text for the response cache lookup, retrieval and refinement."""
+
+        # Runs in parallel with _classify_ticket, so only the key this node owns is returned
+        return {"query_embedding": await openai_service.embed_query(LanggraphService._query_text(state))}
+
+
+
+
+
+    @staticmethod
+    def _check_response_cache(state: LanggraphState) -> LanggraphState:
+        """Answer from the semantic response cache when an approved response to a near-identical ticket exists."""
+
+        if not settings.SEMANTIC_CACHE_ENABLED:
+            return state
+
+        try:
+            cached = semantic_cache.lookup(state["category"], state["query_embedding"])
+            if cached is None:
                 return state
-            
-            ticket_classification = llm_response.get("message", "")
-            state["category"] = ticket_classification.category
 
-            logging.info(f"Ticket classified as: {state['category']} with reasoning: {ticket_classification.reasoning}")
+            state["cache_hit"] = True
+            state["draft_response"] = cached["response"]
+            state["final_response"] = cached["response"]
+
+            logging.info("Semantic cache hit in %s with similarity %.4f", state["category"], cached["score"])
             return state
 
         except Exception as e:
-            logging.error(f"Classification error: {e}")
-            state["category"] = "general"
+            logging.error("Semantic cache lookup error: %s", e)
             return state
 
 
 
 
 
+    @staticmethod
+    def _route_after_cache_check(state: LanggraphState) -> str:
+        """End the workflow on a cache hit, otherwise continue to retrieval."""
+
+        return "hit" if state.get("cache_hit") else "miss"
+
+
+
+
+
+    @staticmethod
+    async def _fetch_candidate_pool(state: LanggraphState) -> List[Dict[str, Any]]:
+        """Search the category namespace once at the deepest refinement depth, dropping repeated chunk ids."""
+
+        search_response = await vector_store.search(
+            query_vector=state["query_embedding"],
+            namespace=state["category"],
+            top_k=settings.RETRIEVAL_MAX_DEPTH
+        )
+        if search_response["status"] == "error":
+            logging.error("Document retrieval error: %s", search_response['message'])
+            return []
+
+        pool = []
+        seen_ids = set()
+        for doc in search_response["data"]:
+            if doc.get("id") in seen_ids:
+                continue
+            seen_ids.add(doc.get("id"))
+            pool.append(doc)
+
+        return pool
+
+
+
+
+
     @staticmethod
     async def _retrieve_documents(state: LanggraphState) -> LanggraphState:
         """Retrieve relevant documents from vector store based on category and content."""
         
         try:
-            # Create search query
-            query_text = f"{state['subject']} {state['description']}"
-            
-            # Get embedding for the query
-            query_embedding = await openai_service.embed_query(query_text)
-            
-            # Store the query embedding for later use in refinement
-            state["query_embedding"] = query_embedding
-
-            # Search in the relevant namespace
-            namespace = state["category"]
-            search_response = await pinecone_service.search(
-                query_vector=query_embedding,
-                namespace=namespace,
-                top_k=5
-            )
-            if search_response["status"] == "error":
-                logging.error(f"Document retrieval error: {search_response['message']}")
-                state["retrieved_docs"] = []
-                return state
-            
-            retrieved_docs = search_response["data"]
-            state["retrieved_docs"] = retrieved_docs
+            # The whole ranked pool is kept in state so refinement never has to query again
+            candidate_pool = await LanggraphService._fetch_candidate_pool(state)
+            state["candidate_pool"] = candidate_pool
+            state["retrieved_docs"] = candidate_pool[:settings.RETRIEVAL_TOP_K]
 
-            logging.info(f"Retrieved {len(retrieved_docs)} documents from {namespace} namespace")
+            logging.info("Retrieved %d of %d candidate documents from %s namespace", len(state["retrieved_docs"]), len(candidate_pool), state["category"])
             return state
             
         except Exception as e:
-            logging.error(f"Document retrieval error: {e}")
+            logging.error("Document retrieval error: %s", e)
+            state["candidate_pool"] = []
             state["retrieved_docs"] = []
             return state
 
@@ -200,12 +428,16 @@ class LanggraphService:
     async def _draft_response(state: LanggraphState) -> LanggraphState:
         """Draft an initial response using retrieved context."""
         
-        # Prepare context from retrieved documents
-        context = ""
-        for doc in state["retrieved_docs"]:
-            context += f"{doc['content']}\n\n\n"
-
         try:
+            # Pack retrieved documents by score into the token budget, without duplicated or overlapping text
+            context, context_stats = context_assembler.assemble(state["retrieved_docs"])
+            state["context_stats"] = context_stats
+
+            logging.info(
+                "Packed %d of %d documents into %d tokens (%d saved)", context_stats["packed_documents"],
+                context_stats["documents"], context_stats["packed_tokens"], context_stats["tokens_saved"]
+            )
+
             llm_response = await openai_service.draft_response(
                 category=state["category"],
                 subject=state["subject"],
@@ -213,8 +445,8 @@ class LanggraphService:
                 context=context
             )            
             if llm_response['status'] == 'error':
-                logging.error(f"Drafting error: {llm_response['message']}")
-                state["draft_response"] = "I apologize, but I'm unable to process your request at this time. Please contact our support team directly."
+                logging.error("Drafting error: %s", llm_response['message'])
+                state["draft_response"] = DRAFT_FALLBACK_RESPONSE
                 return state
 
             draft_response = llm_response.get("message", {})
@@ -224,8 +456,8 @@ class LanggraphService:
             return state
 
         except Exception as e:
-            logging.error(f"Drafting error: {e}")
-            state["draft_response"] = "I apologize, but I'm unable to process your request at this time. Please contact our support team directly."
+            logging.error("Drafting error: %s", e)
+            state["draft_response"] = DRAFT_FALLBACK_RESPONSE
             return state
 
 
@@ -240,6 +472,13 @@ class LanggraphService:
         state["review_attempts"] = state.get("review_attempts", 0) + 1
         
         try:
+            # Obviously broken or obviously grounded drafts are settled without the LLM reviewer
+            pre_review = pre_reviewer.review(state["draft_response"], state["retrieved_docs"])
+            if pre_review is not None:
+                state["review_result"] = pre_review
+                logging.info("Pre-review completed - Approved: %s, Attempt: %d", pre_review["approved"], state["review_attempts"])
+                return state
+
             llm_response = await openai_service.draft_reviewer(
                 category=state["category"],
                 subject=state["subject"],
@@ -248,7 +487,7 @@ class LanggraphService:
             )
 
             if llm_response['status'] == 'error':
-                logging.error(f"Review error: {llm_response['message']}")
+                logging.error("Review error: %s", llm_response['message'])
                 state["review_result"] = {
                     "approved": True,
                     "issues": [],
@@ -260,14 +499,15 @@ class LanggraphService:
             state["review_result"] = {
                 "approved": review_result.approved,
                 "issues": review_result.issues,
-                "refinement_needed": review_result.refinement_needed
+                "refinement_needed": review_result.refinement_needed,
+                "reviewer": "llm"
             }
 
-            logging.info(f"Review completed - Approved: {review_result.approved}, Attempt: {state['review_attempts']}")
+            logging.info("Review completed - Approved: %s, Attempt: %d", review_result.approved, state["review_attempts"])
             return state
 
         except Exception as e:
-            logging.error(f"Review error: {e}")
+            logging.error("Review error: %s", e)
             # Default to approved if review fails
             state["review_result"] = {
                 "approved": True,
@@ -285,28 +525,25 @@ class LanggraphService:
         """Refine the context based on review feedback."""
         
         try:
-            if state['review_attempts'] == 1:
-                top_k = 10
-            else:
-                top_k = 15
-
-            search_response = await pinecone_service.search(
-                query_vector=state["query_embedding"],
-                namespace=state["category"],
-                top_k=top_k
-            )
+            # Widen the context by the next slice of the candidate pool; only retry the search if retrieval failed
+            if not state.get("candidate_pool"):
+                state["candidate_pool"] = await LanggraphService._fetch_candidate_pool(state)
 
-            if search_response["status"] == "error":
-                logging.error(f"Search error: {search_response['message']}")
-                return state
+            depth = min(
+                settings.RETRIEVAL_MAX_DEPTH,
+                settings.RETRIEVAL_TOP_K + settings.RETRIEVAL_REFINE_STEP * state["review_attempts"]
+            )
+            retrieved_docs = state.get("retrieved_docs", [])
+            retrieved_ids = {doc.get("id") for doc in retrieved_docs}
+            new_docs = [doc for doc in state["candidate_pool"][:depth] if doc.get("id") not in retrieved_ids]
 
-            state['retrieved_docs'] = search_response["data"]
+            state['retrieved_docs'] = retrieved_docs + new_docs
 
-            logging.info("Context refined based on review feedback")
+            logging.info("Context refined based on review feedback with %d new documents", len(new_docs))
             return state
             
         except Exception as e:
-            logging.error(f"Context refinement error: {e}")
+            logging.error("Context refinement error: %s", e)
             return state
 
 
@@ -314,35 +551,32 @@ class LanggraphService:
 
 
     def _escalate_ticket(self, state: LanggraphState) -> LanggraphState:
-        """Escalate the ticket by storing it in escalation.csv file."""
+        """Escalate the ticket by storing it in the escalation store."""
         
         try:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
             # Prepare escalation data
-            escalation_data = [
-                timestamp,
-                state.get("subject", ""),
-                state.get("description", ""),
-                state.get("category", ""),
-                state.get("review_attempts", 0),
-                "; ".join(state.get("review_result", {}).get("issues", [])),
-                state.get("draft_response", "")
-            ]
+            escalation_data = {
+                "timestamp": timestamp,
+                "subject": state.get("subject", ""),
+                "description": state.get("description", ""),
+                "category": state.get("category", ""),
+                "review_attempts": state.get("review_attempts", 0),
+                "issues": "; ".join(state.get("review_result", {}).get("issues", [])),
+                "draft_response": state.get("draft_response", "")
+            }
             
-            # Write to CSV file
-            with open(self.escalation_file, 'a', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(escalation_data)
+            self.escalation_store.add(escalation_data)
             
             state["escalated"] = True
             state["final_response"] = "This ticket has been escalated to human support for further review."
             
-            logging.info(f"Ticket escalated after {state['review_attempts']} attempts")
+            logging.info("Ticket escalated after %d attempts", state["review_attempts"])
             return state
             
         except Exception as e:
-            logging.error(f"Escalation error: {e}")
+            logging.error("Escalation error: %s", e)
             # If escalation fails, provide a fallback response
             state["escalated"] = True
             state["final_response"] = "This ticket requires human support attention."
@@ -375,11 +609,25 @@ class LanggraphService:
         """Finalize the response."""
         
         state["final_response"] = state["draft_response"]
+
+        # Only drafts the LLM reviewer approved are reused; a rules approval only checks term overlap
+        # with the context, not tone, accuracy or policy
+        reviewed_by_llm = state.get("review_result", {}).get("reviewer") == "llm"
+        if settings.SEMANTIC_CACHE_ENABLED and reviewed_by_llm and state["draft_response"] != DRAFT_FALLBACK_RESPONSE:
+            semantic_cache.store(state["category"], state.get("query_embedding", []), state["final_response"])
+
         logging.info("Response finalized")
         
         return state
 
 
 
-langgraph_service = LanggraphService()
-graph = langgraph_service.graph
+
+
+
+def __getattr__(name: str):
+    # langgraph.json loads `graph` from this module; build it on first access instead of at import
+    if name == "graph":
+        from services.providers import langgraph_service
+        return langgraph_service.graph
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,469 @@
+
+import os
+import json
+import fcntl
+import asyncio
+import logging
+import threading
+from functools import partial
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.config import settings
+from core.metrics import VECTOR_STORE_SECONDS, VECTOR_STORE_REQUESTS, instrument_call
+from services.ivfpq_index import IVFPQIndex
+from services.base_vector_store import VectorStore
+
+
+
+class LocalNamespace:
+    """One namespace on disk: a memory-mapped float32 matrix of unit vectors plus an append-only metadata log.
+
+    vectors.f32 holds `capacity` rows of `dimension` floats, of which the first `count` are live.
+    metadata.jsonl holds one {"row", "id", "metadata"} record per write, and metadata.idx holds the
+    (offset, length) of each row's current record, so chunk text is read from disk only for the rows
+    a search returns; only the id -> row map is kept in memory. A row is live once its metadata.idx
+    entry is written, which is also how other processes sharing the directory see it. Writers hold an
+    exclusive flock on the namespace, so two workers (or the CLI and the server) never interleave.
+    With ann=True an IVF-PQ index is trained once the namespace reaches ANN_MIN_TRAIN_SIZE rows, outside
+    the namespace lock, and is then kept up to date on every upsert; until then searches stay exact.
+    """
+
+    # (offset, length) of a record in metadata.jsonl
+    INDEX_ENTRY = np.dtype([("offset", np.int64), ("length", np.int64)])
+
+    def __init__(self, path: str, dimension: int, ann: bool = False):
+        self.path = path
+        self.dimension = dimension
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.metadata_path = os.path.join(path, "metadata.jsonl")
+        self.index_path = os.path.join(path, "metadata.idx")
+
+        self.rows: Dict[str, int] = {}
+        self.count = 0
+        self.capacity = 0
+        self.log_position = 0
+        self.matrix: Optional[np.memmap] = None
+        self.lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self.lock_file = open(os.path.join(path, "write.lock"), "a")
+        for file_path in (self.metadata_path, self.index_path):
+            open(file_path, "ab").close()
+        self.metadata_file = open(self.metadata_path, "rb")
+        self.index_file = open(self.index_path, "rb")
+
+        with self.lock, self._write_lock():
+            self._load()
+
+        self.ann: Optional[IVFPQIndex] = None
+        # Rows overwritten while a new index is trained, re-encoded before it is swapped in
+        self.training = False
+        self.retrain_rows = set()
+        if ann:
+            self.ann = self._open_index()
+            with self.lock, self._write_lock():
+                self._catch_up_index()
+            self._train_index_if_due()
+
+
+
+
+
+    @contextmanager
+    def _write_lock(self):
+        """Exclusive across processes for the duration of a write."""
+
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+
+
+
+
+    def _load(self):
+        """Build the id -> row map from the log; metadata.idx is rebuilt from it if it is missing or stale."""
+
+        offsets = self._tail_log()
+
+        if len(offsets) != os.path.getsize(self.index_path) // self.INDEX_ENTRY.itemsize:
+            # Written before metadata.idx existed, or interrupted between the log and the index
+            entries = np.zeros(len(offsets), dtype=self.INDEX_ENTRY)
+            for row, (offset, length) in offsets.items():
+                entries[row] = (offset, length)
+            with open(self.index_path, "wb") as file:
+                file.write(entries.tobytes())
+
+        self._refresh()
+
+
+
+
+
+    def _tail_log(self, count: Optional[int] = None) -> Dict[int, tuple]:
+        """Read log records written since the last call into the id -> row map.
+
+        Returns {row: (offset, length)} of the last record seen for each row. With `count`, records for
+        rows at or beyond it were never committed to metadata.idx (an interrupted write) and are skipped.
+        """
+
+        offsets = {}
+        with open(self.metadata_path, "rb") as file:
+            file.seek(self.log_position)
+            for line in file:
+                record = json.loads(line)
+                row = record["row"]
+
+                if count is None or row < count:
+                    self.rows[record["id"]] = row
+                    offsets[row] = (self.log_position, len(line))
+                self.log_position += len(line)
+
+        return offsets
+
+
+
+
+
+    def _refresh(self):
+        """Pick up rows committed by other processes and remap the matrix if the file has grown. Caller holds the lock."""
+
+        self.count = os.path.getsize(self.index_path) // self.INDEX_ENTRY.itemsize
+
+        capacity = os.path.getsize(self.vectors_path) // (4 * self.dimension) if os.path.exists(self.vectors_path) else 0
+        if capacity > self.capacity:
+            self.capacity = capacity
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dimension))
+
+
+
+
+
+    def _open_index(self) -> IVFPQIndex:
+        return IVFPQIndex(self.path, self.dimension, nlist=settings.ANN_NLIST, subspaces=settings.ANN_PQ_SUBSPACES)
+
+
+
+
+
+    def _catch_up_index(self):
+        """Encode rows written after the index was last persisted, e.g. by another process. Caller holds the locks."""
+
+        encoded = len(self.ann.assignments)
+        if self.ann.trained and encoded < self.count:
+            self.ann.add(np.arange(encoded, self.count), np.asarray(self.matrix[encoded:self.count]))
+
+
+
+
+
+    def _train_index_if_due(self):
+        """Train the IVF-PQ index once the namespace is large enough.
+
+        Training takes seconds to minutes, so it runs without the namespace lock: searches stay exact and
+        upserts carry on meanwhile, and the new index is caught up and swapped in at the end.
+        """
+
+        with self.lock:
+            if self.ann is None or self.ann.trained or self.training or self.count < settings.ANN_MIN_TRAIN_SIZE:
+                return
+            self.training = True
+            self.retrain_rows = set()
+            trained_rows = self.count
+            matrix = self.matrix
+
+        try:
+            index = self._open_index()
+            if not index.trained:
+                index.train(matrix[:trained_rows])
+
+            with self.lock, self._write_lock():
+                self._refresh()
+
+                if os.path.exists(index.model_path) and not self.ann.trained:
+                    # Another process sharing the namespace trained and saved an index first; use that one
+                    index = self._open_index()
+                else:
+                    stale = np.array(sorted(row for row in self.retrain_rows if row < trained_rows), dtype=np.int64)
+                    if len(stale):
+                        index.add(stale, np.asarray(self.matrix[stale]), persist=False)
+                    index.save()
+
+                self.ann = index
+                self._catch_up_index()
+
+        finally:
+            self.training = False
+
+
+
+
+
+    def _ensure_capacity(self, needed: int):
+        """Grow the backing file geometrically and remap it. Caller holds the lock."""
+
+        if needed <= self.capacity:
+            return
+
+        new_capacity = max(needed, self.capacity * 2, 1024)
+
+        if self.matrix is not None:
+            self.matrix.flush()
+        with open(self.vectors_path, "ab") as file:
+            file.truncate(new_capacity * self.dimension * 4)
+
+        self.capacity = new_capacity
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dimension))
+
+
+
+
+
+    def upsert(self, ids: List[str], values: np.ndarray, metadata: List[Dict[str, Any]]) -> int:
+        """Write rows for the given ids, overwriting rows of ids that already exist."""
+
+        values = np.asarray(values, dtype=np.float32).reshape(len(ids), self.dimension)
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        values = values / np.where(norms == 0, 1, norms)
+
+        with self.lock, self._write_lock():
+            # Another process may have written since our last upsert
+            self._refresh()
+            self._tail_log(self.count)
+            if self.ann is not None:
+                self._catch_up_index()
+
+            rows = []
+            next_row = self.count
+            for chunk_id in ids:
+                row = self.rows.get(chunk_id)
+                if row is None:
+                    row = next_row
+                    next_row += 1
+                    self.rows[chunk_id] = row
+                rows.append(row)
+
+            self._ensure_capacity(next_row)
+            self.matrix[rows] = values
+            self.matrix.flush()
+
+            entries = np.empty(len(rows), dtype=self.INDEX_ENTRY)
+            with open(self.metadata_path, "ab") as file:
+                offset = file.tell()
+                for i, (chunk_id, row, meta) in enumerate(zip(ids, rows, metadata)):
+                    line = (json.dumps({"row": row, "id": chunk_id, "metadata": meta}, ensure_ascii=False) + "\n").encode("utf-8")
+                    file.write(line)
+                    entries[i] = (offset, len(line))
+                    offset += len(line)
+            self.log_position = offset
+
+            # Committing the index entries is what makes the rows live, so it comes last
+            with open(self.index_path, "r+b") as file:
+                for row, entry in zip(rows, entries):
+                    file.seek(row * self.INDEX_ENTRY.itemsize)
+                    file.write(entry.tobytes())
+            self.count = next_row
+
+            if self.ann is not None:
+                if self.ann.trained:
+                    self.ann.add(np.asarray(rows), values)
+                elif self.training:
+                    self.retrain_rows.update(rows)
+
+        self._train_index_if_due()
+        return len(ids)
+
+
+
+
+
+    def _read_records(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """Read the current log record of each row through metadata.idx."""
+
+        records = []
+        for row in rows:
+            entry = np.frombuffer(
+                os.pread(self.index_file.fileno(), self.INDEX_ENTRY.itemsize, int(row) * self.INDEX_ENTRY.itemsize),
+                dtype=self.INDEX_ENTRY
+            )[0]
+            records.append(json.loads(os.pread(self.metadata_file.fileno(), int(entry["length"]), int(entry["offset"]))))
+
+        return records
+
+
+
+
+
+    def search(self, query: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """Cosine top-k through the IVF-PQ index when it is trained, otherwise exact: one matrix-vector
+        product, argpartition for the k best, then sort only those."""
+
+        with self.lock:
+            self._refresh()
+            use_index = self.ann is not None and self.ann.trained
+            if use_index and len(self.ann.assignments) < self.count:
+                # Rows upserted by another process are not in our index yet
+                with self._write_lock():
+                    self._refresh()
+                    self._catch_up_index()
+            count = self.count
+            matrix = self.matrix
+
+        if not count:
+            return []
+
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+
+        query = query / norm
+
+        if use_index:
+            best, best_scores = self.ann.search(
+                query, top_k, count,
+                nprobe=settings.ANN_NPROBE, rerank=settings.ANN_RERANK, matrix=matrix
+            )
+        else:
+            scores = matrix[:count] @ query
+            k = min(top_k, count)
+
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            best_scores = scores[best]
+
+        return [
+            {"id": record["id"], "score": float(score), "metadata": record["metadata"]}
+            for record, score in zip(self._read_records(best), best_scores)
+        ]
+
+
+
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store: cosine search over memory-mapped per-namespace matrices, exact or IVF-PQ"""
+
+    def __init__(self, directory: str, embedding_dimension: int = 3072, index_type: str = "flat"):
+        if index_type not in ("flat", "ivfpq"):
+            raise ValueError(f"Unknown local vector store index: {index_type}")
+
+        self.directory = directory
+        self.index_type = index_type
+        self.index_name = f"local:{directory}"
+        self.embedding_dimension = embedding_dimension
+        self.namespaces: Dict[str, LocalNamespace] = {}
+        self.lock = threading.Lock()
+
+        # NumPy releases the GIL during the matrix product, so searches run in parallel off the event loop
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.LOCAL_VECTOR_STORE_THREADS,
+            thread_name_prefix="local-vector-store"
+        )
+
+
+
+
+
+    def _namespace(self, name: str, create: bool = False) -> Optional[LocalNamespace]:
+        """Open a namespace, loading it from disk on first use."""
+
+        if not name or os.sep in name or name.startswith("."):
+            raise ValueError(f"Invalid namespace: {name!r}")
+
+        with self.lock:
+            namespace = self.namespaces.get(name)
+            if namespace is None:
+                path = os.path.join(self.directory, name)
+                if not create and not os.path.isdir(path):
+                    return None
+
+                namespace = LocalNamespace(path, self.embedding_dimension, ann=self.index_type == "ivfpq")
+                self.namespaces[name] = namespace
+
+            return namespace
+
+
+
+
+
+    def _upsert(self, vectors: List[Dict[str, Any]], namespace: str) -> int:
+        return self._namespace(namespace, create=True).upsert(
+            ids=[vector["id"] for vector in vectors],
+            values=np.array([vector["values"] for vector in vectors], dtype=np.float32),
+            metadata=[vector.get("metadata", {}) for vector in vectors]
+        )
+
+
+
+
+
+    def upsert_vectors(
+        self, vectors: List[Dict[str, Any]],
+        namespace: str, batch_size: int = 100
+    ) -> Dict[str, Any]:
+        """Upsert vectors to the local store in batches"""
+
+        total_upserted = 0
+
+        try:
+            for i in range(0, len(vectors), batch_size):
+                total_upserted += self._upsert(vectors[i:i + batch_size], namespace)
+
+            logging.info("Successfully upserted %d vectors to local namespace '%s'", total_upserted, namespace)
+            return {"status": "success", "total_upserted": total_upserted}
+
+        except Exception as e:
+            logging.error("Failed to upsert vectors: %s", e)
+            return {"status": "error", "message": f"Failed to upsert vectors to local store: {str(e)}"}
+
+
+
+
+
+    @instrument_call(VECTOR_STORE_SECONDS, VECTOR_STORE_REQUESTS, "local", "upsert")
+    async def aupsert_batch(self, vectors: List[Dict[str, Any]], namespace: str) -> int:
+        """Upsert a single batch on the store's executor"""
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(self._upsert, vectors, namespace))
+
+
+
+
+
+    def _search(self, query_vector: List[float], namespace: str, top_k: int) -> List[Dict[str, Any]]:
+        local_namespace = self._namespace(namespace)
+        if local_namespace is None:
+            return []
+
+        return local_namespace.search(np.asarray(query_vector, dtype=np.float32), top_k)
+
+
+
+
+
+    @instrument_call(VECTOR_STORE_SECONDS, VECTOR_STORE_REQUESTS, "local", "search")
+    async def search(self, query_vector: List[float], namespace: str, top_k: int = 5) -> Dict[str, Any]:
+        """Search for similar vectors in the local store"""
+
+        logging.info('Searching for relevant documents in local vector store')
+        try:
+            loop = asyncio.get_running_loop()
+            matches = await loop.run_in_executor(self.executor, partial(self._search, query_vector, namespace, top_k))
+
+            retrieved_docs = [
+                {"id": match["id"], "content": match["metadata"].get("text", ""), "score": match["score"]}
+                for match in matches
+            ]
+
+            return {"status": "success", "data": retrieved_docs}
+
+        except Exception as e:
+            logging.error("Local vector store search error: %s", e)
+            return {"status": "error", "message": f"Local vector store search error: {str(e)}"}
@@ -1,14 +1,21 @@
 
-import json
+import time
+import random
+import asyncio
 import logging
-from typing import Any
+from typing import Any, Awaitable, Callable
 
-from pydantic import BaseModel
+from openai import APIConnectionError, InternalServerError, RateLimitError
 from langchain.schema import HumanMessage, SystemMessage
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from core.config import settings
+from core.metrics import OPENAI_SECONDS, OPENAI_REQUESTS, OPENAI_TOKENS, OPENAI_RETRIES, OPENAI_RATE_LIMIT_WAIT_SECONDS
+from utils.file_operations import estimate_tokens
+from utils.prompt_rendering import compile_prompt
+from services.rate_limiter import build_rate_limiters
+from services.embedding_cache import build_embedding_cache
 from schemas.structured_outputs.ticket_reviewer import TicketReviewerSchema
 from schemas.structured_outputs.ticket_classification import TicketClassificationSchema
 from services.prompt_templates import TICKET_CLASSIFICAION_PROMPT, DRAFT_RESPONSE_PROMPT, REVIEW_PROMPT, REFINEMENT_PROMPT
@@ -19,50 +26,181 @@ class OpenAIService:
     def __init__(self):
         """Initialize OpenAI service""" 
 
-        self.llm = ChatOpenAI(model=settings.MODEL_NAME, api_key=settings.OPENAI_API_KEY)
-        self.embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL_NAME, openai_api_key=settings.OPENAI_API_KEY)
+        # Throttled calls are retried by _call, which knows about the shared rate limits, not inside the clients
+        self.llm = ChatOpenAI(
+            model=settings.MODEL_NAME, api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL,
+            # Token usage is also reported when the draft is streamed
+            stream_usage=True, max_retries=0
+        )
+        self.embeddings = OpenAIEmbeddings(
+            model=settings.EMBEDDING_MODEL_NAME, openai_api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL, max_retries=0
+        )
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=2000,
             chunk_overlap=200,
             length_function=len,
         )
 
+        # Bounds the number of OpenAI calls in flight across all tickets being processed.
+        self.request_limiter = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENT_REQUESTS)
 
+        # Per-model RPM/TPM budgets shared by every call type, with ingestion yielding to live tickets
+        self.rate_limiters = build_rate_limiters()
 
+        # with_structured_output rebuilds the schema binding and parser on every call, so build each once.
+        # The raw message is kept alongside the parsed object for its token usage.
+        self.structured_llms = {
+            schema: self.llm.with_structured_output(schema, include_raw=True)
+            for schema in (TicketClassificationSchema, TicketReviewerSchema)
+        }
 
+        # Duplicate and templated tickets reuse the query embedding instead of paying for another call.
+        self.embedding_cache = build_embedding_cache()
+
+        # Concurrent requests for the same query text share one embedding call
+        self.inflight_queries = {}
+
+
+
+
+
+    async def embed_batch(self, texts: list) -> list:
+        """Embed one batch of ingestion texts as background traffic, retrying while OpenAI throttles the request."""
+
+        started = time.perf_counter()
+        model = settings.EMBEDDING_MODEL_NAME
 
-    async def generate_embeddings(self, texts: list) -> list:
-        """Generate embeddings for a list of texts"""
-        
-        if not texts:
-            return []
-        
         try:
-            embeddings = self.embeddings.embed_documents(texts)
-            return embeddings
+            embeddings = await self._call(
+                "embed_batch", model, sum(estimate_tokens(text) for text in texts),
+                lambda: self.embeddings.aembed_documents(texts), background=True,
+                max_retries=settings.EMBEDDING_MAX_RETRIES, base_delay=settings.EMBEDDING_RETRY_BASE_DELAY
+            )
+        except Exception:
+            OPENAI_REQUESTS.inc("embed_batch", model, "error")
+            raise
+
+        OPENAI_SECONDS.observe(time.perf_counter() - started, "embed_batch", model)
+        OPENAI_REQUESTS.inc("embed_batch", model, "success")
+        return embeddings
 
-        except Exception as e:
-            logging.error(f"Failed to generate embeddings: {str(e)}")
-            return []
 
 
 
 
     async def embed_query(self, query: str) -> list:
         """Generate embedding for a single query"""
-        
+
+        task = self.inflight_queries.get(query)
+        if task is None:
+            task = asyncio.ensure_future(self._compute_query_embedding(query))
+            self.inflight_queries[query] = task
+            task.add_done_callback(lambda _: self.inflight_queries.pop(query, None))
+
+        # Shielded so one cancelled caller does not cancel the call for the others
+        return await asyncio.shield(task)
+
+
+
+
+
+    async def _compute_query_embedding(self, query: str) -> list:
         try:
-            embedding = self.embeddings.embed_query(query)
+            if self.embedding_cache is not None:
+                cached = await self.embedding_cache.get(query)
+                if cached is not None:
+                    return cached
+
+            started = time.perf_counter()
+            try:
+                embedding = await self._call(
+                    "embed_query", settings.EMBEDDING_MODEL_NAME, estimate_tokens(query),
+                    lambda: self.embeddings.aembed_query(query)
+                )
+                OPENAI_REQUESTS.inc("embed_query", settings.EMBEDDING_MODEL_NAME, "success")
+            except Exception:
+                OPENAI_REQUESTS.inc("embed_query", settings.EMBEDDING_MODEL_NAME, "error")
+                raise
+            finally:
+                OPENAI_SECONDS.observe(time.perf_counter() - started, "embed_query", settings.EMBEDDING_MODEL_NAME)
+
+            if self.embedding_cache is not None and embedding:
+                await self.embedding_cache.set(query, embedding)
+
             return embedding
 
         except Exception as e:
-            logging.error(f"Failed to embed query: {str(e)}")
+            logging.error("Failed to embed query: %s", e)
             return []
 
 
 
 
 
+    async def _call(
+        self, operation: str, model: str, estimated_tokens: int, invoke: Callable[[], Awaitable],
+        background: bool = False, max_retries: int = None, base_delay: float = None
+    ) -> Any:
+        """Run one OpenAI call within the model's rate limits, retrying 429s, connection errors, timeouts and 5xx
+        responses with full-jitter exponential backoff. Only a 429 pauses the model's rate limiter."""
+
+        max_retries = settings.OPENAI_MAX_RETRIES if max_retries is None else max_retries
+        base_delay = settings.OPENAI_RETRY_BASE_DELAY if base_delay is None else base_delay
+        limiter = self.rate_limiters.get(model)
+
+        for attempt in range(max_retries + 1):
+            if limiter is not None:
+                waited = await limiter.acquire(estimated_tokens, background=background)
+                OPENAI_RATE_LIMIT_WAIT_SECONDS.observe(waited, model, "background" if background else "live")
+
+            try:
+                async with self.request_limiter:
+                    return await invoke()
+
+            except RateLimitError as e:
+                retry_after = self._retry_after(e)
+                if limiter is not None:
+                    limiter.throttled(retry_after or base_delay)
+
+                if attempt == max_retries:
+                    raise
+
+                OPENAI_RETRIES.inc(operation, model)
+                delay = max(retry_after, random.uniform(0, base_delay * 2 ** attempt))
+                logging.warning("OpenAI %s call throttled, retrying in %.2fs: %s", operation, delay, e)
+                await asyncio.sleep(delay)
+
+            except (APIConnectionError, InternalServerError) as e:
+                # APITimeoutError is an APIConnectionError; the clients run with max_retries=0, so these are retried here
+                if attempt == max_retries:
+                    raise
+
+                OPENAI_RETRIES.inc(operation, model)
+                delay = random.uniform(0, base_delay * 2 ** attempt)
+                logging.warning("OpenAI %s call failed, retrying in %.2fs: %s", operation, delay, e)
+                await asyncio.sleep(delay)
+
+
+
+
+
+    @staticmethod
+    def _retry_after(error: RateLimitError) -> float:
+        """Seconds the server asked us to wait, from the retry-after-ms or retry-after header."""
+
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000
+            return float(headers.get("retry-after", 0))
+        except ValueError:
+            return 0.0
+
+
+
+
+
     async def classify_ticket(self, text: str, technical, billing, security, general, subject, description, schema=None) -> dict:
         """Classify a support ticket into a predefined category."""
         
@@ -76,7 +214,7 @@ class OpenAIService:
             description=description
         )
 
-        return self._process_request(prompt, text, schema=TicketClassificationSchema)
+        return await self._process_request(prompt, text, schema=TicketClassificationSchema, operation="classify")
 
 
 
@@ -93,7 +231,7 @@ class OpenAIService:
             context=context
         )
 
-        return self._process_request(prompt, text="", schema=None)
+        return await self._process_request(prompt, text="", schema=None, operation="draft")
 
 
 
@@ -110,7 +248,7 @@ class OpenAIService:
             draft_response=draft_response
         )
 
-        return self._process_request(prompt, text="", schema=TicketReviewerSchema)
+        return await self._process_request(prompt, text="", schema=TicketReviewerSchema, operation="review")
 
 
 
@@ -126,7 +264,7 @@ class OpenAIService:
             refinement_needed=refinement_needed
         )
 
-        return self._process_request(prompt, text="", schema=None)
+        return await self._process_request(prompt, text="", schema=None, operation="refine")
 
 
 
@@ -135,37 +273,35 @@ class OpenAIService:
     def _replacer(self, prompt: str, **kwargs: Any) -> str:
         """Replaces placeholders in a prompt with actual serialized values."""
 
-        for key, value in kwargs.items():
-            placeholder = f"{{{key}}}"
+        # Templates are parsed once and rendered in a single pass
+        return compile_prompt(prompt).render(**kwargs)
+
 
-            if placeholder not in prompt:
-                continue 
 
-            if isinstance(value, str):
-                replacement = value
-            elif isinstance(value, (dict, list)):
-                replacement = json.dumps(value, ensure_ascii=False, indent=4)
-            elif isinstance(value, BaseModel):
-                replacement = json.dumps(value.model_dump(), ensure_ascii=False, indent=4)
-            else:
-                try:
-                    replacement = json.dumps(value, ensure_ascii=False, indent=4)
-                except TypeError:
-                    replacement = str(value)
 
-            prompt = prompt.replace(placeholder, replacement)
 
-        return prompt
+    def _structured_llm(self, schema):
+        """Return the structured-output runnable for a schema, building it only the first time it is used."""
 
+        runnable = self.structured_llms.get(schema)
+        if runnable is None:
+            runnable = self.llm.with_structured_output(schema, include_raw=True)
+            self.structured_llms[schema] = runnable
 
+        return runnable
 
 
 
-    def _process_request(
-        self, prompt: str, text: str, schema=None
+
+
+    async def _process_request(
+        self, prompt: str, text: str, schema=None, operation: str = "chat"
     ):
         """Generic method to handle requests to OpenAI"""
 
+        started = time.perf_counter()
+        model = settings.MODEL_NAME
+
         try:
             messages = [
                 SystemMessage(content=prompt),
@@ -174,15 +310,29 @@ class OpenAIService:
 
 
             # Initialize llm_instance with structured output if schema is provided else use simple llm to invoke.
-            llm_instance = self.llm.with_structured_output(schema) if schema else self.llm  
-            response = llm_instance.invoke(messages)
+            llm_instance = self._structured_llm(schema) if schema else self.llm
+            estimated_tokens = estimate_tokens(prompt) + estimate_tokens(text) + settings.OPENAI_COMPLETION_TOKENS_ESTIMATE
+            response = await self._call(operation, model, estimated_tokens, lambda: llm_instance.ainvoke(messages))
+
+            if schema:
+                if response.get("parsing_error"):
+                    raise response["parsing_error"]
+                message, content = response["raw"], response["parsed"]
+            else:
+                message, content = response, response.content
 
+            usage = getattr(message, "usage_metadata", None) or {}
+            if model in self.rate_limiters and usage.get("total_tokens"):
+                self.rate_limiters[model].settle(estimated_tokens, usage["total_tokens"])
+            OPENAI_TOKENS.inc(operation, model, "prompt", amount=usage.get("input_tokens", 0))
+            OPENAI_TOKENS.inc(operation, model, "completion", amount=usage.get("output_tokens", 0))
+            OPENAI_REQUESTS.inc(operation, model, "success")
 
-            return {"status": "success", "message": response.content if not schema else response}
+            return {"status": "success", "message": content}
 
         except Exception as e:
+            OPENAI_REQUESTS.inc(operation, model, "error")
             return {"status": "error", "message": f"Error processing request: {e}"}
 
-
-
-openai_service = OpenAIService()
+        finally:
+            OPENAI_SECONDS.observe(time.perf_counter() - started, operation, model)
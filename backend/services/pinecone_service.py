@@ -1,32 +1,55 @@
 
-import uuid
+import asyncio
 import logging
+from functools import partial
 from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
 
 from pinecone import Pinecone, ServerlessSpec
 
 from core.config import settings
+from core.metrics import VECTOR_STORE_SECONDS, VECTOR_STORE_REQUESTS, instrument_call
+from services.base_vector_store import VectorStore
 
 
 
-class PineconeService:
+class PineconeService(VectorStore):
     """Service class for handling Pinecone operations"""
 
 
 
-    def __init__(self, embedding_dimension: int = 3072):
-        """Initialize PineconeService"""
+    def __init__(self, embedding_dimension: int = 3072, index=None):
+        """Initialize PineconeService, connecting to the configured index unless one is passed in"""
 
         self.api_key = settings.PINECONE_API_KEY
         self.index_name = settings.PINECONE_INDEX_NAME
         self.embedding_dimension = embedding_dimension
         self.pc = Pinecone(api_key=self.api_key)
-        self.index = self.pc.Index(self.index_name)
+        self.index = index or self._connect_index()
+
+        # Dedicated threads for the blocking Pinecone client so calls never run on the event loop.
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.PINECONE_MAX_CONCURRENT_REQUESTS,
+            thread_name_prefix="pinecone"
+        )
 
 
 
 
         
+    def _connect_index(self):
+        """Open the index, addressing it by host when configured to skip the describe_index round trip"""
+
+        return self.pc.Index(
+            name=self.index_name,
+            host=settings.PINECONE_INDEX_HOST or "",
+            connection_pool_maxsize=settings.PINECONE_MAX_CONCURRENT_REQUESTS
+        )
+
+
+
+
+
     def ensure_index_exists(self) -> None:
         """Ensure the Pinecone index exists, create if it doesn't"""
         
@@ -34,7 +57,7 @@ class PineconeService:
             existing_indexes = self.pc.list_indexes().names()
             
             if self.index_name not in existing_indexes:
-                logging.info(f"Creating new Pinecone index: {self.index_name}")
+                logging.info("Creating new Pinecone index: %s", self.index_name)
                 self.pc.create_index(
                     name=self.index_name,
                     dimension=self.embedding_dimension,
@@ -44,56 +67,23 @@ class PineconeService:
                         region='us-east-1'
                     )
                 )
-                logging.info(f"Index {self.index_name} created successfully")
+                logging.info("Index %s created successfully", self.index_name)
             
-            self.index = self.pc.Index(self.index_name)
-            logging.info(f"Connected to index: {self.index_name}")
+            self.index = self._connect_index()
+            logging.info("Connected to index: %s", self.index_name)
             
         except Exception as e:
-            logging.error(f"Failed to initialize Pinecone index: {str(e)}")
+            logging.error("Failed to initialize Pinecone index: %s", e)
             return {"status": "error", "message": f"Failed to initialize Pinecone index: {str(e)}"}
 
 
 
 
     
-    def prepare_vectors(
-        self, chunks: List, embeddings: List[List[float]], 
-        filename: str, namespace: str
-    ) -> List[Dict[str, Any]]:
-        """Prepare vectors for upsert to Pinecone"""
-
-        vectors_to_upsert = []
-        
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            # Create unique ID for the chunk
-            chunk_id = f"{filename}_{namespace}_{i}_{uuid.uuid4().hex[:8]}"
-            
-            # Prepare metadata
-            metadata = {
-                "text": chunk.page_content,
-                "source": filename,
-                "namespace": namespace,
-                "chunk_index": i,
-                "page": chunk.metadata.get("page", 0),
-            }
-            
-            vectors_to_upsert.append({
-                "id": chunk_id,
-                "values": embedding,
-                "metadata": metadata
-            })
-
-        return vectors_to_upsert
-
-
-
-
-
     def upsert_vectors(
         self, vectors: List[Dict[str, Any]], 
         namespace: str, batch_size: int = 100
-    ) -> int:
+    ) -> Dict[str, Any]:
         """Upsert vectors to Pinecone in batches"""
 
         if not self.index:
@@ -107,35 +97,56 @@ class PineconeService:
                 batch = vectors[i:i + batch_size]
                 self.index.upsert(vectors=batch, namespace=namespace)
                 total_upserted += len(batch)
-                logging.info(f"Upserted batch {i//batch_size + 1}, total: {total_upserted}")
+                logging.info("Upserted batch %d, total: %d", i // batch_size + 1, total_upserted)
             
-            logging.info(f"Successfully upserted {total_upserted} vectors to namespace '{namespace}'")
+            logging.info("Successfully upserted %d vectors to namespace '%s'", total_upserted, namespace)
             return {"status": "success", "total_upserted": total_upserted}
             
         except Exception as e:
-            logging.error(f"Failed to upsert vectors: {str(e)}")
+            logging.error("Failed to upsert vectors: %s", e)
             return {"status": "error", "message": f"Failed to upsert vectors to Pinecone: {str(e)}"}
 
 
 
 
 
-    async def search(self, query_vector: List[float], namespace: str, top_k: int = 5) -> List[Dict]:
+    @instrument_call(VECTOR_STORE_SECONDS, VECTOR_STORE_REQUESTS, "pinecone", "upsert")
+    async def aupsert_batch(self, vectors: List[Dict[str, Any]], namespace: str) -> int:
+        """Upsert a single batch of vectors on the Pinecone executor without blocking the event loop"""
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, partial(self.index.upsert, vectors=vectors, namespace=namespace))
+
+        return len(vectors)
+
+
+
+
+
+    @instrument_call(VECTOR_STORE_SECONDS, VECTOR_STORE_REQUESTS, "pinecone", "search")
+    async def search(self, query_vector: List[float], namespace: str, top_k: int = 5) -> Dict[str, Any]:
         """Search for similar vectors in Pinecone index"""
         
         logging.info('Searching for relevant documents in Pinecone')
         try:
-            search_results = self.index.query(
-                vector=query_vector,
-                top_k=top_k,
-                include_metadata=True,
-                namespace=namespace
+            # The Pinecone client is blocking; run it on the dedicated executor so concurrent tickets overlap.
+            loop = asyncio.get_running_loop()
+            search_results = await loop.run_in_executor(
+                self.executor,
+                partial(
+                    self.index.query,
+                    vector=query_vector,
+                    top_k=top_k,
+                    include_metadata=True,
+                    namespace=namespace
+                )
             )
 
             
             retrieved_docs = []
             for match in search_results.matches:
                 retrieved_docs.append({
+                    "id": match.id,
                     "content": match.metadata.get("text", ""),
                     "score": match.score
                 })
@@ -143,8 +154,5 @@ class PineconeService:
             return {"status": "success", "data": retrieved_docs}
 
         except Exception as e:
-            logging.error(f"Pinecone search error: {e}")
+            logging.error("Pinecone search error: %s", e)
             return {"status": "error", "message": f"Pinecone search error: {str(e)}"}
-
-
-pinecone_service = PineconeService()
@@ -0,0 +1,135 @@
+
+import re
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+from core.config import settings
+from services.prompt_templates import DRAFT_FALLBACK_RESPONSE
+
+
+
+STOPWORDS = {
+    "about", "after", "also", "been", "before", "could", "does", "from", "have", "here", "into", "just",
+    "more", "please", "should", "some", "than", "thank", "that", "their", "them", "then", "there", "these",
+    "they", "this", "those", "through", "very", "what", "when", "where", "which", "while", "will", "with",
+    "would", "your", "you're", "reaching", "contact", "team", "support", "help", "happy", "assist"
+}
+
+
+
+class PreReviewer:
+    """Cheap deterministic checks that settle a draft's review without the LLM reviewer when the outcome is obvious.
+
+    Rejects the drafting fallback text, drafts outside the length bounds and drafts containing banned
+    phrases. With auto_approve (off by default), also approves drafts whose distinctive terms are mostly
+    found in the retrieved context; term overlap says nothing about accuracy, tone or policy, so such
+    drafts are never stored in the semantic response cache. Everything else is left to the LLM reviewer.
+    """
+
+    def __init__(
+        self, min_chars: int, max_chars: int, banned_phrases: List[str],
+        approve_grounding: float, auto_approve: bool
+    ):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.banned_phrases = [phrase.lower() for phrase in banned_phrases]
+        self.approve_grounding = approve_grounding
+        self.auto_approve = auto_approve
+
+        self.outcomes = Counter()
+        self.rejection_reasons = Counter()
+
+
+
+
+
+    @staticmethod
+    def _terms(text: str) -> set:
+        return {word for word in re.findall(r"[a-z][a-z0-9']{3,}", text.lower()) if word not in STOPWORDS}
+
+
+
+
+
+    def _reject(self, reason: str, issue: str, refinement_needed: str) -> Dict[str, Any]:
+        self.outcomes["auto_rejected"] += 1
+        self.rejection_reasons[reason] += 1
+
+        logging.info("Pre-review rejected the draft: %s", reason)
+        return {"approved": False, "issues": [issue], "refinement_needed": refinement_needed, "reviewer": "rules"}
+
+
+
+
+
+    def grounding(self, draft: str, documents: List[Dict[str, Any]]) -> float:
+        """Share of the draft's distinctive terms that also occur in the retrieved documents."""
+
+        draft_terms = self._terms(draft)
+        if not draft_terms:
+            return 0.0
+
+        context_terms = set()
+        for doc in documents:
+            context_terms |= self._terms(doc.get("content", ""))
+
+        return len(draft_terms & context_terms) / len(draft_terms)
+
+
+
+
+
+    def review(self, draft: str, documents: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return a review result when the rules settle it, or None when the LLM reviewer must decide."""
+
+        text = (draft or "").strip()
+        lowered = text.lower()
+
+        if not text or text == DRAFT_FALLBACK_RESPONSE:
+            return self._reject("fallback", "The draft is the generic fallback, not an answer to the ticket", "Draft an answer to the ticket")
+
+        if len(text) < self.min_chars:
+            return self._reject("too_short", "The draft is too short to resolve the ticket", "Give a complete answer with concrete steps")
+
+        if len(text) > self.max_chars:
+            return self._reject("too_long", "The draft is too long for a support reply", "Answer more concisely")
+
+        for phrase in self.banned_phrases:
+            if phrase in lowered:
+                return self._reject("banned_phrase", f"The draft contains a banned phrase: \"{phrase}\"", f"Remove \"{phrase}\"")
+
+        if self.auto_approve and documents and self.grounding(text, documents) >= self.approve_grounding:
+            self.outcomes["auto_approved"] += 1
+            return {"approved": True, "issues": [], "refinement_needed": "", "reviewer": "rules"}
+
+        self.outcomes["llm_reviewed"] += 1
+        return None
+
+
+
+
+
+    def stats(self) -> dict:
+        reviews = sum(self.outcomes.values())
+
+        return {
+            "auto_approved": self.outcomes["auto_approved"],
+            "auto_rejected": self.outcomes["auto_rejected"],
+            "llm_reviewed": self.outcomes["llm_reviewed"],
+            "llm_review_rate": round(self.outcomes["llm_reviewed"] / reviews, 4) if reviews else 0.0,
+            "rejection_reasons": dict(self.rejection_reasons)
+        }
+
+
+
+
+
+def build_pre_reviewer() -> PreReviewer:
+    return PreReviewer(
+        min_chars=settings.PRE_REVIEW_MIN_CHARS,
+        max_chars=settings.PRE_REVIEW_MAX_CHARS,
+        banned_phrases=settings.PRE_REVIEW_BANNED_PHRASES,
+        approve_grounding=settings.PRE_REVIEW_APPROVE_GROUNDING,
+        auto_approve=settings.PRE_REVIEW_AUTO_APPROVE
+    )
@@ -77,4 +77,10 @@ Issues: {issues}
 Refinement Needed: {refinement_needed}
 
 Provide refined context that addresses the review feedback.
-"""
\ No newline at end of file
+"""
+
+
+
+
+
+DRAFT_FALLBACK_RESPONSE = "I apologize, but I'm unable to process your request at this time. Please contact our support team directly."
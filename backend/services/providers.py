@@ -0,0 +1,232 @@
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List
+
+
+
+class Provider:
+    """Lazily built, process-wide service instance.
+
+    The factory (and the heavy imports inside it) runs on first use, or when the application's
+    lifespan hook warms the provider up. Attribute access is forwarded to the instance, so a
+    provider can be imported and used exactly like the service object it stands for. Calling the
+    provider returns the instance, which makes it usable as a FastAPI dependency; tests and
+    benchmarks can swap the instance with override().
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+
+
+
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+
+
+
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+
+
+
+
+    def get(self) -> Any:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+
+
+
+
+    def override(self, instance: Any):
+        object.__setattr__(self, "_instance", instance)
+
+
+
+
+
+    def reset(self):
+        object.__setattr__(self, "_instance", None)
+
+
+
+
+
+    def __call__(self) -> Any:
+        return self.get()
+
+
+
+
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self.get(), attribute)
+
+
+
+
+
+    def __setattr__(self, attribute: str, value: Any):
+        setattr(self.get(), attribute, value)
+
+
+
+
+
+    def __repr__(self) -> str:
+        return f"<Provider {self._name} ({'initialized' if self.initialized else 'lazy'})>"
+
+
+
+
+
+
+
+def _build_openai_service():
+    from services.openai_service import OpenAIService
+    return OpenAIService()
+
+
+
+
+
+def _build_vector_store():
+    from services.vector_store import build_vector_store
+    return build_vector_store()
+
+
+
+
+
+def _build_semantic_cache():
+    from services.semantic_cache import build_semantic_cache
+    return build_semantic_cache()
+
+
+
+
+
+def _build_context_assembler():
+    from services.context_assembler import build_context_assembler
+    return build_context_assembler()
+
+
+
+
+
+def _build_ticket_classifier():
+    from services.ticket_classifier import build_ticket_classifier
+    return build_ticket_classifier()
+
+
+
+
+
+def _build_pre_reviewer():
+    from services.pre_review import build_pre_reviewer
+    return build_pre_reviewer()
+
+
+
+
+
+def _build_escalation_store():
+    from services.escalation_store import build_escalation_store
+    return build_escalation_store()
+
+
+
+
+
+def _build_admission_controller():
+    from services.admission_control import build_admission_controller
+    return build_admission_controller()
+
+
+
+
+
+def _build_langgraph_service():
+    from services.langgraph_service import LanggraphService
+    return LanggraphService()
+
+
+
+
+
+def _build_ingestion_service():
+    from services.ingestion_service import IngestionService
+    return IngestionService()
+
+
+
+
+
+def _build_batch_service():
+    from services.batch_service import BatchService
+    return BatchService()
+
+
+
+
+
+
+openai_service = Provider("openai_service", _build_openai_service)
+vector_store = Provider("vector_store", _build_vector_store)
+semantic_cache = Provider("semantic_cache", _build_semantic_cache)
+context_assembler = Provider("context_assembler", _build_context_assembler)
+ticket_classifier = Provider("ticket_classifier", _build_ticket_classifier)
+pre_reviewer = Provider("pre_reviewer", _build_pre_reviewer)
+escalation_store = Provider("escalation_store", _build_escalation_store)
+admission_controller = Provider("admission_controller", _build_admission_controller)
+langgraph_service = Provider("langgraph_service", _build_langgraph_service)
+ingestion_service = Provider("ingestion_service", _build_ingestion_service)
+batch_service = Provider("batch_service", _build_batch_service)
+
+# Dependencies come before the services that use them
+PROVIDERS: List[Provider] = [
+    openai_service, vector_store, semantic_cache, context_assembler, ticket_classifier,
+    pre_reviewer, escalation_store, admission_controller, langgraph_service, ingestion_service, batch_service
+]
+
+
+
+
+
+def initialize_providers(providers: List[Provider] = None) -> Dict[str, Any]:
+    """Build providers up front, recording how long each took.
+
+    A provider that fails (e.g. the vector store while the network is down) is logged and left lazy,
+    so startup still succeeds and the provider is retried on first use.
+    """
+
+    report = {}
+
+    for provider in providers or PROVIDERS:
+        started = time.perf_counter()
+        try:
+            provider.get()
+            report[provider.name] = {"status": "ready", "seconds": round(time.perf_counter() - started, 4)}
+        except Exception as e:
+            logging.error("Failed to initialize %s, will retry on first use: %s", provider.name, e)
+            report[provider.name] = {"status": "error", "message": str(e)}
+
+    return report
@@ -0,0 +1,141 @@
+
+import time
+import random
+import asyncio
+import logging
+from typing import Dict
+
+from core.config import settings
+
+
+
+class TokenBucket:
+    """Budget refilled continuously at `per_minute / 60` per second, holding at most `burst_seconds` of it.
+
+    A request may take more than is left; the level then goes negative and later callers wait
+    until the debt is repaid, so oversized requests are still admitted without exceeding the rate.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+
+
+
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+
+
+
+    def shortfall(self, amount: float, floor: float) -> float:
+        """Seconds until `amount` can be taken while leaving `floor` in the bucket."""
+
+        # A request larger than the bucket waits for a full bucket rather than forever
+        amount = min(amount, self.capacity - floor)
+        return max(0.0, (amount + floor - self.level) / self.rate)
+
+
+
+
+
+class ModelRateLimiter:
+    """Client-side RPM/TPM limit for one model, shared by every call to it.
+
+    Callers wait until both the request and the token bucket can cover the call. Background
+    (ingestion) calls must leave `background_reserve` of each bucket for live tickets and also wait
+    while any live call is waiting, so a large upload cannot starve ticket processing. After a 429
+    every caller pauses for the server's retry-after, which stops a storm of immediate retries.
+    """
+
+    def __init__(self, model: str, rpm: int, tpm: int, burst_seconds: float, background_reserve: float):
+        self.model = model
+        self.requests = TokenBucket(rpm, burst_seconds)
+        self.tokens = TokenBucket(tpm, burst_seconds)
+        self.background_reserve = background_reserve
+        self.live_waiting = 0
+        self.paused_until = 0.0
+
+
+
+
+
+    async def acquire(self, tokens: int, background: bool = False) -> float:
+        """Wait until the call fits within the limits and take its budget; returns the seconds waited."""
+
+        started = time.monotonic()
+        reserve = self.background_reserve if background else 0.0
+        if not background:
+            self.live_waiting += 1
+
+        try:
+            while True:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+
+                wait = max(
+                    self.paused_until - now,
+                    self.requests.shortfall(1, reserve * self.requests.capacity),
+                    self.tokens.shortfall(tokens, reserve * self.tokens.capacity)
+                )
+                if background and self.live_waiting:
+                    wait = max(wait, 0.05)
+
+                if wait <= 0:
+                    self.requests.level -= 1
+                    self.tokens.level -= tokens
+                    return now - started
+
+                # Jittered so callers woken together do not retry in lockstep
+                await asyncio.sleep(wait * random.uniform(1.0, 1.1))
+
+        finally:
+            if not background:
+                self.live_waiting -= 1
+
+
+
+
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the response reports the tokens the call really used."""
+
+        self.tokens.level = min(self.tokens.capacity, self.tokens.level + estimated_tokens - actual_tokens)
+
+
+
+
+
+    def throttled(self, retry_after: float):
+        """The server rejected a call: pause all callers for `retry_after` seconds.
+
+        The buckets are left as they are; emptying them would hold background calls back until they
+        refilled past the reserve, seconds after the server is accepting calls again.
+        """
+
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+
+
+
+def build_rate_limiters() -> Dict[str, ModelRateLimiter]:
+    """One limiter per model in OPENAI_RATE_LIMITS; calls to other models are not limited."""
+
+    limiters = {}
+    for model, limits in settings.OPENAI_RATE_LIMITS.items():
+        limiters[model] = ModelRateLimiter(
+            model, limits["rpm"], limits["tpm"],
+            burst_seconds=settings.OPENAI_RATE_LIMIT_BURST_SECONDS,
+            background_reserve=settings.OPENAI_BACKGROUND_RESERVE
+        )
+
+    logging.info("OpenAI rate limits: %s", {model: settings.OPENAI_RATE_LIMITS[model] for model in limiters})
+    return limiters
@@ -0,0 +1,200 @@
+
+import os
+import time
+import fcntl
+import logging
+import threading
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from core.config import settings
+
+
+
+class SemanticResponseCache:
+    """Per-category local vector index of approved responses, matched by cosine similarity of the query embedding.
+
+    Each worker holds its own entries. invalidate() bumps a per-category generation counter in a file under
+    `generation_dir`, and every worker drops a category cached under an older generation on its next lookup
+    or store. Workers see each other's invalidations only when they share that directory, i.e. run on the same
+    host or volume. A response generated from the old documents but stored after the bump is still cached,
+    until its TTL expires.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float, generation_dir: str):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation_dir = generation_dir
+        os.makedirs(generation_dir, exist_ok=True)
+
+        # category -> ring buffer of max_entries slots: {"vectors": (max_entries, dim) float32 unit rows,
+        # "responses": [...], "created_at": (max_entries,) float64, "next": slot to write, "size": slots filled,
+        # "generation": the category's generation when the buffer was created}.
+        # The three are written at the same index, so a row always matches its response and timestamp.
+        self.namespaces: Dict[str, dict] = {}
+
+        # Nodes that use the cache run on executor threads as well as the event loop
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+
+
+
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+
+
+
+
+    def _generation_path(self, category: str) -> str:
+        return os.path.join(self.generation_dir, f"{category}.generation")
+
+
+
+
+
+    def _generation(self, category: str) -> int:
+        """The category's current generation as written by any worker; 0 before its first invalidation."""
+
+        try:
+            with open(self._generation_path(category), "rb") as file:
+                return int(file.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+
+
+
+
+    def _current_entries(self, category: str, generation: int) -> Optional[dict]:
+        """The category's entries, dropped if another worker has invalidated it since. Caller holds the lock."""
+
+        entries = self.namespaces.get(category)
+        if entries is not None and entries["generation"] != generation:
+            del self.namespaces[category]
+            logging.info("Semantic response cache for '%s' invalidated by another worker", category)
+            return None
+
+        return entries
+
+
+
+
+
+    def lookup(self, category: str, embedding: List[float]) -> Optional[Dict]:
+        """Return the closest unexpired cached response in the category if it clears the similarity threshold."""
+
+        query = self._normalize(embedding) if embedding else None
+        generation = self._generation(category)
+
+        with self.lock:
+            entries = self._current_entries(category, generation)
+
+            if not entries or query is None or query.shape[0] != entries["vectors"].shape[1]:
+                self.misses += 1
+                return None
+
+            size = entries["size"]
+            scores = entries["vectors"][:size] @ query
+            # Expired entries are skipped rather than shadowing a fresh match that scores lower
+            scores[entries["created_at"][:size] < time.time() - self.ttl_seconds] = -np.inf
+            best = int(np.argmax(scores))
+
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return {"response": entries["responses"][best], "score": float(scores[best])}
+
+
+
+
+
+    def store(self, category: str, embedding: List[float], response: str):
+        """Add an approved response, overwriting the oldest entry once max_entries are held."""
+
+        vector = self._normalize(embedding) if embedding else None
+        if vector is None:
+            return
+
+        generation = self._generation(category)
+
+        with self.lock:
+            entries = self._current_entries(category, generation)
+            if entries is None or entries["vectors"].shape[1] != vector.shape[0]:
+                # np.zeros pages are only backed by memory once written, so a sparse category stays small
+                entries = {
+                    "vectors": np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32),
+                    "responses": [None] * self.max_entries,
+                    "created_at": np.zeros(self.max_entries),
+                    "next": 0,
+                    "size": 0,
+                    "generation": generation
+                }
+                self.namespaces[category] = entries
+
+            slot = entries["next"]
+            entries["vectors"][slot] = vector
+            entries["responses"][slot] = response
+            entries["created_at"][slot] = time.time()
+            entries["next"] = (slot + 1) % self.max_entries
+            entries["size"] = min(entries["size"] + 1, self.max_entries)
+
+
+
+
+
+    def invalidate(self, category: str):
+        """Forget every cached response for a category in every worker, e.g. after its namespace is re-ingested."""
+
+        fd = os.open(self._generation_path(category), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # Two workers invalidating at once must both bump the counter
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            generation = int(os.read(fd, 32) or 0) + 1
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, str(generation).encode(), 0)
+        finally:
+            os.close(fd)
+
+        with self.lock:
+            self.namespaces.pop(category, None)
+
+        logging.info("Semantic response cache invalidated for '%s' (generation %d)", category, generation)
+
+
+
+
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": {category: entries["size"] for category, entries in self.namespaces.items()}
+            }
+
+
+
+
+
+def build_semantic_cache() -> SemanticResponseCache:
+    return SemanticResponseCache(
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        generation_dir=settings.SEMANTIC_CACHE_GENERATION_DIR
+    )
@@ -0,0 +1,233 @@
+
+import os
+import time
+import logging
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+
+
+
+class EmbeddingClassifier:
+    """Multinomial logistic regression over unit-normalized query embeddings.
+
+    Weights start from the per-category centroids, so an untrained model is a nearest-centroid
+    classifier; gradient descent then sharpens the decision boundaries and calibrates the softmax
+    probabilities that are used as confidence.
+    """
+
+    def __init__(self, labels: List[str], weights: np.ndarray, bias: np.ndarray, embedding_model: str = ""):
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+        self.embedding_model = embedding_model
+
+
+
+
+
+    @property
+    def dimension(self) -> int:
+        return self.weights.shape[1]
+
+
+
+
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1, norms)
+
+
+
+
+
+    @classmethod
+    def train(
+        cls, embeddings, labels: List[str], embedding_model: str = "",
+        epochs: int = 300, learning_rate: float = 0.5, l2: float = 1e-4, temperature: float = 0.05
+    ) -> "EmbeddingClassifier":
+        """Fit on labelled embeddings with full-batch gradient descent."""
+
+        data = cls._normalize(embeddings)
+        classes = sorted(set(labels))
+        targets = np.array([classes.index(label) for label in labels])
+        one_hot = np.eye(len(classes), dtype=np.float32)[targets]
+
+        centroids = np.stack([data[targets == i].mean(axis=0) for i in range(len(classes))])
+        weights = cls._normalize(centroids) / temperature
+        bias = np.zeros(len(classes), dtype=np.float32)
+
+        for _ in range(epochs):
+            probabilities = cls._softmax(data @ weights.T + bias)
+            error = (probabilities - one_hot) / len(data)
+
+            weights -= learning_rate * (error.T @ data + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+
+        return cls(classes, weights.astype(np.float32), bias.astype(np.float32), embedding_model)
+
+
+
+
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+
+
+
+    def predict_proba(self, embeddings) -> np.ndarray:
+        return self._softmax(self._normalize(embeddings) @ self.weights.T + self.bias)
+
+
+
+
+
+    def predict(self, embedding: List[float]) -> Tuple[str, float]:
+        """Most likely category and its probability for one embedding."""
+
+        probabilities = self.predict_proba(embedding)[0]
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+
+
+
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            labels=np.array(self.labels),
+            weights=self.weights,
+            bias=self.bias,
+            embedding_model=np.array(self.embedding_model)
+        )
+
+
+
+
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingClassifier":
+        model = np.load(path)
+        return cls(
+            labels=[str(label) for label in model["labels"]],
+            weights=model["weights"],
+            bias=model["bias"],
+            embedding_model=str(model["embedding_model"])
+        )
+
+
+
+
+
+class TicketClassifier:
+    """First classification tier: answers from the local model when it is confident enough, and
+    keeps the counters that show how many LLM classification calls it saves."""
+
+    def __init__(self, model: Optional[EmbeddingClassifier], threshold: float):
+        self.model = model
+        self.threshold = threshold
+
+        self.local_hits = 0
+        self.llm_fallbacks = 0
+        self.cancelled_fallbacks = 0
+        self.local_seconds = 0.0
+        self.llm_seconds = 0.0
+
+
+
+
+
+    def classify(self, embedding: List[float]) -> Optional[Dict]:
+        """Return {"category", "confidence"} when the local model clears the threshold, otherwise None."""
+
+        if self.model is None or not embedding or len(embedding) != self.model.dimension:
+            return None
+
+        started = time.perf_counter()
+        category, confidence = self.model.predict(embedding)
+
+        if confidence < self.threshold:
+            return None
+
+        self.local_hits += 1
+        self.local_seconds += time.perf_counter() - started
+        return {"category": category, "confidence": confidence}
+
+
+
+
+
+    def record_fallback(self, seconds: float):
+        """Count a ticket that needed the LLM classifier and how long that call took."""
+
+        self.llm_fallbacks += 1
+        self.llm_seconds += seconds
+
+
+
+
+
+    def record_cancelled_fallback(self):
+        """Count an LLM call started as a hedge and cancelled because the local model answered; it was already sent."""
+
+        self.cancelled_fallbacks += 1
+
+
+
+
+
+    def stats(self) -> dict:
+        tickets = self.local_hits + self.llm_fallbacks
+        # A hedged LLM call cancelled after the local model answered was still sent, so it saved nothing
+        short_circuits = self.local_hits - self.cancelled_fallbacks
+        average_llm_ms = self.llm_seconds / self.llm_fallbacks * 1000 if self.llm_fallbacks else 0.0
+        average_local_ms = self.local_seconds / self.local_hits * 1000 if self.local_hits else 0.0
+
+        return {
+            "enabled": self.model is not None,
+            "threshold": self.threshold,
+            "local_hits": self.local_hits,
+            "llm_fallbacks": self.llm_fallbacks,
+            "cancelled_fallbacks": self.cancelled_fallbacks,
+            "llm_calls": self.llm_fallbacks + self.cancelled_fallbacks,
+            "short_circuit_rate": round(short_circuits / tickets, 4) if tickets else 0.0,
+            "average_llm_ms": round(average_llm_ms, 1),
+            "average_local_ms": round(average_local_ms, 3),
+            # Estimated from the average LLM classification latency observed on fallbacks
+            "estimated_latency_saved_ms": round(short_circuits * max(0.0, average_llm_ms - average_local_ms), 1)
+        }
+
+
+
+
+
+def build_ticket_classifier() -> TicketClassifier:
+    """Load the trained model if one exists and matches the configured embedding model."""
+
+    model = None
+    path = settings.TICKET_CLASSIFIER_PATH
+
+    if settings.TICKET_CLASSIFIER_ENABLED and os.path.exists(path):
+        try:
+            model = EmbeddingClassifier.load(path)
+            if model.embedding_model and model.embedding_model != settings.EMBEDDING_MODEL_NAME:
+                logging.warning("Ticket classifier at %s was trained on %s embeddings; ignoring it", path, model.embedding_model)
+                model = None
+
+        except Exception as e:
+            logging.error("Failed to load ticket classifier from %s: %s", path, e)
+            model = None
+
+    return TicketClassifier(model, settings.TICKET_CLASSIFIER_THRESHOLD)
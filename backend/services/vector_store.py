@@ -0,0 +1,18 @@
+
+from core.config import settings
+from services.base_vector_store import VectorStore
+
+
+
+def build_vector_store() -> VectorStore:
+    """Build the backend selected by VECTOR_STORE_BACKEND. Imports are deferred so unused backends never load."""
+
+    if settings.VECTOR_STORE_BACKEND == "local":
+        from services.local_vector_store import LocalVectorStore
+        return LocalVectorStore(directory=settings.LOCAL_VECTOR_STORE_DIR, index_type=settings.LOCAL_VECTOR_STORE_INDEX)
+
+    if settings.VECTOR_STORE_BACKEND == "pinecone":
+        from services.pinecone_service import PineconeService
+        return PineconeService()
+
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {settings.VECTOR_STORE_BACKEND}")
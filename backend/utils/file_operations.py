@@ -1,70 +1,142 @@
 
+import os
+import asyncio
 import logging
 import tempfile
+from typing import List, Iterable, Iterator
 
 from fastapi import UploadFile, File
-from langchain_community.document_loaders import PyPDFLoader
+
+from core.config import settings
 
 
 
 async def process_file(file: UploadFile = File(...),):
-    """Process the uploaded PDF file and return its content as documents."""
+    """Spool the uploaded PDF to a temporary file and return a lazy iterator over its pages."""
+
+    temp_file_path = None
 
     try:
         # Validate file type
         if not file.filename.lower().endswith('.pdf'):
             return {"status": "error", "message": "Only PDF files are allowed"}
 
-
-        temp_file_path = None
-
         
-        # Create temporary file to store uploaded PDF
+        # Copy the upload to a temporary file a chunk at a time instead of reading it into memory
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
             temp_file_path = temp_file.name
+            while chunk := await file.read(settings.UPLOAD_CHUNK_BYTES):
+                temp_file.write(chunk)
         
 
-        # Load PDF
-        loader = PyPDFLoader(temp_file_path)
-        documents = loader.load()
-        if not documents:
+        # Parse only the page count now; pages are parsed one at a time while they are ingested
+        total_pages = await asyncio.to_thread(count_pdf_pages, temp_file_path)
+        if not total_pages:
+            os.unlink(temp_file_path)
             return {"status": "error", "message": "No content could be extracted from the PDF"}
 
 
-        return {"status": "success", "documets": documents, "temp_file_path": temp_file_path}
+        return {
+            "status": "success",
+            "documents": iter_pdf_pages(temp_file_path, file.filename),
+            "total_pages": total_pages,
+            "temp_file_path": temp_file_path
+        }
 
 
     except Exception as e:
-        logging.error(f"Error processing file: {str(e)}")
+        logging.error("Error processing file: %s", e)
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
         return {"status": "error", "message": f"Failed to process file: {str(e)}"}
 
 
 
 
 
-async def split_and_create_embeddings(documents, openai_service):
-    """Split documents into chunks and create embeddings using OpenAI service"""
-    
-    try:
-        # Split documents into chunks
-        chunks = openai_service.text_splitter.split_documents(documents)
-        
-        if not chunks:
-            return {"status": "error", "message": "No chunks could be created from the document"}
-        
+def count_pdf_pages(path: str) -> int:
+    from pypdf import PdfReader
 
-        # Generate embeddings for all chunks
-        logging.info(f"Generating embeddings for {len(chunks)} chunks")
-        chunk_embeddings = []
-        for chunk in chunks:
-            embedding = openai_service.embeddings.embed_query(chunk.page_content)
-            chunk_embeddings.append(embedding)
+    with open(path, "rb") as pdf_file:
+        return int(PdfReader(pdf_file).trailer["/Root"]["/Pages"].get("/Count", 0))
 
 
-        return {"status": "success", "chunks": chunks, "embeddings": chunk_embeddings}
 
-    except Exception as e:
-        logging.error(f"Failed to split and create embeddings: {str(e)}")
-        return {"status": "error", "message": f"Failed to process document: {str(e)}"}
\ No newline at end of file
+
+
+def iter_pdf_pages(path: str, source: str) -> Iterator:
+    """Yield one Document per PDF page, parsing each page only when it is requested.
+
+    pypdf's PdfReader loads the whole file when given a path, so it reads from the open file instead
+    and the upload stays on disk. A reader keeps every page it has handed out and every object it has
+    resolved, so a fresh reader is opened every PDF_READER_PAGES pages and the old one, with its
+    caches, is released. What still grows with the document is the page tree each reader flattens on
+    its first page access, a few KB per page; reopening more often re-parses it and gets slower.
+    """
+
+    from pypdf import PdfReader
+    from langchain.schema import Document
+
+    with open(path, "rb") as pdf_file:
+        reader = PdfReader(pdf_file)
+        total_pages = len(reader.pages)
+
+        for page_number in range(total_pages):
+            if page_number and page_number % settings.PDF_READER_PAGES == 0:
+                reader = PdfReader(pdf_file)
+
+            text = reader.pages[page_number].extract_text().strip()
+
+            yield Document(
+                page_content=text,
+                metadata={"source": source, "page": page_number, "total_pages": total_pages}
+            )
+
+
+
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used to size embedding batches."""
+
+    return len(text) // 4 + 1
+
+
+
+
+
+def iter_token_budget_batches(
+    items: Iterable, max_tokens: int = None, max_batch_size: int = None, text=lambda item: item
+) -> Iterator[List]:
+    """Lazily group items into consecutive batches that stay within the per-request token and input limits."""
+
+    max_tokens = max_tokens or settings.EMBEDDING_BATCH_MAX_TOKENS
+    max_batch_size = max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
+
+    current_batch = []
+    current_tokens = 0
+
+    for item in items:
+        tokens = estimate_tokens(text(item))
+
+        if current_batch and (current_tokens + tokens > max_tokens or len(current_batch) >= max_batch_size):
+            yield current_batch
+            current_batch = []
+            current_tokens = 0
+
+        current_batch.append(item)
+        current_tokens += tokens
+
+    if current_batch:
+        yield current_batch
+
+
+
+
+
+def batch_by_token_budget(
+    texts: List[str], max_tokens: int = None, max_batch_size: int = None
+) -> List[List[str]]:
+    """Group texts into consecutive batches that stay within the per-request token and input limits."""
+
+    return list(iter_token_budget_batches(texts, max_tokens, max_batch_size))
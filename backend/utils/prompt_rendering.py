@@ -0,0 +1,76 @@
+
+import re
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+from pydantic import BaseModel
+
+
+
+PLACEHOLDER_PATTERN = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+
+def serialize_value(value: Any) -> str:
+    """Serialize a placeholder value: strings as-is, containers and models as indented JSON."""
+
+    if isinstance(value, str):
+        return value
+    if isinstance(value, BaseModel):
+        return json.dumps(value.model_dump(), ensure_ascii=False, indent=4)
+
+    try:
+        return json.dumps(value, ensure_ascii=False, indent=4)
+    except TypeError:
+        return str(value)
+
+
+
+
+
+class CompiledPrompt:
+    """A prompt split once into literal text and {placeholder} slots, rendered in a single join.
+
+    Unlike repeated str.replace passes, a value that itself contains "{name}" is never substituted
+    again, and text such as "{{" that is not a placeholder is left untouched.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self.parts: List[Tuple[str, str]] = []
+
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            self.parts.append((template[position:match.start()], match.group(1)))
+            position = match.end()
+
+        self.tail = template[position:]
+        self.placeholders = {name for _, name in self.parts}
+
+
+
+
+
+    def render(self, **kwargs: Any) -> str:
+        """Fill the placeholders given in kwargs; unknown ones stay as literal text."""
+
+        serialized: Dict[str, str] = {
+            key: serialize_value(value) for key, value in kwargs.items() if key in self.placeholders
+        }
+
+        pieces = []
+        for literal, name in self.parts:
+            pieces.append(literal)
+            pieces.append(serialized[name] if name in serialized else f"{{{name}}}")
+        pieces.append(self.tail)
+
+        return "".join(pieces)
+
+
+
+@lru_cache(maxsize=64)
+def compile_prompt(template: str) -> CompiledPrompt:
+    """Parse a prompt template once per distinct template string."""
+
+    return CompiledPrompt(template)